@@ -2,7 +2,3 @@ from . import models
 from . import schemas
 from . import database
 from . import crud
-from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv(Path(__file__).resolve().parents[1] / ".env")
@@ -1,22 +1,19 @@
-import os
 from datetime import datetime, timedelta
 from typing import Union, Optional
-from dotenv import load_dotenv
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from app.models import RoleEnum
+from app.config import get_settings
 
-env_path = os.path.join(os.path.dirname(__file__), "..", ".env")
-load_dotenv(dotenv_path=os.path.abspath(env_path))
+settings = get_settings()
 
+ADMIN_EMAIL = settings.admin_email
+ADMIN_PASSWORD = settings.admin_password
 
-ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
-ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
-
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "narscbjim@$@&^@&%^&RFghgjvbdsha")
-JWT_REFRESH_SECRET_KEY = os.getenv("JWT_REFRESH_SECRET_KEY", "13ugfdfgh@#$%^@&jkl45678902")
+JWT_SECRET_KEY = settings.jwt_secret_key
+JWT_REFRESH_SECRET_KEY = settings.jwt_refresh_secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
@@ -33,15 +30,46 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 # ---------------- Token creation ------------------
 
-def create_access_token(subject: Union[str, int], role: RoleEnum, expires_delta: timedelta = None) -> str:
+# Version 2 tokens also carry the caller's student_id or counselor_id.
+CLAIMS_VERSION = 2
+
+def create_access_token(
+    subject: Union[str, int],
+    role: RoleEnum,
+    expires_delta: timedelta = None,
+    student_id: Optional[int] = None,
+    counselor_id: Optional[int] = None,
+) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     payload = {
         "exp": expire,
         "sub": str(subject),
-        "role": role.value
+        "role": role.value,
+        "ver": CLAIMS_VERSION
     }
+    if student_id is not None:
+        payload["student_id"] = student_id
+    if counselor_id is not None:
+        payload["counselor_id"] = counselor_id
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=ALGORITHM)
 
+def create_user_access_token(user) -> str:
+    student = user.student if user.role == RoleEnum.student else None
+    counselor = user.counselor if user.role == RoleEnum.counselor else None
+    return create_access_token(
+        subject=user.userid,
+        role=user.role,
+        student_id=student.student_id if student else None,
+        counselor_id=counselor.counselor_id if counselor else None,
+    )
+
+def claimed_id(payload: dict, claim: str) -> Optional[int]:
+    """Return a role id carried by the token, or None for tokens issued before it was added."""
+    if payload.get("ver", 1) < CLAIMS_VERSION:
+        return None
+    value = payload.get(claim)
+    return int(value) if value is not None else None
+
 def create_refresh_token(subject: Union[str, int], expires_delta: Optional[timedelta] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
     payload = {"exp": expire, "sub": str(subject)}
@@ -0,0 +1,93 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from dotenv import load_dotenv
+
+ENV_FILE = Path(__file__).resolve().parents[1] / ".env"
+
+
+def _bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings:
+    """Every environment setting the app reads, loaded once per process.
+
+    `.env` is only read in development; in production Liara injects the
+    environment directly.
+    """
+
+    def __init__(self):
+        self.env = os.getenv("ENV", "development")
+        if self.env == "development" and ENV_FILE.exists():
+            load_dotenv(ENV_FILE)
+
+        # Database
+        self.database_url = os.getenv("DATABASE_URL")
+        self.async_database_url = os.getenv("ASYNC_DATABASE_URL")
+        self.database_replica_url = os.getenv("DATABASE_REPLICA_URL")
+        self.db_pool_mode = os.getenv("DB_POOL_MODE", "session").lower()
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", 10))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 30))
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", 1800))
+        self.db_replica_max_lag = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+        self.db_replica_lag_check_interval = float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", 5))
+        # Alembic owns the schema in production; create_all is a development convenience.
+        self.auto_create_schema = _bool("AUTO_CREATE_SCHEMA", self.env == "development")
+
+        # Diagnostics
+        self.debug = _bool("DEBUG")
+        self.query_budget_strict = _bool("QUERY_BUDGET_STRICT")
+        self.slow_query_ms = float(os.getenv("SLOW_QUERY_MS", 200))
+        self.slow_query_log_path = os.getenv("SLOW_QUERY_LOG_PATH", "logs/slow_queries.log")
+        self.slow_query_log_max_bytes = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024))
+        self.slow_query_log_backups = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+        self.slow_query_explain = _bool("SLOW_QUERY_EXPLAIN", True)
+        self.slow_query_explain_interval = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 600))
+
+        # Caching (seconds; 0 disables)
+        self.counselor_directory_ttl = float(os.getenv("COUNSELOR_DIRECTORY_TTL", 60))
+        self.counselor_profile_ttl = float(os.getenv("COUNSELOR_PROFILE_TTL", 300))
+        self.counselor_profile_cache_size = int(os.getenv("COUNSELOR_PROFILE_CACHE_SIZE", 1024))
+        self.counselor_dashboard_ttl = float(os.getenv("COUNSELOR_DASHBOARD_TTL", 30))
+
+        # Days ahead for which weekly templates are expanded into free slots
+        self.template_horizon_days = int(os.getenv("TEMPLATE_HORIZON_DAYS", 28))
+        # Days of free slots listed when the caller gives no date window
+        self.slot_window_days = int(os.getenv("SLOT_WINDOW_DAYS", 28))
+
+        # Gregorian years covered by the precomputed Jalali table
+        self.jalali_table_start_year = int(os.getenv("JALALI_TABLE_START_YEAR", 2000))
+        self.jalali_table_end_year = int(os.getenv("JALALI_TABLE_END_YEAR", 2060))
+
+        # Auth
+        self.admin_email = os.getenv("ADMIN_EMAIL")
+        self.admin_password = os.getenv("ADMIN_PASSWORD")
+        self.jwt_secret_key = os.getenv("JWT_SECRET_KEY", "narscbjim@$@&^@&%^&RFghgjvbdsha")
+        self.jwt_refresh_secret_key = os.getenv("JWT_REFRESH_SECRET_KEY", "13ugfdfgh@#$%^@&jkl45678902")
+
+        # CORS
+        self.cors_origins = os.getenv("CORS_ORIGINS", "")
+        self.frontend_url = os.getenv("FRONTEND_URL", "").strip()
+
+        # Email
+        self.smtp_host = os.getenv("SMTP_HOST")
+        self.smtp_port = int(os.getenv("SMTP_PORT", 587))
+        self.smtp_username = os.getenv("SMTP_USERNAME")
+        self.smtp_password = os.getenv("SMTP_PASSWORD")
+        self.smtp_from = os.getenv("SMTP_FROM")
+
+        # Object storage (Liara S3)
+        self.liara_endpoint_url = os.getenv("LIARA_ENDPOINT_URL")
+        self.liara_access_key = os.getenv("LIARA_ACCESS_KEY")
+        self.liara_secret_key = os.getenv("LIARA_SECRET_KEY")
+        self.bucket_name = os.getenv("BUCKET_NAME")
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
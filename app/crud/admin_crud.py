@@ -2,11 +2,20 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app import models, schemas, crud
 from app.crud import users_crud
+from app.crud.rollups_crud import record_appointment, record_role, remove_appointments
+from app.crud.public_crud import invalidate_counselor, invalidate_counselor_profile, invalidate_counselor_user, remove_student_ratings
 from typing import Optional
 from app.models import RoleEnum
 
+# Column projections for the admin list endpoints; they are serialized as-is
+# by FastJSONResponse, so only fields the client should see belong here.
+_USER_LIST_COLUMNS = (
+    models.User.userid, models.User.firstname, models.User.lastname, models.User.email, models.User.role,
+    models.User.registrationDate, models.User.profile_image_url, models.User.profile_image_filename,
+)
+
 def list_users(db: Session, role: Optional[RoleEnum] = None):
-    query = db.query(models.User)
+    query = db.query(*_USER_LIST_COLUMNS)
     if role:
         query = query.filter(models.User.role == role)
     return query.all()
@@ -16,15 +25,26 @@ def delete_user(db: Session, user_id: int):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     student = db.query(models.Student).filter(models.Student.user_id == user_id).first()
+    rated_counselor_ids = []
+    booked_counselor_ids = set()
     if student:
+        rated_counselor_ids = remove_student_ratings(db, student.student_id)
+        booked_counselor_ids = remove_appointments(db, models.Appointment.student_id == student.student_id)
         db.delete(student)
 
     counselor = db.query(models.Counselor).filter(models.Counselor.user_id == user_id).first()
     if counselor:
         db.delete(counselor)
 
+    record_role(db, user.role, -1)
     db.delete(user)
     db.commit()
+    if counselor:
+        invalidate_counselor(counselor.counselor_id)
+    for counselor_id in rated_counselor_ids:
+        invalidate_counselor_profile(counselor_id)
+    for counselor_id in booked_counselor_ids:
+        crud.invalidate_counselor_dashboard(counselor_id)
 
 
 def update_user(db: Session, user_id: int, user_in: schemas.UserUpdate):
@@ -41,6 +61,8 @@ def update_user(db: Session, user_id: int, user_in: schemas.UserUpdate):
 
     db.commit()
     db.refresh(user)
+    if user.role == RoleEnum.counselor:
+        invalidate_counselor_user(user)
     return user
 
 def create_user(db: Session, user_in: schemas.UserCreate):
@@ -53,6 +75,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.models import User, Student, Counselor, StudyPlan, Appointment, RoleEnum, AppointmentStatus
+from app.models import AppointmentDailyCount, CounselorAppointmentTotal, RoleCount
 
 def get_students_by_counselor(db: Session, counselor_id: int):
     return (
@@ -73,7 +96,7 @@ def get_student_grades_by_counselor(db: Session, counselor_id: int):
 
 
 def get_study_plans(db: Session, status: str = None):
-    query = db.query(StudyPlan)
+    query = db.query(*StudyPlan.__table__.columns)
     if status == "finalized":
         query = query.filter(StudyPlan.is_finalized.is_(True))
     elif status == "pending":
@@ -81,7 +104,7 @@ def get_study_plans(db: Session, status: str = None):
     return query.all()
 
 def get_appointments(db: Session, status: str = None):
-    query = db.query(Appointment)
+    query = db.query(*Appointment.__table__.columns)
     if status:
         query = query.filter(Appointment.status == status)
     return query.all()
@@ -89,31 +112,35 @@ def get_appointments(db: Session, status: str = None):
 def delete_appointment_by_id(db: Session, appointment_id: int):
     obj = db.query(Appointment).filter(Appointment.id == appointment_id).first()
     if obj:
+        record_appointment(db, obj.counselor_id, obj.date, obj.status, -1)
         db.delete(obj)
         db.commit()
+        crud.invalidate_counselor_dashboard(obj.counselor_id)
         return True
     return False
 
 def get_admin_dashboard_data(db: Session):
-    active_users = db.query(User).filter(User.role != RoleEnum.admin).count()
+    # Reads only the rollup tables, so the cost does not grow with history.
+    active_users = db.query(func.coalesce(func.sum(RoleCount.count), 0)).filter(
+        RoleCount.role != RoleEnum.admin
+    ).scalar()
 
     last_week = datetime.utcnow() - timedelta(days=7)
-    done_appointments = db.query(Appointment).filter(
-        Appointment.status == AppointmentStatus.approved,
-        Appointment.date >= last_week.date()
-    ).count()
+    done_appointments = db.query(func.coalesce(func.sum(AppointmentDailyCount.count), 0)).filter(
+        AppointmentDailyCount.status == AppointmentStatus.approved,
+        AppointmentDailyCount.date >= last_week.date()
+    ).scalar()
 
     top_counselors = (
         db.query(
             User.firstname,
             User.lastname,
-            func.count(Appointment.id).label("session_count")
+            CounselorAppointmentTotal.count.label("session_count")
         )
-        .join(Counselor, Counselor.user_id == User.userid)
-        .join(Appointment, Appointment.counselor_id == Counselor.counselor_id)
-        .filter(Appointment.status == AppointmentStatus.approved)
-        .group_by(User.userid)
-        .order_by(func.count(Appointment.id).desc())
+        .join(Counselor, Counselor.counselor_id == CounselorAppointmentTotal.counselor_id)
+        .join(User, User.userid == Counselor.user_id)
+        .filter(CounselorAppointmentTotal.status == AppointmentStatus.approved, CounselorAppointmentTotal.count > 0)
+        .order_by(CounselorAppointmentTotal.count.desc())
         .limit(5)
         .all()
     )
@@ -1,67 +1,171 @@
+from sqlalchemy import or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from app import models
-from datetime import datetime
+from datetime import date, datetime, time
 from typing import Optional
 from app.utils.datetime import to_jalali_str
+from app.utils.pagination import decode_cursor, paginate
 from app.models import Appointment, Notification
 from app.routers.notifications import manager
+from .public_crud import invalidate_counselor_profile
+from .counselors_crud import invalidate_counselor_dashboard
+from .rollups_crud import record_appointment, record_appointment_async
+from .availability_crud import has_started, not_started, slot_times, template_applies
+from .timeslots_crud import is_range_overlap
+from app.utils.sql import dialect_insert
 import asyncio
 
-async def create_appointment(db: Session, student_id: int, slot_id: int, notes: Optional[str] = None):
-    slot = db.query(models.AvailableTimeSlot).filter(models.AvailableTimeSlot.id == slot_id).first()
-    if not slot or slot.is_reserved:
+def _slot_range_column(column):
+    return select(column).where(
+        models.CounselorTimeRange.id == models.AvailableTimeSlot.range_id
+    ).scalar_subquery()
+
+async def reserve_template_slot(db: AsyncSession, template_id: int, day, start_time) -> int:
+    """Materialize one slot of a weekly template and return its id, without reserving it.
+
+    The range spans just this slot. It and the slot row are upserted on
+    (template_id, date, from_time) and (range_id, start_time), so concurrent
+    bookings of the same virtual slot end up with the same row and
+    create_appointment lets only one of them reserve it. Nothing is
+    committed here.
+    """
+    template = await db.get(models.WeeklyAvailabilityTemplate, template_id)
+    if not template or not template_applies(template, day) or has_started(day, start_time):
+        raise HTTPException(400, "Slot not available")
+    end_time = dict(slot_times(day, template.from_time, template.to_time, template.duration)).get(start_time)
+    if end_time is None:
+        raise HTTPException(400, "Slot not available")
+
+    # A stored slot from an ordinary range already covers this time.
+    clash = (await db.execute(
+        select(models.AvailableTimeSlot.id)
+        .join(models.CounselorTimeRange, models.AvailableTimeSlot.range_id == models.CounselorTimeRange.id)
+        .where(
+            models.CounselorTimeRange.counselor_id == template.counselor_id,
+            models.CounselorTimeRange.date == day,
+            or_(models.CounselorTimeRange.template_id.is_(None), models.CounselorTimeRange.template_id != template.id),
+            models.AvailableTimeSlot.start_time < end_time,
+            models.AvailableTimeSlot.end_time > start_time,
+        )
+        .limit(1)
+    )).first()
+    if clash:
+        raise HTTPException(400, "Slot not available")
+
+    # DO UPDATE with an unchanged value (rather than DO NOTHING) so RETURNING yields the existing row too.
+    insert_range = dialect_insert(db, models.CounselorTimeRange).values(
+        counselor_id=template.counselor_id, date=day, from_time=start_time,
+        to_time=end_time, duration=template.duration, template_id=template.id,
+    )
+    try:
+        range_id = (await db.execute(
+            insert_range.on_conflict_do_update(
+                index_elements=["template_id", "date", "from_time"],
+                set_={"template_id": insert_range.excluded.template_id},
+            ).returning(models.CounselorTimeRange.id)
+        )).scalar_one()
+    except IntegrityError as exc:
+        # An ordinary range added since the check above; PostgreSQL only.
+        await db.rollback()
+        if is_range_overlap(exc):
+            raise HTTPException(400, "Slot not available")
+        raise
+    insert_slot = dialect_insert(db, models.AvailableTimeSlot).values(
+        range_id=range_id, date=day, start_time=start_time, end_time=end_time, is_reserved=False,
+    )
+    return (await db.execute(
+        insert_slot.on_conflict_do_update(
+            index_elements=["range_id", "start_time"], set_={"start_time": insert_slot.excluded.start_time}
+        ).returning(models.AvailableTimeSlot.id)
+    )).scalar_one()
+
+async def create_appointment(db: AsyncSession, student_id: int, slot_id: int, notes: Optional[str] = None):
+    # Claim the slot in one conditional UPDATE: of any number of concurrent
+    # bookings only one matches `is_reserved IS NOT true`, and the row lock
+    # holds the others until it commits. The unique constraint on
+    # appointments.slot_id backs this up. A slot that has started is never claimed.
+    slot = (await db.execute(
+        update(models.AvailableTimeSlot)
+        .where(
+            models.AvailableTimeSlot.id == slot_id,
+            models.AvailableTimeSlot.is_reserved.isnot(True),
+            not_started(models.AvailableTimeSlot.date, models.AvailableTimeSlot.start_time),
+        )
+        .values(is_reserved=True)
+        .returning(
+            models.AvailableTimeSlot.start_time,
+            models.AvailableTimeSlot.end_time,
+            models.AvailableTimeSlot.date,
+            _slot_range_column(models.CounselorTimeRange.counselor_id).label("counselor_id"),
+        )
+    )).first()
+    if slot is None:
         raise HTTPException(400, "Slot not available")
-    range = db.query(models.CounselorTimeRange).filter(models.CounselorTimeRange.id == slot.range_id).first()
-    counselor_id = slot.time_range.counselor_id
+    counselor_id = slot.counselor_id
     appointment = models.Appointment(
         student_id=student_id,
         counselor_id=counselor_id,
-        slot_id=slot.id,
-        date=slot.time_range.date,
+        slot_id=slot_id,
+        date=slot.date,
         time=slot.start_time,
         status=models.AppointmentStatus.pending,
         notes=notes
     )
-    slot = db.query(models.AvailableTimeSlot).filter(models.AvailableTimeSlot.id == appointment.slot_id).first()
-    slot.is_reserved = True
-    
+
     db.add(appointment)
-    db.commit()
-    db.refresh(appointment)
-    
-    student = db.query(models.Student).filter(models.Student.student_id == student_id).first()
-    student_user = db.query(models.User).filter(models.User.userid == student.user_id).first()
-    counselor = db.query(models.Counselor).filter(models.Counselor.counselor_id == counselor_id).first()
-    user_id = counselor.user_id
-    jalali_date = to_jalali_str(range.date)
+    await record_appointment_async(db, counselor_id, slot.date, models.AppointmentStatus.pending)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(400, "Slot not available")
+    invalidate_counselor_profile(counselor_id)
+    invalidate_counselor_dashboard(counselor_id)
+
+    student_user = (await db.execute(
+        select(models.User)
+        .join(models.Student, models.Student.user_id == models.User.userid)
+        .where(models.Student.student_id == student_id)
+    )).scalar_one()
+    user_id = (await db.execute(
+        select(models.Counselor.user_id).where(models.Counselor.counselor_id == counselor_id)
+    )).scalar_one()
+    jalali_date = to_jalali_str(slot.date)
     message = f"دانش‌آموز {student_user.firstname} {student_user.lastname} یک جلسه برای تاریخ {jalali_date} ساعت {slot.end_time} رزرو کرده است."
     
     await manager.send_personal_message(message, user_id)
     
     db_notification = Notification(user_id=user_id, message=message)
     db.add(db_notification)
-    db.commit()
+    await db.commit()
     
     return appointment
 
-async def approve_appointment(db: Session, appointment_id: int):
-    appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
+async def approve_appointment(db: AsyncSession, appointment_id: int):
+    appointment = await db.get(models.Appointment, appointment_id)
     if not appointment:
         raise HTTPException(404, "Appointment not found")
 
+    if appointment.status != models.AppointmentStatus.approved:
+        await record_appointment_async(db, appointment.counselor_id, appointment.date, appointment.status, -1)
+        await record_appointment_async(db, appointment.counselor_id, appointment.date, models.AppointmentStatus.approved)
     appointment.status = models.AppointmentStatus.approved
 
-    db.commit()
-    db.refresh(appointment)
-
-    student = db.query(models.Student).filter_by(student_id=appointment.student_id).first()
-    counselor = db.query(models.Counselor).filter_by(counselor_id=appointment.counselor_id).first()
-
-    student_user = student.user
-    counselor_user = counselor.user
+    await db.commit()
+    await db.refresh(appointment)
+    invalidate_counselor_dashboard(appointment.counselor_id)
 
-    user_id = student.user_id
+    user_id = (await db.execute(
+        select(models.Student.user_id).where(models.Student.student_id == appointment.student_id)
+    )).scalar_one()
+    counselor_user = (await db.execute(
+        select(models.User)
+        .join(models.Counselor, models.Counselor.user_id == models.User.userid)
+        .where(models.Counselor.counselor_id == appointment.counselor_id)
+    )).scalar_one()
 
     message = (
         f"جلسه شما با مشاور {counselor_user.firstname} {counselor_user.lastname} "
@@ -71,7 +175,7 @@ async def approve_appointment(db: Session, appointment_id: int):
 
     db_notification = models.Notification(user_id=user_id, message=message)
     db.add(db_notification)
-    db.commit()
+    await db.commit()
 
     return appointment
 
@@ -79,9 +183,18 @@ def cancel_appointment(db: Session, appointment_id: int):
     appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
     if not appointment:
         raise HTTPException(404, "Appointment not found")
-    appointment.slot.is_reserved = False
+    slot = appointment.slot
+    counselor_id = appointment.counselor_id
+    record_appointment(db, counselor_id, appointment.date, appointment.status, -1)
     db.delete(appointment)
+    if slot.time_range.template_id is not None:
+        # The slot goes back to being virtual; its range would still block ordinary ranges.
+        db.delete(slot.time_range)
+    else:
+        slot.is_reserved = False
     db.commit()
+    invalidate_counselor_profile(counselor_id)
+    invalidate_counselor_dashboard(counselor_id)
     return True
 
 
@@ -92,24 +205,103 @@ def get_appointments_by_status(db: Session, counselor_user_id: int, status: mode
     counselor = db.query(models.Counselor).filter(models.Counselor.user_id == counselor_user_id).first()
     if not counselor:
         return []
+    return get_counselor_appointments_by_status(db, counselor.counselor_id, status)
 
-    appointments = db.query(models.Appointment, models.Student, models.User).join(models.Student, models.Appointment.student_id == models.Student.student_id) \
+def _counselor_appointments_query(db: Session, counselor_id: int, status: models.AppointmentStatus):
+    # The slot is joined for end_time so no row lazy-loads it.
+    return db.query(
+        models.Appointment.id,
+        models.Appointment.student_id,
+        models.User.firstname,
+        models.User.lastname,
+        models.Appointment.date,
+        models.Appointment.time,
+        models.AvailableTimeSlot.end_time,
+    ).join(models.Student, models.Appointment.student_id == models.Student.student_id) \
         .join(models.User, models.Student.user_id == models.User.userid) \
+        .join(models.AvailableTimeSlot, models.Appointment.slot_id == models.AvailableTimeSlot.id) \
         .filter(
-            models.Appointment.counselor_id == counselor.counselor_id,
+            models.Appointment.counselor_id == counselor_id,
             models.Appointment.status == status
-        ).all()
-
-    result = []
-    for app, student, user in appointments:
-        result.append({
-            "appointment_id": app.id,
-            "student_id": app.student_id,
-            "firstname": user.firstname,
-            "lastname": user.lastname,
-            "date": to_jalali_str(app.date),
-            "start_time": app.time,
-            "end_time": app.slot.end_time 
-        })
-        print(app.status)
-    return result
+        )
+
+def _appointment_item(row):
+    return {
+        "appointment_id": row.id,
+        "student_id": row.student_id,
+        "firstname": row.firstname,
+        "lastname": row.lastname,
+        "date": to_jalali_str(row.date),
+        "start_time": row.time,
+        "end_time": row.end_time
+    }
+
+def get_counselor_appointments_by_status(db: Session, counselor_id: int, status: models.AppointmentStatus):
+    rows = _counselor_appointments_query(db, counselor_id, status).order_by(
+        models.Appointment.date, models.Appointment.time, models.Appointment.id
+    ).all()
+    return [_appointment_item(row) for row in rows]
+
+def get_counselor_appointments_page(
+    db: Session,
+    counselor_id: int,
+    status: models.AppointmentStatus,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    descending: bool = False,
+    limit: int = 50,
+    cursor: str | None = None,
+):
+    """One page of a counselor's appointments in a status, keyed by (date, time, id)."""
+    query = _counselor_appointments_query(db, counselor_id, status)
+    if date_from is not None:
+        query = query.filter(models.Appointment.date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.Appointment.date <= date_to)
+    rows, next_cursor = _appointments_page(query, descending, limit, cursor)
+    return [_appointment_item(row) for row in rows], next_cursor
+
+def _appointments_page(query, descending: bool, limit: int, cursor: str | None):
+    """Keyset-page a query over Appointment by (date, time, id); rows must carry those three as attributes."""
+    columns = (models.Appointment.date, models.Appointment.time, models.Appointment.id)
+    if cursor:
+        after = decode_cursor(cursor, date.fromisoformat, time.fromisoformat, int)
+        query = query.filter(tuple_(*columns) < after if descending else tuple_(*columns) > after)
+    rows = query.order_by(*(c.desc() if descending else c for c in columns)).limit(limit + 1).all()
+    return paginate(rows, limit, lambda r: (r.date, r.time, r.id))
+
+def get_student_appointments_page(db: Session, student_id: int, upcoming: bool = True, limit: int = 20,
+                                  cursor: str | None = None):
+    """A student's appointments from today on (soonest first), or before today (latest first)."""
+    counselor_user = models.User
+    query = db.query(
+        models.Appointment.id,
+        models.Appointment.counselor_id,
+        counselor_user.firstname,
+        counselor_user.lastname,
+        models.Appointment.date,
+        models.Appointment.time,
+        models.AvailableTimeSlot.end_time,
+        models.Appointment.status,
+        models.Appointment.notes,
+    ).join(models.Counselor, models.Appointment.counselor_id == models.Counselor.counselor_id) \
+        .join(counselor_user, models.Counselor.user_id == counselor_user.userid) \
+        .join(models.AvailableTimeSlot, models.Appointment.slot_id == models.AvailableTimeSlot.id) \
+        .filter(models.Appointment.student_id == student_id)
+    today = date.today()
+    query = query.filter(models.Appointment.date >= today if upcoming else models.Appointment.date < today)
+    rows, next_cursor = _appointments_page(query, not upcoming, limit, cursor)
+    return [
+        {
+            "appointment_id": row.id,
+            "counselor_id": row.counselor_id,
+            "counselor_firstname": row.firstname,
+            "counselor_lastname": row.lastname,
+            "date": to_jalali_str(row.date),
+            "start_time": row.time,
+            "end_time": row.end_time,
+            "status": row.status,
+            "notes": row.notes,
+        }
+        for row in rows
+    ], next_cursor
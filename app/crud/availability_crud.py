@@ -0,0 +1,124 @@
+"""Slot arithmetic shared by time ranges, weekly templates and the public profile.
+
+A weekly template is never expanded into rows up front: its free slots are
+computed here for a window of days, minus whatever slot rows the counselor
+already has on those days, and a row is only written when one is booked.
+"""
+from datetime import date, datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import AvailableTimeSlot, CounselorTimeRange, WeeklyAvailabilityTemplate
+
+settings = get_settings()
+
+# Longest date window a caller may ask free slots for.
+MAX_SLOT_WINDOW_DAYS = 366
+
+
+def jalali_weekday(day) -> int:
+    # Python counts Monday as 0; the Jalali week starts on Saturday.
+    return (day.weekday() + 2) % 7
+
+def has_started(day, start_time) -> bool:
+    now = datetime.now()
+    return day < now.date() or (day == now.date() and start_time < now.time())
+
+def not_started(date_column, time_column):
+    """SQL condition: the slot on `date_column` at `time_column` has not started yet."""
+    now = datetime.now()
+    return or_(date_column > now.date(), and_(date_column == now.date(), time_column >= now.time()))
+
+def slot_window(date_from=None, date_to=None, include_past: bool = False):
+    """The (start, end) days to list slots for; past days only with `include_past`.
+
+    Without a date_to the window is SLOT_WINDOW_DAYS long.
+    """
+    if date_from is not None and date_to is not None and date_to < date_from:
+        raise HTTPException(400, "date_to is before date_from")
+    today = date.today()
+    start = (date_from or today) if include_past else max(date_from or today, today)
+    end = date_to or start + timedelta(days=settings.slot_window_days - 1)
+    if (end - start).days >= MAX_SLOT_WINDOW_DAYS:
+        raise HTTPException(400, f"Date window is longer than {MAX_SLOT_WINDOW_DAYS} days")
+    return start, end
+
+def slot_times(date, from_time, to_time, duration_minutes: int):
+    current = datetime.combine(date, from_time)
+    end = datetime.combine(date, to_time)
+    step = timedelta(minutes=duration_minutes)
+    times = []
+    while current + step <= end:
+        times.append((current.time(), (current + step).time()))
+        current += step
+    return times
+
+def template_applies(template, day) -> bool:
+    return (
+        jalali_weekday(day) == template.weekday
+        and template.valid_from <= day
+        and (template.valid_until is None or day <= template.valid_until)
+    )
+
+def expand_templates(templates, taken, start, end):
+    """Virtual free slots of `templates` from `start` to `end`, skipping any time in `taken`.
+
+    `taken` is an iterable of (date, start_time, end_time) for slot rows that
+    already exist, booked or not.
+    """
+    busy = {}
+    for day, slot_start, slot_end in taken:
+        busy.setdefault(day, []).append((slot_start, slot_end))
+    by_weekday = {}
+    for template in sorted(templates, key=lambda t: t.from_time):
+        by_weekday.setdefault(template.weekday, []).append(template)
+
+    slots = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        for template in by_weekday.get(jalali_weekday(day), ()):
+            if not template_applies(template, day):
+                continue
+            for slot_start, slot_end in slot_times(day, template.from_time, template.to_time, template.duration):
+                if any(b_start < slot_end and b_end > slot_start for b_start, b_end in busy.get(day, ())):
+                    continue
+                slots.append({
+                    "template_id": template.id, "date": day, "start_time": slot_start, "end_time": slot_end,
+                })
+    return slots
+
+def counselors_template_slots(db: Session, templates, start, end):
+    """Virtual free slots of `templates`, which may belong to several counselors.
+
+    Each slot also carries its counselor_id. One query, for the slot rows the
+    counselors already have from `start` to `end`.
+    """
+    by_counselor = {}
+    for template in templates:
+        by_counselor.setdefault(template.counselor_id, []).append(template)
+    if not by_counselor:
+        return []
+    taken = {}
+    for counselor_id, day, slot_start, slot_end in db.query(
+        CounselorTimeRange.counselor_id, AvailableTimeSlot.date, AvailableTimeSlot.start_time, AvailableTimeSlot.end_time
+    ).join(
+        AvailableTimeSlot, AvailableTimeSlot.range_id == CounselorTimeRange.id
+    ).filter(
+        CounselorTimeRange.counselor_id.in_(by_counselor),
+        AvailableTimeSlot.date.between(start, end),
+    ):
+        taken.setdefault(counselor_id, []).append((day, slot_start, slot_end))
+    return [
+        {**slot, "counselor_id": counselor_id}
+        for counselor_id, counselor_templates in by_counselor.items()
+        for slot in expand_templates(counselor_templates, taken.get(counselor_id, ()), start, end)
+    ]
+
+def template_free_slots(db: Session, counselor_id: int, start, end):
+    templates = db.query(WeeklyAvailabilityTemplate).filter(
+        WeeklyAvailabilityTemplate.counselor_id == counselor_id,
+        WeeklyAvailabilityTemplate.valid_from <= end,
+        or_(WeeklyAvailabilityTemplate.valid_until.is_(None), WeeklyAvailabilityTemplate.valid_until >= start),
+    ).all()
+    return counselors_template_slots(db, templates, start, end)
@@ -1,12 +1,20 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app import models, schemas
-from .users_crud import get_user_by_id, update_user_profile
+from app.principal import Principal
+from .users_crud import get_user_by_id, apply_user_update
+from .public_crud import invalidate_counselor
 from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 from datetime import datetime, timedelta, date
 from sqlalchemy.orm import joinedload, Session
-from sqlalchemy import func
+from sqlalchemy import distinct, func
+from app.config import get_settings
+from app.utils.cache import TTLCache
+
+settings = get_settings()
+
+counselor_dashboard_cache = TTLCache(ttl=settings.counselor_dashboard_ttl)
 
 
 
@@ -35,12 +43,9 @@ def get_counselor_by_id_service(db: Session, counselor_id: int) -> schemas.Couns
         profile_image_url=user.profile_image_url
     )
 
-def get_counselor_info(db: Session, payload: dict) -> schemas.CounselorOut:
-    user_id = int(payload.get("sub"))
-    user = get_user_by_id(db, user_id)
-    counselor = get_counselor_by_user_id(db, user_id)
-    if not counselor:
-        raise HTTPException(status_code=404, detail="Counselor not found")
+def get_counselor_info(principal: Principal) -> schemas.CounselorOut:
+    user = principal.user
+    counselor = principal.require_counselor()
 
     return schemas.CounselorOut(
         firstname=user.firstname,
@@ -59,33 +64,34 @@ def is_admin(role: schemas.RoleEnum) -> bool:
 def is_own_data(user_id: int, data_id: int) -> bool:
     return user_id == data_id
 
+def apply_counselor_update(counselor: models.Counselor, counselor_in: schemas.CounselorUpdate) -> models.Counselor:
+    if counselor_in.phone_number:
+        counselor.phone_number = counselor_in.phone_number
+    if counselor_in.province:
+        counselor.province = counselor_in.province
+    if counselor_in.city:
+        counselor.city = counselor_in.city
+    if counselor_in.department:
+        counselor.department = counselor_in.department
+    return counselor
+
 def update_counselor_profile(db: Session, user_id: int, counselor_in: schemas.CounselorUpdate):
     counselor = db.query(models.Counselor).filter(models.Counselor.user_id == user_id).first()
     if counselor:
-        if counselor_in.phone_number:
-            counselor.phone_number = counselor_in.phone_number
-        if counselor_in.province:
-            counselor.province = counselor_in.province
-        if counselor_in.city:
-            counselor.city = counselor_in.city
-        if counselor_in.department:
-            counselor.department = counselor_in.department
+        apply_counselor_update(counselor, counselor_in)
         db.commit()
         db.refresh(counselor)
+        invalidate_counselor(counselor.counselor_id)
         return counselor
     return None
 
-def update_counselor_profile_service(db: Session, payload: dict, counselor_in: schemas.CounselorUpdate) -> schemas.CounselorUpdate:
-    user_id = int(payload.get("sub"))
-    user = get_user_by_id(db, user_id)
-    counselor = get_counselor_by_user_id(db, user_id)
-    if not counselor:
-        raise HTTPException(status_code=404, detail="Counselor not found")
+def update_counselor_profile_service(db: Session, principal: Principal, counselor_in: schemas.CounselorUpdate) -> schemas.CounselorUpdate:
+    counselor = principal.require_counselor()
 
-    if is_admin(user.role) or is_own_data(user_id, counselor.user_id):
-        counselor = update_counselor_profile(db, counselor.user_id, counselor_in)
-        user = update_user_profile(db, user_id, counselor_in)
-        return schemas.CounselorUpdate(
+    if is_admin(principal.role) or is_own_data(principal.user_id, counselor.user_id):
+        user = apply_user_update(principal.user, counselor_in)
+        apply_counselor_update(counselor, counselor_in)
+        result = schemas.CounselorUpdate(
             firstname=user.firstname,
             lastname=user.lastname,
             email=user.email,
@@ -94,6 +100,9 @@ def update_counselor_profile_service(db: Session, payload: dict, counselor_in: s
             city=counselor.city,
             department=counselor.department if counselor.department else None
         )
+        db.commit()
+        invalidate_counselor(counselor.counselor_id)
+        return result
     else:
         raise HTTPException(status_code=403, detail="Permission denied")
 
@@ -102,6 +111,7 @@ def delete_counselor(db: Session, counselor_id: int) -> bool:
     if counselor:
         db.delete(counselor)
         db.commit()
+        invalidate_counselor(counselor_id)
         return True
     return False
 
@@ -112,15 +122,7 @@ def get_students_of_counselor(
     days_since_approved: int = 30,
     days_since_plan: int = 30,
 ):
-  
-    counselor = (
-        db.query(models.Counselor)
-        .filter(models.Counselor.counselor_id == counselor_id)
-        .first()
-    )
-    if not counselor:
-        raise HTTPException(status_code=404, detail="Counselor not found")
-
+    # An unknown counselor_id simply matches no students, so no existence check is needed.
     today = date.today()
     appt_cutoff = today - timedelta(days=days_since_approved)
     plan_cutoff_dt = datetime.utcnow() - timedelta(days=days_since_plan)
@@ -130,7 +132,7 @@ def get_students_of_counselor(
             func.max(models.Appointment.date).label("last_date"),
         )
         .filter(
-            models.Appointment.counselor_id == counselor.counselor_id,
+            models.Appointment.counselor_id == counselor_id,
             models.Appointment.status == models.AppointmentStatus.approved,
         )
         .group_by(models.Appointment.student_id)
@@ -148,7 +150,7 @@ def get_students_of_counselor(
         sid
         for (sid,) in db.query(models.StudyPlan.student_id)
         .filter(
-            models.StudyPlan.counselor_id == counselor.counselor_id,
+            models.StudyPlan.counselor_id == counselor_id,
             models.StudyPlan.is_finalized == False,  
         )
         .distinct()
@@ -158,7 +160,7 @@ def get_students_of_counselor(
         sid
         for (sid,) in db.query(models.StudyPlan.student_id)
         .filter(
-            models.StudyPlan.counselor_id == counselor.counselor_id,
+            models.StudyPlan.counselor_id == counselor_id,
             models.StudyPlan.created_at >= plan_cutoff_dt,
         )
         .distinct()
@@ -197,38 +199,37 @@ def get_students_of_counselor(
     return out
 
 def get_counselor_dashboard_data(db: Session, counselor_user_id: int):
-
     counselor = db.query(models.Counselor).filter(models.Counselor.user_id == counselor_user_id).first()
     if not counselor:
         return {"error": "Counselor not found"}
+    return get_counselor_dashboard(db, counselor.counselor_id)
 
-    now = datetime.utcnow()
-    month_ago = now - timedelta(days=30)
-
-    past_sessions = db.query(models.Appointment).filter(
-        models.Appointment.counselor_id == counselor.counselor_id,
-        models.Appointment.status == "approved",
-        models.Appointment.date >= month_ago.date(),
-        models.Appointment.date <= now.date()
-    ).count()
-
-    future_approved = db.query(models.Appointment).filter(
-        models.Appointment.counselor_id == counselor.counselor_id,
-        models.Appointment.status == "approved",
-        models.Appointment.date > now.date()
-    ).count()
+def get_counselor_dashboard(db: Session, counselor_id: int):
+    return counselor_dashboard_cache.get_or_set(
+        counselor_id, lambda: get_counselor_dashboard_stats(db, counselor_id)
+    )
 
+def get_counselor_dashboard_stats(db: Session, counselor_id: int):
+    today = datetime.utcnow().date()
+    month_ago = today - timedelta(days=30)
+    approved = models.Appointment.status == models.AppointmentStatus.approved
 
-    student_count = db.query(models.Appointment.student_id).filter(
-        models.Appointment.counselor_id == counselor.counselor_id
-    ).distinct().count()
+    # One pass over the counselor's appointments, served by ix_appointments_counselor_status_date.
+    recent_sessions, upcoming_approved, unique_students = db.query(
+        func.count().filter(approved, models.Appointment.date >= month_ago, models.Appointment.date <= today),
+        func.count().filter(approved, models.Appointment.date > today),
+        func.count(distinct(models.Appointment.student_id)),
+    ).filter(models.Appointment.counselor_id == counselor_id).one()
 
     return {
-        "recent_sessions": past_sessions,
-        "upcoming_approved_requests": future_approved,
-        "unique_students": student_count
+        "recent_sessions": recent_sessions,
+        "upcoming_approved_requests": upcoming_approved,
+        "unique_students": unique_students
     }
 
+def invalidate_counselor_dashboard(counselor_id: int):
+    counselor_dashboard_cache.invalidate(counselor_id)
+
 def get_student_details(db: Session, student_id: int):
     student = (
         db.query(models.Student, models.User)
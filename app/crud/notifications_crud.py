@@ -16,7 +16,7 @@ async def create_notification(db: Session, notification: NotificationCreate):
     return db_item
 
 def get_user_notifications(db: Session, user_id: int):
-    return db.query(Notification).filter(Notification.user_id == user_id).all()
+    return db.query(*Notification.__table__.columns).filter(Notification.user_id == user_id).all()
 
 def mark_as_read(db: Session, notification_id: int):
     notification = db.query(Notification).filter(Notification.id == notification_id).first()
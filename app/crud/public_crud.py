@@ -4,6 +4,31 @@ from app import models, schemas
 from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException
 from app.utils.datetime import to_jalali_str
+from app.crud.availability_crud import (
+    counselors_template_slots, has_started, not_started, slot_window, template_free_slots,
+)
+from app.utils.pagination import decode_cursor, paginate
+from sqlalchemy import and_, func, or_, tuple_
+from datetime import date, datetime, time, timedelta
+from app.utils.cache import CachedPayload, TTLCache
+from app.config import get_settings
+from pydantic import TypeAdapter
+
+settings = get_settings()
+
+# Newest comments embedded in the public profile; older ones come from the feedback endpoint.
+PROFILE_FEEDBACK_LIMIT = 5
+
+# The caches below are filled from whatever session the caller passes, so
+# callers pass a primary session (get_db): a lagging replica's rows would
+# otherwise be cached for the whole TTL, e.g. a slot booked a moment ago.
+_directory_adapter = TypeAdapter(list[schemas.CounselorsDisplay])
+counselor_directory_cache = TTLCache(ttl=settings.counselor_directory_ttl, maxsize=1)
+
+_profile_adapter = TypeAdapter(schemas.PublicCounselorOut)
+counselor_profile_cache = TTLCache(
+    ttl=settings.counselor_profile_ttl, maxsize=settings.counselor_profile_cache_size
+)
 
 
 def get_all_counselors(db: Session):
@@ -17,8 +42,44 @@ def get_all_counselors(db: Session):
         .join(models.Counselor, models.User.userid == models.Counselor.user_id)
         .filter(models.User.role == schemas.RoleEnum.counselor)
         .all()
-    ) 
-    
+    )
+
+
+def get_counselor_directory(db: Session) -> CachedPayload:
+    """The serialized counselor directory, served from memory until a counselor changes."""
+    def load():
+        rows = _directory_adapter.validate_python(get_all_counselors(db), from_attributes=True)
+        return CachedPayload(_directory_adapter.dump_json(rows), empty=not rows)
+    return counselor_directory_cache.get_or_set("directory", load)
+
+
+def invalidate_counselor_directory():
+    counselor_directory_cache.invalidate("directory")
+
+
+def invalidate_counselor_profile(counselor_id: int):
+    """Drop one counselor's cached public profiles, for every date window, after its slots or feedback change."""
+    counselor_profile_cache.invalidate_where(lambda key: key[0] == counselor_id)
+
+
+def invalidate_counselor(counselor_id: int | None = None):
+    """Drop the directory and the counselor's profile after a profile change.
+
+    Without a counselor_id every cached profile is dropped.
+    """
+    invalidate_counselor_directory()
+    if counselor_id is None:
+        counselor_profile_cache.clear()
+    else:
+        invalidate_counselor_profile(counselor_id)
+
+
+def invalidate_counselor_user(user: models.User):
+    counselor = user.counselor
+    if counselor is not None:
+        invalidate_counselor(counselor.counselor_id)
+
+
 def leave_feedback(db: Session, student_user_id: int, counselor_id: int, rating: int = None, comment: str = None):
     student = db.query(models.Student).filter(models.Student.user_id == student_user_id).first()
     if not student:
@@ -40,12 +101,164 @@ def leave_feedback(db: Session, student_user_id: int, counselor_id: int, rating:
         comment=comment
     )
     db.add(feedback)
+    if rating is not None:
+        # Incremented in SQL so concurrent feedback cannot lose an update.
+        db.query(models.Counselor).filter(models.Counselor.counselor_id == counselor_id).update(
+            {
+                models.Counselor.rating_sum: models.Counselor.rating_sum + rating,
+                models.Counselor.rating_count: models.Counselor.rating_count + 1,
+            },
+            synchronize_session=False,
+        )
     db.commit()
     db.refresh(feedback)
+    invalidate_counselor_profile(counselor_id)
     return feedback
 
 
-def get_public_counselor_info(db: Session, counselor_id: int):
+def rating_average(counselor: models.Counselor) -> float | None:
+    if not counselor.rating_count:
+        return None
+    return round(counselor.rating_sum / counselor.rating_count, 2)
+
+
+def remove_student_ratings(db: Session, student_id: int) -> list[int]:
+    """Take a student's ratings out of the counselor aggregates before the student is deleted.
+
+    The feedback rows themselves go with the ON DELETE CASCADE. Returns the
+    affected counselor ids so their cached profiles can be dropped after commit.
+    """
+    rows = db.query(
+        models.Feedback.counselor_id, func.sum(models.Feedback.rating), func.count(models.Feedback.rating)
+    ).filter(
+        models.Feedback.student_id == student_id, models.Feedback.rating.isnot(None)
+    ).group_by(models.Feedback.counselor_id).all()
+    for counselor_id, total, count in rows:
+        db.query(models.Counselor).filter(models.Counselor.counselor_id == counselor_id).update(
+            {
+                models.Counselor.rating_sum: models.Counselor.rating_sum - total,
+                models.Counselor.rating_count: models.Counselor.rating_count - count,
+            },
+            synchronize_session=False,
+        )
+    return [counselor_id for counselor_id, _, _ in rows]
+
+
+def get_feedback_page(db: Session, counselor_id: int, limit: int = 20, cursor: str | None = None):
+    """Newest-first feedback for a counselor, paged by (date_submitted, feedback_id)."""
+    query = db.query(models.Feedback).filter(models.Feedback.counselor_id == counselor_id)
+    if cursor:
+        submitted, feedback_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        query = query.filter(or_(
+            models.Feedback.date_submitted < submitted,
+            and_(models.Feedback.date_submitted == submitted, models.Feedback.feedback_id < feedback_id),
+        ))
+    rows = query.order_by(
+        models.Feedback.date_submitted.desc(), models.Feedback.feedback_id.desc()
+    ).limit(limit + 1).all()
+    return paginate(rows, limit, lambda f: (f.date_submitted, f.feedback_id))
+
+
+def search_availability(
+    db: Session,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    province: str | None = None,
+    city: str | None = None,
+    department: str | None = None,
+    time_from: time | None = None,
+    time_to: time | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+):
+    """Free slots across all counselors, earliest first, paged by (date, start_time, counselor id).
+
+    Stored slots and the virtual slots of weekly templates are merged; a
+    counselor has at most one slot at a given time, so the key is unique.
+    Three queries: the stored slots, the matching templates, and the slot
+    rows their counselors already have.
+    """
+    start, end = slot_window(date_from, date_to)
+    after = decode_cursor(cursor, date.fromisoformat, time.fromisoformat, int) if cursor else None
+    slot, time_range, counselor = models.AvailableTimeSlot, models.CounselorTimeRange, models.Counselor
+    counselor_columns = (
+        counselor.counselor_id,
+        models.User.firstname,
+        models.User.lastname,
+        models.User.profile_image_url,
+        counselor.province,
+        counselor.city,
+        counselor.department,
+    )
+
+    def matching(query):
+        query = query.join(models.User, counselor.user_id == models.User.userid)
+        if province is not None:
+            query = query.filter(counselor.province == province)
+        if city is not None:
+            query = query.filter(counselor.city == city)
+        if department is not None:
+            query = query.filter(counselor.department == department)
+        return query
+
+    query = matching(db.query(
+        slot.id.label("slot_id"), *counselor_columns, slot.date, slot.start_time, slot.end_time,
+    ).join(
+        time_range, slot.range_id == time_range.id
+    ).join(
+        counselor, time_range.counselor_id == counselor.counselor_id
+    )).filter(
+        slot.is_reserved.isnot(True),
+        slot.date.between(start, end),
+        not_started(slot.date, slot.start_time),
+    )
+    if time_from is not None:
+        query = query.filter(slot.start_time >= time_from)
+    if time_to is not None:
+        query = query.filter(slot.end_time <= time_to)
+    if after:
+        query = query.filter(tuple_(slot.date, slot.start_time, counselor.counselor_id) > after)
+    slots = [
+        {**row._mapping, "template_id": None}
+        for row in query.order_by(slot.date, slot.start_time, counselor.counselor_id).limit(limit + 1)
+    ]
+
+    # Template slots past the last stored slot of a full page cannot make it onto the page.
+    template_end = min(end, date.today() + timedelta(days=settings.template_horizon_days - 1))
+    if len(slots) > limit:
+        template_end = min(template_end, slots[-1]["date"])
+    if template_end >= start:
+        template = models.WeeklyAvailabilityTemplate
+        rows = matching(db.query(template, *counselor_columns).join(
+            counselor, template.counselor_id == counselor.counselor_id
+        )).filter(
+            template.valid_from <= template_end,
+            or_(template.valid_until.is_(None), template.valid_until >= start),
+        ).all()
+        info = {row.counselor_id: row._mapping for row in rows}
+        for virtual in counselors_template_slots(db, [row[0] for row in rows], start, template_end):
+            key = (virtual["date"], virtual["start_time"], virtual["counselor_id"])
+            if has_started(virtual["date"], virtual["start_time"]):
+                continue
+            if time_from is not None and virtual["start_time"] < time_from:
+                continue
+            if time_to is not None and virtual["end_time"] > time_to:
+                continue
+            if after and key <= after:
+                continue
+            slots.append({
+                **{column.key: info[virtual["counselor_id"]][column.key] for column in counselor_columns},
+                "slot_id": None, "template_id": virtual["template_id"],
+                "date": virtual["date"], "start_time": virtual["start_time"], "end_time": virtual["end_time"],
+            })
+        slots.sort(key=lambda s: (s["date"], s["start_time"], s["counselor_id"]))
+
+    slots, next_cursor = paginate(slots[:limit + 1], limit, lambda s: (s["date"], s["start_time"], s["counselor_id"]))
+    items = [{**s, "date": to_jalali_str(s["date"])} for s in slots]
+    return items, next_cursor
+
+
+def get_public_counselor_info(db: Session, counselor_id: int, start: date | None = None, end: date | None = None):
     counselor = db.query(models.Counselor).options(joinedload(models.Counselor.user)).filter(
         models.Counselor.counselor_id == counselor_id
     ).first()
@@ -53,19 +266,22 @@ def get_public_counselor_info(db: Session, counselor_id: int):
     if not counselor:
         raise HTTPException(status_code=404, detail="Counselor not found")
 
+    start, end = slot_window(start, end)
     raw_slots = db.query(
         models.AvailableTimeSlot.id,
         models.AvailableTimeSlot.start_time,
         models.AvailableTimeSlot.end_time,
         models.AvailableTimeSlot.is_reserved,
-        models.CounselorTimeRange.date
+        models.AvailableTimeSlot.date
     ).join(
         models.CounselorTimeRange,
         models.AvailableTimeSlot.range_id == models.CounselorTimeRange.id
     ).filter(
         models.CounselorTimeRange.counselor_id == counselor.counselor_id,
-        models.AvailableTimeSlot.is_reserved == False
-    ).all()
+        models.AvailableTimeSlot.date.between(start, end),
+        not_started(models.AvailableTimeSlot.date, models.AvailableTimeSlot.start_time),
+        models.AvailableTimeSlot.is_reserved.isnot(True)
+    ).order_by(models.AvailableTimeSlot.date, models.AvailableTimeSlot.start_time).all()
 
     free_slots = [
         {
@@ -77,10 +293,22 @@ def get_public_counselor_info(db: Session, counselor_id: int):
         }
         for s in raw_slots
     ]
+    # Slots from weekly templates have no row yet; they are booked by template_id, date and start_time.
+    horizon_end = min(end, date.today() + timedelta(days=settings.template_horizon_days - 1))
+    free_slots += [
+        {
+            "id": None,
+            "template_id": s["template_id"],
+            "start_time": s["start_time"].strftime("%H:%M:%S"),
+            "end_time": s["end_time"].strftime("%H:%M:%S"),
+            "date": to_jalali_str(s["date"]),
+            "is_reserved": False
+        }
+        for s in template_free_slots(db, counselor.counselor_id, start, horizon_end)
+        if not has_started(s["date"], s["start_time"])
+    ]
 
-    feedbacks = db.query(models.Feedback).filter(
-        models.Feedback.counselor_id == counselor.counselor_id
-    ).all()
+    feedbacks, feedback_next_cursor = get_feedback_page(db, counselor.counselor_id, PROFILE_FEEDBACK_LIMIT)
 
     return {
         "counselor_id": counselor.counselor_id,
@@ -92,6 +320,22 @@ def get_public_counselor_info(db: Session, counselor_id: int):
         "province": counselor.province,
         "city": counselor.city,
         "department": counselor.department,
+        "rating_average": rating_average(counselor),
+        "rating_count": counselor.rating_count or 0,
         "feedbacks": feedbacks,
+        "feedback_next_cursor": feedback_next_cursor,
         "free_slots": free_slots
     }
+
+
+def get_public_counselor_view(db: Session, counselor_id: int, date_from: date | None = None,
+                              date_to: date | None = None) -> CachedPayload:
+    """The serialized public profile, cached per counselor and date window until its slots, feedback or profile change."""
+    start, end = slot_window(date_from, date_to)
+
+    def load():
+        view = _profile_adapter.validate_python(
+            get_public_counselor_info(db, counselor_id, start, end), from_attributes=True
+        )
+        return CachedPayload(_profile_adapter.dump_json(view))
+    return counselor_profile_cache.get_or_set((counselor_id, start, end), load)
@@ -0,0 +1,94 @@
+"""Rollup tables behind the admin dashboard.
+
+Every write that creates, deletes or changes the status of an appointment,
+or creates, deletes or re-roles a user, applies the matching delta here in
+the same transaction. `rebuild_rollups` recomputes everything from the base
+tables; run it once after the migration and whenever the rollups are in doubt:
+
+    python -m app.crud.rollups_crud
+"""
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.models import AppointmentDailyCount, CounselorAppointmentTotal, RoleCount
+from app.utils.sql import dialect_insert
+
+
+def _upsert(db, model, keys: dict, delta: int):
+    return dialect_insert(db, model).values(**keys, count=delta).on_conflict_do_update(
+        index_elements=list(keys), set_={"count": model.count + delta}
+    )
+
+
+def _appointment_changes(db, counselor_id: int, day, status: models.AppointmentStatus, delta: int):
+    return [
+        _upsert(db, AppointmentDailyCount, {"counselor_id": counselor_id, "date": day, "status": status}, delta),
+        _upsert(db, CounselorAppointmentTotal, {"counselor_id": counselor_id, "status": status}, delta),
+    ]
+
+
+def record_appointment(db: Session, counselor_id: int, day, status: models.AppointmentStatus, delta: int = 1):
+    for stmt in _appointment_changes(db, counselor_id, day, status, delta):
+        db.execute(stmt)
+
+
+async def record_appointment_async(db: AsyncSession, counselor_id: int, day, status: models.AppointmentStatus, delta: int = 1):
+    for stmt in _appointment_changes(db, counselor_id, day, status, delta):
+        await db.execute(stmt)
+
+
+def record_role(db: Session, role: models.RoleEnum, delta: int = 1):
+    db.execute(_upsert(db, RoleCount, {"role": role}, delta))
+
+
+def remove_appointments(db: Session, *criteria):
+    """Subtract appointments that are about to disappear through an ON DELETE CASCADE.
+
+    Returns the ids of their counselors, whose cached dashboards go stale.
+    """
+    rows = db.query(
+        models.Appointment.counselor_id, models.Appointment.date, models.Appointment.status, func.count()
+    ).filter(*criteria).group_by(
+        models.Appointment.counselor_id, models.Appointment.date, models.Appointment.status
+    ).all()
+    for counselor_id, day, status, count in rows:
+        record_appointment(db, counselor_id, day, status, -count)
+    return {counselor_id for counselor_id, _, _, _ in rows}
+
+
+def rebuild_rollups(db: Session):
+    db.execute(delete(AppointmentDailyCount))
+    db.execute(delete(CounselorAppointmentTotal))
+    db.execute(delete(RoleCount))
+    appointment = models.Appointment
+    db.execute(insert(AppointmentDailyCount).from_select(
+        ["counselor_id", "date", "status", "count"],
+        select(appointment.counselor_id, appointment.date, appointment.status, func.count())
+        .where(appointment.status.isnot(None))
+        .group_by(appointment.counselor_id, appointment.date, appointment.status),
+    ))
+    db.execute(insert(CounselorAppointmentTotal).from_select(
+        ["counselor_id", "status", "count"],
+        select(appointment.counselor_id, appointment.status, func.count())
+        .where(appointment.status.isnot(None))
+        .group_by(appointment.counselor_id, appointment.status),
+    ))
+    db.execute(insert(RoleCount).from_select(
+        ["role", "count"],
+        select(models.User.role, func.count()).group_by(models.User.role),
+    ))
+    db.commit()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+        print("appointment_daily_counts:", db.query(AppointmentDailyCount).count())
+        print("counselor_appointment_totals:", db.query(CounselorAppointmentTotal).count())
+        print("role_counts:", {role.value: count for role, count in db.query(RoleCount.role, RoleCount.count)})
+    finally:
+        db.close()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app import models, schemas, crud
+from app.principal import Principal
 from datetime import datetime, timedelta
 
 def get_student_by_user_id(db: Session, user_id: int) -> models.Student | None:
@@ -9,12 +10,9 @@ def get_student_by_user_id(db: Session, user_id: int) -> models.Student | None:
 def get_student_by_id(db: Session, student_id: int) -> models.Student | None:
     return db.query(models.Student).filter(models.Student.student_id == student_id).first()
 
-def get_student_info(db: Session, payload: dict) -> schemas.StudentOut:
-    user_id = int(payload.get("sub"))
-    user = crud.get_user_by_id(db, user_id)
-    student = get_student_by_user_id(db, user_id)
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+def get_student_info(principal: Principal) -> schemas.StudentOut:
+    user = principal.user
+    student = principal.require_student()
 
     return schemas.StudentOut(
         firstname=user.firstname,
@@ -31,23 +29,27 @@ def get_student_info(db: Session, payload: dict) -> schemas.StudentOut:
         profile_image_url=user.profile_image_url
     )
 
+def apply_student_update(student: models.Student, student_in: schemas.StudentUpdate) -> models.Student:
+    if student_in.phone_number:
+        student.phone_number = student_in.phone_number
+    if student_in.province:
+        student.province = student_in.province
+    if student_in.city:
+        student.city = student_in.city
+    if student_in.education_year:
+        student.educational_level = student_in.education_year
+    if student_in.field_of_study:
+        student.field_of_study = student_in.field_of_study
+    if student_in.semester_or_year:
+        student.semester_or_year = student_in.semester_or_year
+    if student_in.gpa is not None:
+        student.gpa = student_in.gpa
+    return student
+
 def update_student_profile(db: Session, student_id: int, student_in: schemas.StudentUpdate):
     student = db.query(models.Student).filter(models.Student.student_id == student_id).first()
     if student:
-        if student_in.phone_number:
-            student.phone_number = student_in.phone_number
-        if student_in.province:
-            student.province = student_in.province
-        if student_in.city:
-            student.city = student_in.city
-        if student_in.education_year:
-            student.educational_level = student_in.education_year
-        if student_in.field_of_study:
-            student.field_of_study = student_in.field_of_study
-        if student_in.semester_or_year:
-            student.semester_or_year = student_in.semester_or_year    
-        if student_in.gpa is not None:
-            student.gpa = student_in.gpa
+        apply_student_update(student, student_in)
         db.commit()
         db.refresh(student)
         return student
@@ -60,17 +62,15 @@ def is_admin(role: schemas.RoleEnum) -> bool:
 def is_own_data(user_id: int, data_id: int) -> bool:
     return user_id == data_id
 
-def update_student_profile_service(db: Session, payload: dict, student_in: schemas.StudentUpdate) -> schemas.StudentUpdate:
-    user_id = int(payload.get("sub"))
-    user = crud.get_user_by_id(db, user_id)
-    student = get_student_by_user_id(db, user_id)
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+def update_student_profile_service(db: Session, principal: Principal, student_in: schemas.StudentUpdate) -> schemas.StudentUpdate:
+    student = principal.require_student()
 
-    if is_admin(user.role) or is_own_data(user_id, student.user_id):
-        student = update_student_profile(db, student.student_id, student_in)
-        user = crud.update_user_profile(db, user_id, student_in)
-        return schemas.StudentUpdate(
+    if is_admin(principal.role) or is_own_data(principal.user_id, student.user_id):
+        # The principal's rows belong to this session, so they are updated in place
+        # and the response is built before commit expires them.
+        user = crud.apply_user_update(principal.user, student_in)
+        apply_student_update(student, student_in)
+        result = schemas.StudentUpdate(
             student_id=student.student_id,
             firstname=user.firstname,
             lastname=user.lastname,
@@ -83,6 +83,8 @@ def update_student_profile_service(db: Session, payload: dict, student_in: schem
             semester_or_year=student.semester_or_year,
             gpa=student.gpa
         )
+        db.commit()
+        return result
     else:
         raise HTTPException(status_code=403, detail="Permission denied")
 
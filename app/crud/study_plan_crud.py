@@ -1,4 +1,6 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import StudyPlan, StudyActivity, Counselor
 from app.schemas import StudyPlanCreate, ActivityStatusUpdate, StudyActivityOut
 from datetime import datetime
@@ -10,12 +12,14 @@ from app.utils.datetime import to_jalali_str
 from app.routers.notifications import manager
 
 
-async def create_study_plan(db, counselor_user_id: int, data) -> StudyPlan:
-    counselor = db.query(Counselor).filter(Counselor.user_id == counselor_user_id).first()
+async def create_study_plan(db: AsyncSession, counselor_user_id: int, data) -> StudyPlan:
+    counselor = (await db.execute(
+        select(Counselor).where(Counselor.user_id == counselor_user_id)
+    )).scalar_one_or_none()
     if not counselor:
         raise HTTPException(status_code=404, detail="Counselor not found")
 
-    student = db.query(models.Student).filter(models.Student.student_id == data.student_id).first()
+    student = await db.get(models.Student, data.student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
@@ -25,8 +29,7 @@ async def create_study_plan(db, counselor_user_id: int, data) -> StudyPlan:
         is_finalized=False
     )
     db.add(new_plan)
-    db.commit()
-    db.refresh(new_plan)
+    await db.flush()
 
     for act in data.activities:
         db.add(StudyActivity(
@@ -37,16 +40,16 @@ async def create_study_plan(db, counselor_user_id: int, data) -> StudyPlan:
             title=act.title,
             description=act.description
         ))
-    db.commit()
+    await db.commit()
 
-    counselor_user = db.query(models.User).get(counselor.user_id)  
+    counselor_user = await db.get(models.User, counselor.user_id)
     student_user_id = student.user_id                       
 
     message = f"برنامه‌ی جدیدی توسط مشاور {counselor_user.firstname} {counselor_user.lastname} برای شما ایجاد شد."
 
     await manager.send_personal_message(message, student_user_id)
     db.add(models.Notification(user_id=student_user_id, message=message))
-    db.commit()
+    await db.commit()
 
     return new_plan
 
@@ -64,9 +67,11 @@ def get_student_weekly_plan(db: Session, student_user_id: int):
     student = db.query(models.Student).filter(models.Student.user_id == student_user_id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
+    return get_weekly_plan_for_student(db, student.student_id)
 
+def get_weekly_plan_for_student(db: Session, student_id: int):
     plan = db.query(StudyPlan).options(joinedload(StudyPlan.activities)).filter(
-        StudyPlan.student_id == student.student_id,
+        StudyPlan.student_id == student_id,
         StudyPlan.is_finalized == True
     ).order_by(StudyPlan.created_at.desc()).first()
 
@@ -208,6 +213,39 @@ def get_plan_for_review(db: Session, student_id: int):
     }
 
 
+def get_study_plan_history(db: Session, student_id: int):
+    # Two column projections instead of ORM objects: one for the plans, one for all their activities.
+    plans = db.query(StudyPlan.plan_id, StudyPlan.created_at, StudyPlan.is_finalized).filter(
+        StudyPlan.student_id == student_id
+    ).order_by(StudyPlan.created_at.desc()).all()
+    if not plans:
+        return []
+
+    activities = {p.plan_id: [] for p in plans}
+    rows = db.query(
+        StudyActivity.plan_id, StudyActivity.date, StudyActivity.start_time, StudyActivity.end_time,
+        StudyActivity.title, StudyActivity.description
+    ).filter(StudyActivity.plan_id.in_(list(activities))).order_by(StudyActivity.activity_id).all()
+    for a in rows:
+        activities[a.plan_id].append({
+            "date": a.date,
+            "start_time": a.start_time.strftime("%H:%M"),
+            "end_time": a.end_time.strftime("%H:%M"),
+            "title": a.title,
+            "description": a.description,
+        })
+
+    return [
+        {
+            "plan_id": p.plan_id,
+            "created_at": p.created_at if p.created_at else None,
+            "finalized_at": p.is_finalized if p.is_finalized else None,
+            "activities": activities[p.plan_id],
+        }
+        for p in plans
+    ]
+
+
 def set_plan_score(db: Session, plan_id: int, score: int):
     plan = db.query(StudyPlan).filter(
         StudyPlan.plan_id == plan_id,
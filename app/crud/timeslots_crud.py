@@ -1,8 +1,16 @@
-from sqlalchemy.orm import Session
-from app.models import CounselorTimeRange, AvailableTimeSlot
+from fastapi import HTTPException
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from app.models import CounselorTimeRange, AvailableTimeSlot, WeeklyAvailabilityTemplate, RANGE_OVERLAP_CONSTRAINT
 from datetime import datetime
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from .availability_crud import jalali_weekday, slot_times
+from .public_crud import invalidate_counselor_profile
+from .counselors_crud import invalidate_counselor_dashboard
+from .rollups_crud import remove_appointments
+from app.models import Appointment
 
 def check_range_overlap(db: Session, counselor_id: int, date, from_time, to_time) -> bool:
     return db.query(CounselorTimeRange).filter(
@@ -12,7 +20,22 @@ def check_range_overlap(db: Session, counselor_id: int, date, from_time, to_time
         CounselorTimeRange.to_time > from_time
     ).first() is not None
 
+def _enforces_range_overlap(db: Session) -> bool:
+    # PostgreSQL rejects overlapping ranges itself (see RANGE_OVERLAP_CONSTRAINT);
+    # elsewhere the check runs as a query before the insert.
+    return db.get_bind().dialect.name == "postgresql"
+
+def is_range_overlap(exc: IntegrityError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == "23P01" or RANGE_OVERLAP_CONSTRAINT in str(orig)
+
 def create_time_range_with_slots(db: Session, counselor_id: int, date, from_time, to_time, duration_minutes: int):
+    if from_time >= to_time:
+        raise HTTPException(400, "from_time must be before to_time")
+    if not _enforces_range_overlap(db) and check_range_overlap(db, counselor_id, date, from_time, to_time):
+        raise HTTPException(400, "Overlapping time range")
+
     time_range = CounselorTimeRange(
         counselor_id=counselor_id,
         date=date,
@@ -21,27 +44,158 @@ def create_time_range_with_slots(db: Session, counselor_id: int, date, from_time
         duration=duration_minutes
     )
     db.add(time_range)
-    db.flush()
-
-    current = datetime.combine(date, from_time)
-    end = datetime.combine(date, to_time)
-    slots = []
-    while current + timedelta(minutes=duration_minutes) <= end:
-        slot = AvailableTimeSlot(
-            range_id=time_range.id,
-            start_time=current.time(),
-            end_time=(current + timedelta(minutes=duration_minutes)).time(),
-            is_reserved=False,
-        )
-        db.add(slot)
-        slots.append(slot)
-        current += timedelta(minutes=duration_minutes)
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_range_overlap(exc):
+            raise HTTPException(400, "Overlapping time range")
+        raise
+
+    slots = [
+        AvailableTimeSlot(range_id=time_range.id, date=date, start_time=start, end_time=end, is_reserved=False)
+        for start, end in slot_times(date, from_time, to_time, duration_minutes)
+    ]
+    db.add_all(slots)
 
     db.commit()
+    invalidate_counselor_profile(counselor_id)
     return time_range, slots
 
-def get_ranges_by_counselor(db: Session, counselor_id: int):
-    return db.query(CounselorTimeRange).filter(CounselorTimeRange.counselor_id == counselor_id).all()
+MAX_BATCH_DATES = 366
+
+def expand_batch_dates(dates=None, weekdays=None, start_date=None, end_date=None):
+    if dates:
+        result = sorted(set(dates))
+    elif weekdays and start_date and end_date:
+        if end_date < start_date:
+            raise HTTPException(400, "end_date is before start_date")
+        if (end_date - start_date).days >= MAX_BATCH_DATES:
+            raise HTTPException(400, f"A batch can span at most {MAX_BATCH_DATES} days")
+        days = (end_date - start_date).days + 1
+        result = [
+            d for d in (start_date + timedelta(days=i) for i in range(days))
+            if jalali_weekday(d) in weekdays
+        ]
+    else:
+        raise HTTPException(400, "Provide dates, or weekdays with start_date and end_date")
+    if len(result) > MAX_BATCH_DATES:
+        raise HTTPException(400, f"A batch can create at most {MAX_BATCH_DATES} ranges")
+    return result
+
+def create_time_ranges_batch(db: Session, counselor_id: int, dates, from_time, to_time, duration_minutes: int):
+    """Create the same range on every date in one transaction.
+
+    Dates that overlap an existing range are skipped and reported; the rest
+    are written with two set-based INSERTs, one for the ranges and one for
+    all of their slots.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return []
+    if from_time >= to_time:
+        raise HTTPException(400, "from_time must be before to_time")
+
+    busy = {}
+    for day, start, end in db.query(
+        CounselorTimeRange.date, CounselorTimeRange.from_time, CounselorTimeRange.to_time
+    ).filter(
+        CounselorTimeRange.counselor_id == counselor_id,
+        CounselorTimeRange.date.between(dates[0], dates[-1])
+    ):
+        busy.setdefault(day, []).append((start, end))
+
+    free = [d for d in dates if not any(start < to_time and end > from_time for start, end in busy.get(d, ()))]
+    times = slot_times(dates[0], from_time, to_time, duration_minutes)
+    range_ids = {}
+    if free:
+        # Returning the date as well means the rows can come back in any order,
+        # which lets SQLAlchemy send them as one multi-row INSERT. A range added
+        # concurrently still trips the exclusion constraint on PostgreSQL.
+        try:
+            range_ids = dict(db.execute(
+                insert(CounselorTimeRange).returning(CounselorTimeRange.date, CounselorTimeRange.id),
+                [
+                    {"counselor_id": counselor_id, "date": d, "from_time": from_time, "to_time": to_time,
+                     "duration": duration_minutes}
+                    for d in free
+                ],
+            ).all())
+        except IntegrityError as exc:
+            db.rollback()
+            if is_range_overlap(exc):
+                raise HTTPException(400, "Overlapping time range")
+            raise
+        if times:
+            db.execute(insert(AvailableTimeSlot), [
+                {"range_id": range_id, "date": d, "start_time": start, "end_time": end, "is_reserved": False}
+                for d, range_id in range_ids.items() for start, end in times
+            ])
+        db.commit()
+        invalidate_counselor_profile(counselor_id)
+
+    return [
+        {"date": d, "created": True, "range_id": range_ids[d], "slot_count": len(times)}
+        if d in range_ids else
+        {"date": d, "created": False, "detail": "Overlapping time range"}
+        for d in dates
+    ]
+
+def create_weekly_template(db: Session, counselor_id: int, weekday: int, from_time, to_time, duration_minutes: int,
+                           valid_from, valid_until=None):
+    if from_time >= to_time:
+        raise HTTPException(400, "from_time must be before to_time")
+    if valid_until is not None and valid_until < valid_from:
+        raise HTTPException(400, "valid_until is before valid_from")
+    overlapping = db.query(WeeklyAvailabilityTemplate.id).filter(
+        WeeklyAvailabilityTemplate.counselor_id == counselor_id,
+        WeeklyAvailabilityTemplate.weekday == weekday,
+        WeeklyAvailabilityTemplate.from_time < to_time,
+        WeeklyAvailabilityTemplate.to_time > from_time,
+        or_(WeeklyAvailabilityTemplate.valid_until.is_(None), WeeklyAvailabilityTemplate.valid_until >= valid_from),
+    )
+    if valid_until is not None:
+        overlapping = overlapping.filter(WeeklyAvailabilityTemplate.valid_from <= valid_until)
+    if overlapping.first() is not None:
+        raise HTTPException(400, "Overlapping weekly template")
+
+    template = WeeklyAvailabilityTemplate(
+        counselor_id=counselor_id,
+        weekday=weekday,
+        from_time=from_time,
+        to_time=to_time,
+        duration=duration_minutes,
+        valid_from=valid_from,
+        valid_until=valid_until,
+    )
+    db.add(template)
+    db.commit()
+    invalidate_counselor_profile(counselor_id)
+    return template
+
+def get_templates_by_counselor(db: Session, counselor_id: int):
+    return db.query(WeeklyAvailabilityTemplate).filter(
+        WeeklyAvailabilityTemplate.counselor_id == counselor_id
+    ).order_by(WeeklyAvailabilityTemplate.weekday, WeeklyAvailabilityTemplate.from_time).all()
+
+def delete_template(db: Session, counselor_id: int, template_id: int) -> bool:
+    # Slots already booked from the template keep their materialized range.
+    deleted = db.query(WeeklyAvailabilityTemplate).filter(
+        WeeklyAvailabilityTemplate.id == template_id,
+        WeeklyAvailabilityTemplate.counselor_id == counselor_id,
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        invalidate_counselor_profile(counselor_id)
+    return bool(deleted)
+
+def get_ranges_by_counselor(db: Session, counselor_id: int, start=None, end=None):
+    query = db.query(CounselorTimeRange).filter(CounselorTimeRange.counselor_id == counselor_id)
+    if start is not None and end is not None:
+        query = query.filter(CounselorTimeRange.date.between(start, end)).order_by(
+            CounselorTimeRange.date, CounselorTimeRange.from_time
+        )
+    return query.all()
 
 def get_slots_by_range(db: Session, range_id: int):
     return db.query(AvailableTimeSlot).filter(AvailableTimeSlot.range_id == range_id).all()
@@ -50,8 +204,14 @@ def delete_range_by_id(db: Session, range_id: int):
     obj = db.query(CounselorTimeRange).filter(CounselorTimeRange.id == range_id).first()
     if not obj:
         return False
+    # The range's slots, and the appointments booked on them, go with ON DELETE CASCADE.
+    slot_ids = db.query(AvailableTimeSlot.id).filter(AvailableTimeSlot.range_id == range_id)
+    had_appointments = remove_appointments(db, Appointment.slot_id.in_(slot_ids.scalar_subquery()))
     db.delete(obj)
     db.commit()
+    invalidate_counselor_profile(obj.counselor_id)
+    if had_appointments:
+        invalidate_counselor_dashboard(obj.counselor_id)
     return True
 
 
@@ -59,16 +219,30 @@ def get_slots_by_range(db: Session, range_id: int):
     return db.query(AvailableTimeSlot).filter(AvailableTimeSlot.range_id == range_id).all()
 
 def get_time_ranges_with_slots_for_counselor(db: Session, counselor_id: int):
-    ranges = db.query(CounselorTimeRange).filter_by(counselor_id=counselor_id).all()
-    result = []
-    for range_obj in ranges:
-        slots = get_slots_by_range(db, range_obj.id)
-        result.append({
+    ranges = db.query(CounselorTimeRange).options(
+        selectinload(CounselorTimeRange.slots)
+    ).filter_by(counselor_id=counselor_id).all()
+    return [
+        {
             "id": range_obj.id,
             "date": range_obj.date,
             "from_time": range_obj.from_time,
             "to_time": range_obj.to_time,
             "duration": range_obj.duration,
-            "slots": slots
-        })
-    return result
+            "slots": range_obj.slots
+        }
+        for range_obj in ranges
+    ]
+
+def get_counselor_calendar(db: Session, counselor_id: int, start, end):
+    """Ranges from `start` to `end` with their slots and each slot's appointment.
+
+    Three queries however many ranges there are: the ranges, then one
+    selectinload each for the slots and the appointments.
+    """
+    return db.query(CounselorTimeRange).options(
+        selectinload(CounselorTimeRange.slots).selectinload(AvailableTimeSlot.appointment)
+    ).filter(
+        CounselorTimeRange.counselor_id == counselor_id,
+        CounselorTimeRange.date.between(start, end),
+    ).order_by(CounselorTimeRange.date, CounselorTimeRange.from_time).all()
@@ -1,26 +1,31 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, UploadFile
-from app import models, schemas, auth
-import os
-from dotenv import load_dotenv
-import boto3
-
-load_dotenv()
-
-LIARA_ENDPOINT = os.getenv("LIARA_ENDPOINT_URL")
-LIARA_ACCESS_KEY = os.getenv("LIARA_ACCESS_KEY")
-LIARA_SECRET_KEY = os.getenv("LIARA_SECRET_KEY")
-LIARA_BUCKET_NAME = os.getenv("BUCKET_NAME")
-
-s3 = boto3.client(
-    "s3",
-    endpoint_url=LIARA_ENDPOINT,
-    aws_access_key_id=LIARA_ACCESS_KEY,
-    aws_secret_access_key=LIARA_SECRET_KEY,
-)
+from app import models, schemas, auth, crud
+from app.config import get_settings
+from functools import lru_cache
+from .rollups_crud import record_role, remove_appointments
+from .public_crud import invalidate_counselor, invalidate_counselor_directory, invalidate_counselor_user, remove_student_ratings
+
+settings = get_settings()
+
+LIARA_ENDPOINT = settings.liara_endpoint_url
+LIARA_ACCESS_KEY = settings.liara_access_key
+LIARA_SECRET_KEY = settings.liara_secret_key
+LIARA_BUCKET_NAME = settings.bucket_name
+
+@lru_cache
+def get_s3_client():
+    # boto3 is slow to import and build, so the client is created on first upload.
+    import boto3
+    return boto3.client(
+        "s3",
+        endpoint_url=LIARA_ENDPOINT,
+        aws_access_key_id=LIARA_ACCESS_KEY,
+        aws_secret_access_key=LIARA_SECRET_KEY,
+    )
 
 def upload_file_to_s3(file: UploadFile):
-    s3.upload_fileobj(file.file, LIARA_BUCKET_NAME, file.filename)
+    get_s3_client().upload_fileobj(file.file, LIARA_BUCKET_NAME, file.filename)
     return file.filename
 
 def update_user_profile_with_image(db: Session, user_id: int, file: UploadFile):
@@ -31,6 +36,8 @@ def update_user_profile_with_image(db: Session, user_id: int, file: UploadFile):
     user.profile_image_url = profile_image_url
     db.commit()
     db.refresh(user)
+    if user.role == models.RoleEnum.counselor:
+        invalidate_counselor_user(user)
     return user
 
 def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
@@ -45,6 +52,7 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
         role=user_in.role
     )
     db.add(db_user)
+    record_role(db, user_in.role)
     db.commit()
     db.refresh(db_user)
 
@@ -54,6 +62,8 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
         db.add(models.Counselor(user_id=db_user.userid))
 
     db.commit()
+    if user_in.role == models.RoleEnum.counselor:
+        invalidate_counselor_directory()
     return db_user
 
 def get_user_by_email(db: Session, email: str) -> models.User | None:
@@ -86,30 +96,49 @@ def update_user_password(db: Session, userid: int, new_password: str) -> models.
 
 def update_user_role(db: Session, userid: int, new_role: str) -> models.User:
     user = get_user_by_id(db, userid)
+    new_role = models.RoleEnum(new_role)
+    if new_role != user.role:
+        record_role(db, user.role, -1)
+        record_role(db, new_role)
     user.role = new_role
     db.commit()
     db.refresh(user)
+    invalidate_counselor()
     return user
 
 def delete_user(db: Session, userid: int) -> bool:
     user = get_user_by_id(db, userid)
     if not user:
         return False
+    booked_counselor_ids = set()
+    if user.student is not None:
+        remove_student_ratings(db, user.student.student_id)
+        booked_counselor_ids = remove_appointments(db, models.Appointment.student_id == user.student.student_id)
+    record_role(db, user.role, -1)
     db.delete(user)
     db.commit()
+    invalidate_counselor()
+    for counselor_id in booked_counselor_ids:
+        crud.invalidate_counselor_dashboard(counselor_id)
     return True
 
+def apply_user_update(user: models.User, user_in: schemas.StudentUpdate | schemas.CounselorUpdate) -> models.User:
+    if user_in.firstname:
+        user.firstname = user_in.firstname
+    if user_in.lastname:
+        user.lastname = user_in.lastname
+    if user_in.email:
+        user.email = user_in.email
+    return user
+
 def update_user_profile(db: Session, user_id: int, user_in: schemas.StudentUpdate | schemas.CounselorUpdate):
     user = db.query(models.User).filter(models.User.userid == user_id).first()
     if user:
-        if user_in.firstname:
-            user.firstname = user_in.firstname
-        if user_in.lastname:
-            user.lastname = user_in.lastname
-        if user_in.email:
-            user.email = user_in.email
+        apply_user_update(user, user_in)
         db.commit()
         db.refresh(user)
+        if user.role == models.RoleEnum.counselor:
+            invalidate_counselor_user(user)
         return user
     else:
         raise HTTPException(status_code=404, detail="User not found")
\ No newline at end of file
@@ -1,31 +1,144 @@
-import os
-from pathlib import Path
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+from app.config import get_settings
+from app.utils import slow_queries
+from app.utils.pool_metrics import instrument_engine, InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
-if os.getenv("ENV", "development") == "development":
-    env_path = Path(__file__).resolve().parents[1] / ".env" 
-    if env_path.exists():
-        from dotenv import load_dotenv
-        load_dotenv(env_path)
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.database_url
 if not DATABASE_URL:
     raise RuntimeError(
         "DATABASE_URL is not set. "
         "Set it in backend/.env for development or via 'liara env:set' in production."
     )
 
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(DATABASE_URL)
+
+
+# Pool tuning. DB_POOL_MODE=pgbouncer is for a PgBouncer in transaction-pooling
+# mode: PgBouncer owns the pooling, so the app opens a connection per checkout
+# and asyncpg's prepared statement caches are disabled.
+def _engine_options(url: str, asynchronous: bool = False) -> dict:
+    options = {"pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        return options
+    if settings.db_pool_mode == "pgbouncer":
+        options["poolclass"] = NullPool
+        if asynchronous and "+asyncpg" in url:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+            }
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+# Sync engine: used by the plain `def` routes (run in FastAPI's threadpool),
+# alembic, scripts and tests.
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,    
-    future=True
+    future=True,
+    **_engine_options(DATABASE_URL)
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+# Async engine: used by `async def` routes so DB round trips never block the event loop.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, asynchronous=True)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Optional read replica for read-only endpoints. get_read_db falls back to the
+# primary when no replica is configured or it lags more than DB_REPLICA_MAX_LAG seconds.
+replica_engine = None
+ReadSessionLocal = SessionLocal
+if settings.database_replica_url:
+    replica_engine = create_engine(
+        settings.database_replica_url,
+        future=True,
+        **_engine_options(settings.database_replica_url)
+    )
+    ReadSessionLocal = sessionmaker(bind=replica_engine, autoflush=False, autocommit=False)
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+_replica_state = {"checked_at": 0.0, "lag": None, "usable": False}
+_replica_lock = threading.Lock()
+
+
+def replica_lag() -> float | None:
+    if replica_engine is None:
+        return None
+    if replica_engine.dialect.name != "postgresql":
+        return 0.0
+    with replica_engine.connect() as conn:
+        return float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0.0)
+
+
+def replica_is_usable() -> bool:
+    if replica_engine is None:
+        return False
+    now = time.monotonic()
+    if now - _replica_state["checked_at"] < settings.db_replica_lag_check_interval:
+        return _replica_state["usable"]
+    with _replica_lock:
+        if now - _replica_state["checked_at"] >= settings.db_replica_lag_check_interval:
+            try:
+                lag = replica_lag()
+            except Exception:
+                logger.warning("Read replica unreachable, reading from primary", exc_info=True)
+                lag = None
+            _replica_state.update(
+                checked_at=now,
+                lag=lag,
+                usable=lag is not None and lag <= settings.db_replica_max_lag,
+            )
+    return _replica_state["usable"]
+
+
+instrument_engine("primary", engine)
+instrument_engine("primary_async", async_engine)
+slow_queries.install(engine)
+slow_queries.install(async_engine)
+if replica_engine is not None:
+    instrument_engine("replica", replica_engine)
+    slow_queries.install(replica_engine)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -33,3 +146,13 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    db = ReadSessionLocal() if replica_is_usable() else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,3 @@
-import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import (
@@ -7,10 +6,17 @@ from app.routers import (
 )
 from app.database import Base, engine
 from app import models  
+from app.config import get_settings
+from app.utils.query_stats import query_stats_middleware
 
-Base.metadata.create_all(bind=engine)
+settings = get_settings()
+
+# In production Alembic owns the schema, so workers skip the catalog round trips.
+if settings.auto_create_schema:
+    Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Academic Counseling API")
+app.middleware("http")(query_stats_middleware)
 
 def parse_origins(value: str) -> list[str]:
 
@@ -22,8 +28,8 @@ def parse_origins(value: str) -> list[str]:
     return [o.strip() for o in v.split(",") if o.strip()]
 
 
-origins = parse_origins(os.getenv("CORS_ORIGINS", ""))
-frontend_url = os.getenv("FRONTEND_URL", "").strip()
+origins = parse_origins(settings.cors_origins)
+frontend_url = settings.frontend_url
 if frontend_url and frontend_url not in origins:
     origins.append(frontend_url)
 
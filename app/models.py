@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Time, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, Time, Date, Index, UniqueConstraint, DDL, event, text
 from sqlalchemy.dialects.postgresql import ENUM as PGEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -55,7 +55,7 @@ class Student(Base):
     __tablename__ = "students"
 
     student_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.userid", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.userid", ondelete="CASCADE"), nullable=False, index=True)
     phone_number = Column(String, unique=True, nullable=True)
     province = Column(String, nullable=True)
     city = Column(String, nullable=True)
@@ -74,13 +74,21 @@ class Student(Base):
 
 class Counselor(Base):
     __tablename__ = "counselors"
+    __table_args__ = (
+        # Filters of the cross-counselor availability search.
+        Index("ix_counselors_province_city", "province", "city"),
+        Index("ix_counselors_department", "department"),
+    )
 
     counselor_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.userid", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.userid", ondelete="CASCADE"), nullable=False, index=True)
     phone_number = Column(String, unique=True, nullable=True)
     province = Column(String, nullable=True)
     city = Column(String, nullable=True)
     department = Column(String, nullable=True)
+    # Maintained by leave_feedback so profiles can show an average without reading every row.
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="counselor", passive_deletes=True)
     time_ranges = relationship("CounselorTimeRange", back_populates="counselor", cascade="all, delete-orphan", passive_deletes=True)
@@ -93,6 +101,9 @@ class Counselor(Base):
 
 class StudyPlan(Base):
     __tablename__ = "study_plans"
+    __table_args__ = (
+        Index("ix_study_plans_student_finalized_created", "student_id", "is_finalized", "created_at"),
+    )
 
     plan_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     counselor_id = Column(Integer, ForeignKey("counselors.counselor_id", ondelete="CASCADE"), nullable=False)
@@ -130,6 +141,12 @@ class StudyActivity(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_counselor_status_date", "counselor_id", "status", "date"),
+        Index("ix_appointments_student_date", "student_id", "date"),
+        # A slot holds at most one appointment; backs up the conditional UPDATE in create_appointment.
+        UniqueConstraint("slot_id", name="uq_appointments_slot_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("students.student_id", ondelete="CASCADE"), nullable=False)
@@ -148,6 +165,12 @@ class Appointment(Base):
 
 class CounselorTimeRange(Base):
     __tablename__ = "counselor_time_ranges"
+    __table_args__ = (
+        Index("ix_counselor_time_ranges_counselor_date", "counselor_id", "date"),
+        Index("ix_counselor_time_ranges_date_counselor", "date", "counselor_id"),
+        # One materialized range per booked template slot; NULLs (ordinary ranges) never conflict.
+        UniqueConstraint("template_id", "date", "from_time", name="uq_counselor_time_ranges_template_slot"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     counselor_id = Column(Integer, ForeignKey("counselors.counselor_id", ondelete="CASCADE"), nullable=False)
@@ -155,22 +178,76 @@ class CounselorTimeRange(Base):
     from_time = Column(Time, nullable=False)
     to_time = Column(Time, nullable=False)
     duration = Column(Integer, nullable=False)
+    # Set when the range was materialized from a weekly template at booking time.
+    # Such a range spans exactly the booked slot and is deleted when it is cancelled.
+    template_id = Column(Integer, ForeignKey("weekly_availability_templates.id", ondelete="SET NULL"), nullable=True)
 
     counselor = relationship("Counselor", back_populates="time_ranges", passive_deletes=True)
-    slots = relationship("AvailableTimeSlot", back_populates="time_range", cascade="all, delete-orphan", passive_deletes=True)
+    slots = relationship("AvailableTimeSlot", back_populates="time_range", cascade="all, delete-orphan", passive_deletes=True,
+                         order_by="AvailableTimeSlot.start_time")
+
+# PostgreSQL keeps a counselor's ranges from overlapping with a generated
+# tsrange column and a GiST exclusion constraint. Ranges materialized from a
+# weekly template are covered too: they only exist while their slot is booked.
+# The column is not mapped: the database fills it in. Same DDL as migrations
+# e1b5c8a3d7f2 and 3c9e5a7b1d46, so create_all builds the same schema.
+RANGE_OVERLAP_CONSTRAINT = "ex_counselor_time_ranges_no_overlap"
+for _statement in (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE counselor_time_ranges ADD COLUMN period tsrange "
+    "GENERATED ALWAYS AS (tsrange(\"date\" + from_time, \"date\" + to_time, '[)')) STORED",
+    f"ALTER TABLE counselor_time_ranges ADD CONSTRAINT {RANGE_OVERLAP_CONSTRAINT} "
+    "EXCLUDE USING gist (counselor_id WITH =, period WITH &&)",
+):
+    event.listen(CounselorTimeRange.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+# ----- WEEKLY AVAILABILITY TEMPLATE -----
+
+class WeeklyAvailabilityTemplate(Base):
+    """Recurring availability; its slots are computed on the fly and only stored once booked."""
+    __tablename__ = "weekly_availability_templates"
+    __table_args__ = (
+        Index("ix_weekly_availability_templates_counselor_weekday", "counselor_id", "weekday"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    counselor_id = Column(Integer, ForeignKey("counselors.counselor_id", ondelete="CASCADE"), nullable=False)
+    # Jalali week: 0 is Saturday, 6 is Friday.
+    weekday = Column(Integer, nullable=False)
+    from_time = Column(Time, nullable=False)
+    to_time = Column(Time, nullable=False)
+    duration = Column(Integer, nullable=False)
+    valid_from = Column(Date, nullable=False)
+    valid_until = Column(Date, nullable=True)
+
+    counselor = relationship("Counselor", passive_deletes=True)
 
 # ----- AVAILABLE TIME SLOT -----
 
 class AvailableTimeSlot(Base):
     __tablename__ = "available_time_slots"
+    __table_args__ = (
+        Index("ix_available_time_slots_range_reserved", "range_id", "is_reserved"),
+        # Only free slots, by date, in the order the availability search pages through them.
+        Index(
+            "ix_available_time_slots_free_date_start", "date", "start_time", "id",
+            postgresql_where=text("is_reserved IS NOT TRUE"),
+            sqlite_where=text("is_reserved IS NOT 1"),
+        ),
+        UniqueConstraint("range_id", "start_time", name="uq_available_time_slots_range_start"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     range_id = Column(Integer, ForeignKey("counselor_time_ranges.id", ondelete="CASCADE"), nullable=False)
+    # Copy of the range's date, so date windows can be answered from this table.
+    date = Column(Date, nullable=False)
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=False)
     is_reserved = Column(Boolean, default=False)
 
     time_range = relationship("CounselorTimeRange", back_populates="slots", passive_deletes=True)
+    # Read-only: appointments are written through create_appointment, never through the slot.
+    appointment = relationship("Appointment", uselist=False, viewonly=True)
 
 # ----- RECOMMENDATION -----
 
@@ -189,6 +266,9 @@ class Recommendation(Base):
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_counselor_submitted", "counselor_id", "date_submitted", "feedback_id"),
+    )
 
     feedback_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("students.student_id", ondelete="CASCADE"), nullable=False)
@@ -204,6 +284,9 @@ class Feedback(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.userid", ondelete="CASCADE"), nullable=False)
@@ -211,4 +294,36 @@ class Notification(Base):
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="notifications", passive_deletes=True)
\ No newline at end of file
+    user = relationship("User", back_populates="notifications", passive_deletes=True)
+# ----- DASHBOARD ROLLUPS -----
+# Maintained incrementally by the write paths (see app/crud/rollups_crud.py) so the
+# admin dashboard never scans the full users or appointments tables.
+
+class AppointmentDailyCount(Base):
+    __tablename__ = "appointment_daily_counts"
+    __table_args__ = (
+        Index("ix_appointment_daily_counts_status_date", "status", "date"),
+    )
+
+    counselor_id = Column(Integer, ForeignKey("counselors.counselor_id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    status = Column(PGEnum(AppointmentStatus, name="appointment_status_enum"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class CounselorAppointmentTotal(Base):
+    __tablename__ = "counselor_appointment_totals"
+    __table_args__ = (
+        Index("ix_counselor_appointment_totals_status_count", "status", "count"),
+    )
+
+    counselor_id = Column(Integer, ForeignKey("counselors.counselor_id", ondelete="CASCADE"), primary_key=True)
+    status = Column(PGEnum(AppointmentStatus, name="appointment_status_enum"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RoleCount(Base):
+    __tablename__ = "role_counts"
+
+    role = Column(PGEnum(RoleEnum, name="role_enum"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
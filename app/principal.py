@@ -0,0 +1,113 @@
+from typing import Annotated
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.auth import CLAIMS_VERSION, JWTBearer, claimed_id
+from app.database import get_db
+
+
+class Principal:
+    """The authenticated caller: the user row plus its student or counselor row.
+
+    The admin account has no user row, so `user`, `student` and `counselor`
+    are all None for an admin token.
+    """
+
+    def __init__(
+        self,
+        payload: dict,
+        role: models.RoleEnum,
+        user: models.User | None = None,
+        student: models.Student | None = None,
+        counselor: models.Counselor | None = None,
+    ):
+        self.payload = payload
+        self.role = role
+        self.user = user
+        self.student = student
+        self.counselor = counselor
+
+    @property
+    def user_id(self) -> int | None:
+        return self.user.userid if self.user else None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == models.RoleEnum.admin
+
+    def require_student(self) -> models.Student:
+        if self.student is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+        return self.student
+
+    def require_counselor(self) -> models.Counselor:
+        if self.counselor is None:
+            raise HTTPException(status_code=404, detail="Counselor not found")
+        return self.counselor
+
+
+def load_principal(db: Session, payload: dict) -> Principal:
+    sub = payload.get("sub")
+    if payload.get("role") == models.RoleEnum.admin.value and sub == "admin":
+        return Principal(payload, models.RoleEnum.admin)
+    try:
+        user_id = int(sub)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Invalid or expired token")
+
+    row = db.execute(
+        select(models.User, models.Student, models.Counselor)
+        .outerjoin(models.Student, models.Student.user_id == models.User.userid)
+        .outerjoin(models.Counselor, models.Counselor.user_id == models.User.userid)
+        .where(models.User.userid == user_id)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, student, counselor = row
+    return Principal(payload, user.role, user, student, counselor)
+
+
+def get_current_principal(
+    request: Request,
+    payload: dict = Depends(JWTBearer()),
+    db: Session = Depends(get_db),
+) -> Principal:
+    # Memoized on the request so helpers further down can reuse it without a query.
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        principal = load_principal(db, payload)
+        request.state.principal = principal
+    return principal
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+
+def _role_id(request: Request, payload: dict, db: Session, claim: str) -> int | None:
+    # Current tokens answer from the claim alone (a missing claim means the
+    # caller has no such row); older tokens fall back to loading the principal.
+    if payload.get("ver", 1) >= CLAIMS_VERSION:
+        return claimed_id(payload, claim)
+    row = getattr(get_current_principal(request, payload, db), claim.removesuffix("_id"))
+    return getattr(row, claim) if row else None
+
+
+def get_student_id(
+    request: Request,
+    payload: dict = Depends(JWTBearer()),
+    db: Session = Depends(get_db),
+) -> int | None:
+    return _role_id(request, payload, db, "student_id")
+
+
+def get_counselor_id(
+    request: Request,
+    payload: dict = Depends(JWTBearer()),
+    db: Session = Depends(get_db),
+) -> int | None:
+    return _role_id(request, payload, db, "counselor_id")
+
+
+CurrentStudentId = Annotated[int | None, Depends(get_student_id)]
+CurrentCounselorId = Annotated[int | None, Depends(get_counselor_id)]
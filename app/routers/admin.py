@@ -3,18 +3,21 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app import schemas
 from app.auth import verify_admin
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import crud
 from app.models import RoleEnum
 from app.schemas import StudentGradeOut
 from typing import List
+from app.utils.pool_metrics import pool_stats
+from app.utils.slow_queries import recent_slow_queries
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-@router.get("/users")
-def list_users(role: Optional[RoleEnum] = None, db: Session = Depends(get_db)):
-    return crud.list_users(db, role=role)
+@router.get("/users", response_class=FastJSONResponse)
+def list_users(role: Optional[RoleEnum] = None, db: Session = Depends(get_read_db)):
+    return FastJSONResponse(crud.list_users(db, role=role))
 
 @router.post("/users", response_model=schemas.UserOut)
 def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
@@ -31,20 +34,20 @@ def delete_user(user_id: int, db: Session = Depends(get_db), _: bool = Depends(v
 
 
 @router.get("/counselors/{counselor_id}/students")
-def list_students(counselor_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
+def list_students(counselor_id: int, db: Session = Depends(get_read_db), _: bool = Depends(verify_admin)):
     return crud.get_students_by_counselor(db, counselor_id)
 
 @router.get("/counselors/{counselor_id}/grades",  response_model=List[StudentGradeOut])
-def student_grades(counselor_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
+def student_grades(counselor_id: int, db: Session = Depends(get_read_db), _: bool = Depends(verify_admin)):
     return crud.get_student_grades_by_counselor(db, counselor_id)
 
-@router.get("/study-plans")
-def all_study_plans(status: Optional[str] = None, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
-    return crud.get_study_plans(db, status)
+@router.get("/study-plans", response_class=FastJSONResponse)
+def all_study_plans(status: Optional[str] = None, db: Session = Depends(get_read_db), _: bool = Depends(verify_admin)):
+    return FastJSONResponse(crud.get_study_plans(db, status))
 
-@router.get("/appointments")
-def all_appointments(status: Optional[str] = None, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
-    return crud.get_appointments(db, status)
+@router.get("/appointments", response_class=FastJSONResponse)
+def all_appointments(status: Optional[str] = None, db: Session = Depends(get_read_db), _: bool = Depends(verify_admin)):
+    return FastJSONResponse(crud.get_appointments(db, status))
 
 @router.delete("/appointments/{appointment_id}")
 def delete_appointment(appointment_id: int, db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
@@ -54,5 +57,14 @@ def delete_appointment(appointment_id: int, db: Session = Depends(get_db), _: bo
     return {"detail": "Appointment deleted"}
 
 @router.get("/dashboard", response_model=schemas.AdminDashboardOut)
-def admin_dashboard(db: Session = Depends(get_db), _: bool = Depends(verify_admin)):
-    return crud.get_admin_dashboard_data(db)
\ No newline at end of file
+def admin_dashboard(db: Session = Depends(get_read_db), _: bool = Depends(verify_admin)):
+    return crud.get_admin_dashboard_data(db)
+
+@router.get("/db/pool")
+def db_pool_stats(_: bool = Depends(verify_admin)):
+    return pool_stats()
+
+
+@router.get("/db/slow-queries")
+def db_slow_queries(limit: int = Query(50, ge=1, le=200), _: bool = Depends(verify_admin)):
+    return recent_slow_queries(limit)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, schemas, auth, models
-from app.database import get_db
-from typing import List
+from app.database import get_db, get_async_db
+from typing import List, Literal, Optional
 from app.auth import JWTBearer
+from app.principal import CurrentCounselorId, CurrentStudentId
+from app.utils.datetime import jalali_query_param
+from app.utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/appointments",
@@ -13,32 +18,48 @@ router = APIRouter(
 @router.post("/book/", response_model=schemas.AppointmentOut)
 async def book_appointment(
     data: schemas.AppointmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     payload: dict = Depends(auth.JWTBearer())
 ):
-    user_id = int(payload.get("sub"))
-    student = db.query(models.Student).filter(models.Student.user_id == user_id).first()
-    student_user = crud.get_user_by_id(db, user_id)
+    if payload.get("ver", 1) >= auth.CLAIMS_VERSION:
+        if payload.get("role") != models.RoleEnum.student.value:
+            raise HTTPException(status_code=403, detail="Only students can book appointments.")
+        student_id = auth.claimed_id(payload, "student_id")
+    else:
+        row = (await db.execute(
+            select(models.User.role, models.Student.student_id)
+            .outerjoin(models.Student, models.Student.user_id == models.User.userid)
+            .where(models.User.userid == int(payload.get("sub")))
+        )).first()
+        if not row or row.role != models.RoleEnum.student:
+            raise HTTPException(status_code=403, detail="Only students can book appointments.")
+        student_id = row.student_id
 
-    if student_user.role != models.RoleEnum.student:
+    if student_id is None:
         raise HTTPException(status_code=403, detail="Only students can book appointments.")
 
+    slot_id = data.slot_id
+    if slot_id is None:
+        if data.template_id is None or data.date is None or data.start_time is None:
+            raise HTTPException(status_code=400, detail="Provide slot_id, or template_id with date and start_time")
+        slot_id = await crud.reserve_template_slot(db, data.template_id, data.date, data.start_time)
+
     return await crud.create_appointment(
         db,
-        student_id=student.student_id,
-        slot_id=data.slot_id,
+        student_id=student_id,
+        slot_id=slot_id,
         notes=data.notes
     )
 
 @router.post("/{appointment_id}/approve", response_model=schemas.AppointmentOut)
 async def approve_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     payload: dict = Depends(auth.JWTBearer())
 ):
     user_id = int(payload.get("sub"))
-    user = crud.get_user_by_id(db, user_id)
-    if user.role != models.RoleEnum.counselor:
+    user = await db.get(models.User, user_id)
+    if not user or user.role != models.RoleEnum.counselor:
         raise HTTPException(403, "Only counselors can approve appointments")
 
     return await crud.approve_appointment(db, appointment_id)
@@ -54,19 +75,83 @@ def cancel_appointment(
 
 
 
+def _appointment_page(
+    response: Response,
+    db: Session,
+    counselor_id: int | None,
+    status: models.AppointmentStatus,
+    date_from: Optional[str],
+    date_to: Optional[str],
+    order: str,
+    limit: int,
+    cursor: Optional[str],
+):
+    if counselor_id is None:
+        return []
+    items, next_cursor = crud.get_counselor_appointments_page(
+        db, counselor_id, status,
+        date_from=jalali_query_param(date_from, "from"),
+        date_to=jalali_query_param(date_to, "to"),
+        descending=order == "desc",
+        limit=limit,
+        cursor=cursor,
+    )
+    # The body stays a plain list; the cursor for the next page travels in a header.
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
 @router.get("/pending", response_model=List[schemas.AppointmentItem])
+@query_budget(2)
 def get_pending_appointments(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    counselor_id: CurrentCounselorId,
+    response: Response,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
 ):
-    counselor_user_id = payload["sub"]
-    return crud.get_appointments_by_status(db, counselor_user_id, schemas.AppointmentStatus.pending)
+    return _appointment_page(
+        response, db, counselor_id, schemas.AppointmentStatus.pending, date_from, date_to, order, limit, cursor
+    )
 
 
 @router.get("/approved", response_model=List[schemas.AppointmentItem])
+@query_budget(2)
 def get_approved_appointments(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    counselor_id: CurrentCounselorId,
+    response: Response,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return _appointment_page(
+        response, db, counselor_id, schemas.AppointmentStatus.approved, date_from, date_to, order, limit, cursor
+    )
+
+
+@router.get("/mine", response_model=List[schemas.StudentAppointmentItem])
+@query_budget(2)
+def get_my_appointments(
+    student_id: CurrentStudentId,
+    response: Response,
+    scope: Literal["upcoming", "past"] = "upcoming",
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
 ):
-    counselor_user_id = payload["sub"]
-    return crud.get_appointments_by_status(db, counselor_user_id, schemas.AppointmentStatus.approved)
+    """The student's own appointments: upcoming soonest first, or past latest first."""
+    if student_id is None:
+        return []
+    items, next_cursor = crud.get_student_appointments_page(
+        db, student_id, upcoming=scope == "upcoming", limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
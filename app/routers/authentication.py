@@ -2,14 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app import schemas, crud, auth, models
 from app.database import get_db
-import os
 import secrets
-from dotenv import load_dotenv
-env_path = os.path.join(os.path.dirname(__file__), "..", "..", ".env")
-load_dotenv(dotenv_path=os.path.abspath(env_path))
-
-ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
-ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
+from app.auth import ADMIN_EMAIL, ADMIN_PASSWORD
 
 router = APIRouter(
     prefix="/auth",
@@ -45,7 +39,7 @@ def login(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
             detail="Invalid email or password"
         )
 
-    access_token = auth.create_access_token(subject=user.userid, role=user.role)
+    access_token = auth.create_user_access_token(user)
     refresh_token = auth.create_refresh_token(subject=user.userid)
     return {"access_token": access_token, "refresh_token": refresh_token}
 
@@ -73,6 +67,6 @@ def refresh_token(token: schemas.Token, db: Session = Depends(get_db)):
     user = crud.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    new_access = auth.create_access_token(subject=user.userid, role=user.role)
+    new_access = auth.create_user_access_token(user)
     new_refresh = auth.create_refresh_token(subject=user.userid)
     return {"access_token": new_access, "refresh_token": new_refresh}
@@ -1,19 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from sqlalchemy.orm import Session
-from app import crud, schemas, auth, models
+from app import crud, schemas, auth
 from app.database import get_db
-from app.auth import JWTBearer
+from app.principal import CurrentCounselorId, CurrentPrincipal
+from app.utils.cache import cached_json_response
+from app.utils.query_stats import query_budget
 router = APIRouter(
     prefix="/counselors",
     tags=["counselors"]
 )
 
 @router.get("/me/", response_model=schemas.CounselorOut)
-def get_counselor_info(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
-):
-    return crud.get_counselor_info(db, payload)
+@query_budget(1)
+def get_counselor_info(principal: CurrentPrincipal):
+    return crud.get_counselor_info(principal)
 
 @router.get("/{counselor_id}/", response_model=schemas.CounselorOut)
 def get_counselor_by_id(
@@ -24,11 +24,12 @@ def get_counselor_by_id(
     return crud.get_counselor_by_id_service(db, counselor_id)
 
 @router.get("/", response_model=list[schemas.CounselorsDisplay])
-def get_counselors(db: Session = Depends(get_db)):
-    counselors = crud.get_all_counselors(db)
-    if not counselors:
+@query_budget(1)
+def get_counselors(request: Request, db: Session = Depends(get_db)):
+    directory = crud.get_counselor_directory(db)
+    if directory.empty:
         raise HTTPException(status_code=404, detail="No counselors found")
-    return counselors
+    return cached_json_response(request, directory)
 @router.put("/upload-profile/", response_model=schemas.UserOut)
 def upload_profile_image(
     file: UploadFile = File(...),
@@ -41,19 +42,17 @@ def upload_profile_image(
 @router.put("/update-profile/", response_model=schemas.CounselorUpdate)
 def update_counselor(
     counselor_in: schemas.CounselorUpdate,
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
-    return crud.update_counselor_profile_service(db, payload, counselor_in)
+    return crud.update_counselor_profile_service(db, principal, counselor_in)
 
 
 @router.get("/my-students")
-def my_students(db: Session = Depends(get_db), payload: dict = Depends(JWTBearer())):
-    user_id = payload["sub"]
-    counselor = db.query(models.Counselor).filter(models.Counselor.user_id == user_id).first()
-    if not counselor:
+def my_students(counselor_id: CurrentCounselorId, db: Session = Depends(get_db)):
+    if counselor_id is None:
         return []
-    return crud.get_students_of_counselor(db, counselor.counselor_id)
+    return crud.get_students_of_counselor(db, counselor_id)
 
 @router.get("/students/{student_id}", response_model=schemas.StudentDetails)
 def get_student_info(student_id: int, db: Session = Depends(get_db)):
@@ -63,12 +62,14 @@ def get_student_info(student_id: int, db: Session = Depends(get_db)):
     return data
 
 @router.get("/dashboard")
+@query_budget(1)
 def get_counselor_dashboard(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    counselor_id: CurrentCounselorId,
+    db: Session = Depends(get_db)
 ):
-    counselor_user_id = payload["sub"]
-    return crud.get_counselor_dashboard_data(db, counselor_user_id)
+    if counselor_id is None:
+        return {"error": "Counselor not found"}
+    return crud.get_counselor_dashboard(db, counselor_id)
 
 
 
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, get_read_db
 from app import crud, schemas
 from app.utils.connections import manager
 from app.auth import JWTBearer
+from app.utils.query_stats import query_budget
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -31,10 +33,11 @@ async def trigger_notification(user_id: int, message: str):
 def send_notification(notification: schemas.NotificationCreate, db: Session = Depends(get_db)):
     return crud.create_notification(db, notification)
 
-@router.get("/{user_id}", response_model=list[schemas.NotificationOut])
-def list_notifications(payload: dict = Depends(JWTBearer()), db: Session = Depends(get_db)):
+@router.get("/{user_id}", response_model=list[schemas.NotificationOut], response_class=FastJSONResponse)
+@query_budget(1)
+def list_notifications(payload: dict = Depends(JWTBearer()), db: Session = Depends(get_read_db)):
     user_id = payload["sub"]
-    return crud.get_user_notifications(db, user_id)
+    return FastJSONResponse(crud.get_user_notifications(db, user_id))
 
 @router.patch("/{notification_id}/read", response_model=schemas.NotificationOut)
 def mark_notification_as_read(notification_id: int, db: Session = Depends(get_db)):
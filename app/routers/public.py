@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Optional
+from datetime import time
 from sqlalchemy.orm import Session
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.auth import JWTBearer
+from app.utils.cache import cached_json_response
+from app.utils.datetime import jalali_query_param
+from app.utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/public",
@@ -10,11 +15,42 @@ router = APIRouter(
 )
 
 @router.get("/counselors/", response_model=list[schemas.CounselorsDisplay])
-def get_all_counselors(db: Session = Depends(get_db)):
-    counselors = crud.get_all_counselors(db)
-    if not counselors:
+@query_budget(1)
+def get_all_counselors(request: Request, db: Session = Depends(get_db)):
+    directory = crud.get_counselor_directory(db)
+    if directory.empty:
         raise HTTPException(status_code=404, detail="No counselors found")
-    return counselors
+    return cached_json_response(request, directory)
+
+
+@router.get("/availability", response_model=schemas.Page[schemas.AvailableSlotOut])
+@query_budget(3)
+def search_availability(
+    province: Optional[str] = None,
+    city: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    # Dates are Jalali, like everywhere else in the API; the window starts today by default.
+    items, next_cursor = crud.search_availability(
+        db,
+        date_from=jalali_query_param(date_from, "date_from"),
+        date_to=jalali_query_param(date_to, "date_to"),
+        province=province,
+        city=city,
+        department=department,
+        time_from=time_from,
+        time_to=time_to,
+        limit=limit,
+        cursor=cursor,
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("/counselors/{counselor_id}/comment")
@@ -35,5 +71,27 @@ def leave_feedback_route(
 
 
 @router.get("/counselor/{counselor_id}", response_model=schemas.PublicCounselorOut)
-def get_counselor_public(counselor_id: int, db: Session = Depends(get_db)):
-    return crud.get_public_counselor_info(db, counselor_id)
+@query_budget(5)
+def get_counselor_public(
+    counselor_id: int,
+    request: Request,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    view = crud.get_public_counselor_view(
+        db, counselor_id, jalali_query_param(date_from, "date_from"), jalali_query_param(date_to, "date_to")
+    )
+    return cached_json_response(request, view)
+
+
+@router.get("/counselor/{counselor_id}/feedback", response_model=schemas.Page[schemas.FeedbackOut])
+@query_budget(1)
+def get_counselor_feedback(
+    counselor_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    items, next_cursor = crud.get_feedback_page(db, counselor_id, limit, cursor)
+    return {"items": items, "next_cursor": next_cursor}
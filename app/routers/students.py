@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, UploadFile, File
 from sqlalchemy.orm import Session
-from app import  schemas, auth, crud, models
+from app import  schemas, auth, crud
 from app.database import get_db
-from app.auth import JWTBearer
+from app.principal import CurrentPrincipal
+from app.utils.query_stats import query_budget
 from typing import List
 
 
@@ -12,19 +13,17 @@ router = APIRouter(
 )
 
 @router.get("/me/", response_model=schemas.StudentOut)
-def get_student_info(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
-):
-    return crud.get_student_info(db, payload)
+@query_budget(1)
+def get_student_info(principal: CurrentPrincipal):
+    return crud.get_student_info(principal)
 
 @router.put("/update-profile/", response_model=schemas.StudentUpdate)
 def update_student(
     student_in: schemas.StudentUpdate,
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
-    return crud.update_student_profile_service(db, payload, student_in)
+    return crud.update_student_profile_service(db, principal, student_in)
 
 @router.put("/upload-profile/", response_model=schemas.UserOut)
 def upload_profile_image(
@@ -36,22 +35,16 @@ def upload_profile_image(
     return crud.update_user_profile_with_image(db, user_id, file)
 
 @router.get("/student/progress")
-def get_progress(payload: dict = Depends(JWTBearer()), db: Session = Depends(get_db)):
-    student_user_id = payload["sub"]
-    student = db.query(models.Student).filter(models.Student.user_id == student_user_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+def get_progress(principal: CurrentPrincipal, db: Session = Depends(get_db)):
+    student = principal.require_student()
 
     percent = crud.get_progress_percentage(db, student.student_id)
     return {"progress_percent": percent}
 
 @router.get("/my-recommendations", response_model=List[schemas.RecommendationOut])
 def get_my_recommendations(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
-    student_user_id = payload["sub"]
-    student = db.query(models.Student).filter(models.Student.user_id == student_user_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+    student = principal.require_student()
     return crud.get_recommendations_for_student(db, student.student_id)
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app import crud,schemas, models
 from typing import List
 from app.auth import JWTBearer
+from app.principal import CurrentPrincipal, CurrentStudentId
+from app.utils.query_stats import query_budget
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/study-plan",
@@ -13,10 +17,10 @@ router = APIRouter(
 @router.post("/counselor/create")
 async def create_plan(
     data: schemas.StudyPlanCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     payload: dict = Depends(JWTBearer())
 ):
-    counselor_user_id = payload["sub"]
+    counselor_user_id = int(payload["sub"])
     return await crud.create_study_plan(db, counselor_user_id, data)
 
 
@@ -28,11 +32,12 @@ def finalize(plan_id: int, db: Session = Depends(get_db)):
 
 @router.get("/student/my")
 def get_my_plan(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    student_id: CurrentStudentId,
+    db: Session = Depends(get_db)
 ):
-    student_id = payload["sub"]
-    plan = crud.get_student_weekly_plan(db, student_id)
+    if student_id is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    plan = crud.get_weekly_plan_for_student(db, student_id)
     if not plan:
         raise HTTPException(status_code=404, detail="No finalized plan found")
     return plan
@@ -81,11 +86,10 @@ def give_score(
 @router.post("/counselor/recommend", response_model=schemas.RecommendationOut, status_code=201)
 def create_recommendation_for_student(
     data: schemas.RecommendationCreate,
-    db: Session = Depends(get_db),
-    payload: dict = Depends(JWTBearer())
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
-    counselor_user_id = payload["sub"]
-    counselor = db.query(models.Counselor).filter(models.Counselor.user_id == counselor_user_id).first()
+    counselor = principal.counselor
     if not counselor:
         raise HTTPException(403, "Only counselors can recommend")
 
@@ -96,29 +100,7 @@ def create_recommendation_for_student(
         "suggested_course": rec.suggested_course,
     }
 
-@router.get("/study-plan/counselor/history/{student_id}")
+@router.get("/study-plan/counselor/history/{student_id}", response_class=FastJSONResponse)
+@query_budget(2)
 def get_history(student_id: int, db: Session = Depends(get_db)):
-    plans = (
-        db.query(models.StudyPlan)
-        .filter(models.StudyPlan.student_id == student_id)
-        .order_by(models.StudyPlan.created_at.desc())
-        .all()
-    )
-    return [
-        {
-            "plan_id": p.plan_id,
-            "created_at": p.created_at if p.created_at else None,
-            "finalized_at": p.is_finalized if p.is_finalized else None,
-            "activities": [
-                {
-                    "date": a.date,
-                    "start_time": a.start_time.strftime("%H:%M"),
-                    "end_time": a.end_time.strftime("%H:%M"),
-                    "title": a.title,
-                    "description": a.description,
-                }
-                for a in p.activities
-            ],
-        }
-        for p in plans
-    ]
+    return FastJSONResponse(crud.get_study_plan_history(db, student_id))
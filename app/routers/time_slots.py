@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app import crud, schemas, auth, models
 from app.database import get_db
+from app.principal import CurrentPrincipal
 from app.schemas import NotificationCreate
+from app.utils.datetime import jalali_query_param
+from app.utils.query_stats import query_budget
 
 router = APIRouter(
     prefix="/timeslots",
@@ -12,22 +17,17 @@ router = APIRouter(
 @router.post("/", status_code=201)
 def create_time_range(
     time_input: schemas.TimeRangeInput,
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
-    user_id = int(payload.get("sub"))
-    counselor = crud.get_counselor_by_user_id(db, user_id)
-    user = crud.get_user_by_id(db, user_id)
+    counselor = principal.counselor
 
-    if user.role != schemas.RoleEnum.counselor:
+    if principal.role != schemas.RoleEnum.counselor:
         raise HTTPException(403, "Only counselors can create slots")
 
     if not counselor:
         raise HTTPException(404, "Counselor not found")
 
-    if crud.check_range_overlap(db, counselor.counselor_id, time_input.date, time_input.from_time, time_input.to_time):
-        raise HTTPException(400, "Overlapping time range")
-
     time_range, slots = crud.create_time_range_with_slots(
         db, counselor.counselor_id,
         time_input.date, time_input.from_time, time_input.to_time,
@@ -37,17 +37,86 @@ def create_time_range(
     return {"range_id": time_range.id, "slot_count": len(slots)}
 
 
+@router.post("/batch", status_code=201, response_model=list[schemas.TimeRangeBatchResult])
+@query_budget(4)
+def create_time_ranges_batch(
+    batch: schemas.TimeRangeBatchInput,
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
+):
+    if principal.role != schemas.RoleEnum.counselor:
+        raise HTTPException(403, "Only counselors can create slots")
+    counselor = principal.require_counselor()
+
+    dates = crud.expand_batch_dates(batch.dates, batch.weekdays, batch.start_date, batch.end_date)
+    return crud.create_time_ranges_batch(
+        db, counselor.counselor_id, dates, batch.from_time, batch.to_time, batch.duration_minutes
+    )
+
+
+@router.post("/templates", status_code=201, response_model=schemas.WeeklyTemplateOut)
+def create_weekly_template(
+    template_input: schemas.WeeklyTemplateInput,
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
+):
+    if principal.role != schemas.RoleEnum.counselor:
+        raise HTTPException(403, "Only counselors can create slots")
+    counselor = principal.require_counselor()
+
+    return crud.create_weekly_template(
+        db, counselor.counselor_id, template_input.weekday,
+        template_input.from_time, template_input.to_time, template_input.duration_minutes,
+        template_input.valid_from or date.today(), template_input.valid_until
+    )
+
+
+@router.get("/templates/my", response_model=list[schemas.WeeklyTemplateOut])
+@query_budget(2)
+def get_my_templates(principal: CurrentPrincipal, db: Session = Depends(get_db)):
+    counselor = principal.require_counselor()
+    return crud.get_templates_by_counselor(db, counselor.counselor_id)
+
+
+@router.delete("/templates/{template_id}")
+def delete_weekly_template(template_id: int, principal: CurrentPrincipal, db: Session = Depends(get_db)):
+    counselor = principal.require_counselor()
+    if not crud.delete_template(db, counselor.counselor_id, template_id):
+        raise HTTPException(404, "Template not found")
+    return {"message": "Weekly template deleted"}
+
+
 @router.get("/my/", response_model=list[schemas.TimeRangeOut])
+@query_budget(2)
 def get_my_ranges(
-    db: Session = Depends(get_db),
-    payload: dict = Depends(auth.JWTBearer())
+    principal: CurrentPrincipal,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
 ):
-    user_id = int(payload.get("sub"))
-    counselor = crud.get_counselor_by_user_id(db, user_id)
-    if not counselor:
-        raise HTTPException(404, "Counselor not found")
+    counselor = principal.require_counselor()
 
-    return crud.get_ranges_by_counselor(db, counselor.counselor_id)
+    start, end = crud.slot_window(
+        jalali_query_param(date_from, "from"), jalali_query_param(date_to, "to"), include_past=True
+    )
+    return crud.get_ranges_by_counselor(db, counselor.counselor_id, start, end)
+
+
+@router.get("/calendar", response_model=list[schemas.CalendarRange])
+@query_budget(4)
+def get_my_calendar(
+    principal: CurrentPrincipal,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    """The counselor's ranges between the Jalali `from` and `to` dates, with slots and their appointments."""
+    counselor = principal.require_counselor()
+
+    start, end = crud.slot_window(
+        jalali_query_param(date_from, "from"), jalali_query_param(date_to, "to"), include_past=True
+    )
+    return crud.get_counselor_calendar(db, counselor.counselor_id, start, end)
 
 @router.get("/range/", response_model=schemas.TimeRangeWithSlots)
 def get_slots_for_range(
@@ -3,7 +3,7 @@ from pydantic import  EmailStr, constr, BaseModel, validator, Field, conint
 from .models import RoleEnum, AppointmentStatus
 from app.utils.datetime import jalali_to_gregorian
 from datetime import date, time, datetime
-from typing import List, Optional, Literal
+from typing import Generic, List, Optional, Literal, TypeVar
 
 
 class PasswordChangeRequest(BaseModel):
@@ -144,6 +144,70 @@ class TimeRangeInput(BaseModel):
         return v
 
 
+class TimeRangeBatchInput(BaseModel):
+    """Either explicit `dates`, or `weekdays` repeated from `start_date` to `end_date` inclusive.
+
+    Weekdays follow the Jalali week: 0 is Saturday and 6 is Friday.
+    """
+    dates: Optional[List[date]] = None
+    weekdays: Optional[List[conint(ge=0, le=6)]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    from_time: time
+    to_time: time
+    duration_minutes: conint(gt=0)
+
+    @validator("dates", pre=True, each_item=True)
+    def convert_jalali_dates(cls, v):
+        if isinstance(v, str):
+            return jalali_to_gregorian(v)
+        return v
+
+    @validator("start_date", "end_date", pre=True)
+    def convert_jalali(cls, v):
+        if isinstance(v, str):
+            return jalali_to_gregorian(v)
+        return v
+
+
+class TimeRangeBatchResult(BaseModel):
+    date: date
+    created: bool
+    range_id: Optional[int] = None
+    slot_count: int = 0
+    detail: Optional[str] = None
+
+
+class WeeklyTemplateInput(BaseModel):
+    """Weekday follows the Jalali week: 0 is Saturday and 6 is Friday. valid_from defaults to today."""
+    weekday: conint(ge=0, le=6)
+    from_time: time
+    to_time: time
+    duration_minutes: conint(gt=0)
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+
+    @validator("valid_from", "valid_until", pre=True)
+    def convert_jalali(cls, v):
+        if isinstance(v, str):
+            return jalali_to_gregorian(v)
+        return v
+
+
+class WeeklyTemplateOut(BaseModel):
+    id: int
+    counselor_id: int
+    weekday: int
+    from_time: time
+    to_time: time
+    duration: int
+    valid_from: date
+    valid_until: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TimeRangeOut(BaseModel):
     id: int
     counselor_id: int
@@ -166,6 +230,32 @@ class SlotOut(BaseModel):
         from_attributes = True
 
 
+class CalendarAppointment(BaseModel):
+    id: int
+    student_id: int
+    status: Optional[AppointmentStatus]
+
+    class Config:
+        from_attributes = True
+
+
+class CalendarSlot(SlotOut):
+    appointment: Optional[CalendarAppointment] = None
+
+
+class CalendarRange(BaseModel):
+    id: int
+    date: date
+    from_time: time
+    to_time: time
+    duration: int
+    template_id: Optional[int] = None
+    slots: List[CalendarSlot]
+
+    class Config:
+        from_attributes = True
+
+
 class TimeRangeWithSlots(BaseModel):
     id: int
     date: date
@@ -180,9 +270,19 @@ class TimeRangeWithSlots(BaseModel):
 
 
 class AppointmentCreate(BaseModel):
-    slot_id: int
+    """Book a stored slot by `slot_id`, or a weekly template slot by `template_id`, `date` and `start_time`."""
+    slot_id: Optional[int] = None
+    template_id: Optional[int] = None
+    date: Optional[date] = None
+    start_time: Optional[time] = None
     notes: Optional[str] = None
 
+    @validator("date", pre=True)
+    def convert_jalali(cls, v):
+        if isinstance(v, str):
+            return jalali_to_gregorian(v)
+        return v
+
 class AppointmentOut(BaseModel):
     id: int
     student_id: int
@@ -198,6 +298,18 @@ class AppointmentOut(BaseModel):
         
 
 
+class StudentAppointmentItem(BaseModel):
+    appointment_id: int
+    counselor_id: int
+    counselor_firstname: str
+    counselor_lastname: str
+    date: str
+    start_time: time
+    end_time: time
+    status: Optional[AppointmentStatus]
+    notes: Optional[str] = None
+
+
 class AppointmentItem(BaseModel):
     appointment_id: int
     student_id : int
@@ -279,6 +391,22 @@ class FeedbackCreate(BaseModel):
     comment: Optional[str] = None
       
 
+class AvailableSlotOut(BaseModel):
+    # Slots from a weekly template have no id until booked; they carry template_id instead.
+    slot_id: Optional[int] = None
+    template_id: Optional[int] = None
+    counselor_id: int
+    firstname: str
+    lastname: str
+    profile_image_url: Optional[str]
+    province: Optional[str]
+    city: Optional[str]
+    department: Optional[str]
+    date: str
+    start_time: time
+    end_time: time
+
+
 class FeedbackOut(BaseModel):
     comment: Optional[str]
     rating: Optional[int]
@@ -308,7 +436,9 @@ class UserMiniOut(BaseModel):
         from_attributes = True
 
 class SlotWithDate(BaseModel):
-    id: int
+    # Slots from a weekly template have no id until booked; they carry template_id instead.
+    id: Optional[int] = None
+    template_id: Optional[int] = None
     start_time: time
     end_time: time
     date: str
@@ -327,7 +457,10 @@ class PublicCounselorOut(BaseModel):
     province: Optional[str]
     city: Optional[str]
     department: Optional[str]
+    rating_average: Optional[float] = None
+    rating_count: int = 0
     feedbacks: List[FeedbackOut]
+    feedback_next_cursor: Optional[str] = None
     free_slots: List[SlotWithDate]
 
     class Config:
@@ -340,6 +473,12 @@ class FeedbackOut(BaseModel):
     date_submitted: datetime
 
 
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 
 class RecommendationCreate(BaseModel):
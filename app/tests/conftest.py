@@ -0,0 +1,4 @@
+import os
+
+# Routes that run more SQL than their @query_budget fail the test instead of logging a warning.
+os.environ.setdefault("QUERY_BUDGET_STRICT", "true")
@@ -157,13 +157,13 @@ def test_delete_appointment_not_found(mock_db):
 
 
 def test_get_admin_dashboard_data(mock_db):
-    mock_db.query.return_value.filter.return_value.count.side_effect = [5, 2]
+    mock_db.query.return_value.filter.return_value.scalar.side_effect = [5, 2]
 
     mock_top_counselors = [
         ("Alice", "Smith", 10),
         ("Bob", "Jones", 8)
     ]
-    mock_db.query.return_value.join.return_value.join.return_value.filter.return_value.group_by.return_value.order_by.return_value.limit.return_value.all.return_value = mock_top_counselors
+    mock_db.query.return_value.join.return_value.join.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = mock_top_counselors
 
     result = admin_crud.get_admin_dashboard_data(mock_db)
 
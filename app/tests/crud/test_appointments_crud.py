@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from fastapi import HTTPException
@@ -11,101 +12,115 @@ def mock_db():
     return MagicMock()
 
 
-@pytest.mark.asyncio
-async def test_create_appointment_success(mock_db):
-    mock_slot = MagicMock()
-    mock_slot.id = 1
-    mock_slot.is_reserved = False
-    mock_slot.time_range.date = date(2025, 1, 1)
-    mock_slot.time_range.counselor_id = 100
-    mock_slot.start_time = time(10, 0)
-    mock_slot.end_time = time(11, 0)
+@pytest.fixture
+def mock_async_db():
+    db = MagicMock()
+    db.get = AsyncMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    db.refresh = AsyncMock()
+    return db
+
 
-    mock_range = MagicMock()
-    mock_range.date = date(2025, 1, 1)
+def scalar_result(value):
+    result = MagicMock()
+    result.scalar_one.return_value = value
+    return result
 
-    mock_student = MagicMock()
-    mock_student.student_id = 200
-    mock_student.user_id = 300
+
+def first_result(value):
+    result = MagicMock()
+    result.first.return_value = value
+    return result
+
+
+@pytest.mark.asyncio
+async def test_create_appointment_success(mock_async_db):
+    reserved_slot = MagicMock()
+    reserved_slot.start_time = time(10, 0)
+    reserved_slot.end_time = time(11, 0)
+    reserved_slot.date = date(2025, 1, 1)
+    reserved_slot.counselor_id = 100
 
     mock_student_user = MagicMock()
     mock_student_user.firstname = "John"
     mock_student_user.lastname = "Doe"
 
-    mock_counselor = MagicMock()
-    mock_counselor.user_id = 400
-
-    # Query side effects
-    mock_db.query.return_value.filter.return_value.first.side_effect = [
-        mock_slot,        # slot
-        mock_range,       # range
-        mock_slot,        # slot again
-        mock_student,     # student
-        mock_student_user,  # student user
-        mock_counselor    # counselor
+    mock_async_db.execute.side_effect = [
+        first_result(reserved_slot),       # conditional UPDATE ... RETURNING
+        scalar_result(mock_student_user),  # student user
+        scalar_result(400),                # counselor user id
     ]
 
     mock_message_manager = AsyncMock()
 
-    with patch("app.crud.appointments_crud.manager.send_personal_message", mock_message_manager):
-        appointment = await appointments_crud.create_appointment(mock_db, 200, 1, notes="Some notes")
+    with patch("app.crud.appointments_crud.manager.send_personal_message", mock_message_manager), \
+         patch("app.crud.appointments_crud.record_appointment_async", AsyncMock()) as record:
+        appointment = await appointments_crud.create_appointment(mock_async_db, 200, 1, notes="Some notes")
+
+    record.assert_awaited_once_with(mock_async_db, 100, date(2025, 1, 1), models.AppointmentStatus.pending)
 
-    assert mock_slot.is_reserved is True
-    mock_db.add.assert_any_call(appointment)
-    mock_db.commit.assert_called()
+    reserve = str(mock_async_db.execute.await_args_list[0].args[0])
+    assert reserve.startswith("UPDATE available_time_slots") and "RETURNING" in reserve
+    mock_async_db.get.assert_not_awaited()
+    assert appointment.counselor_id == 100
+    assert appointment.slot_id == 1
+    assert appointment.date == date(2025, 1, 1)
+    mock_async_db.add.assert_any_call(appointment)
+    mock_async_db.commit.assert_awaited()
     mock_message_manager.assert_awaited_once()
+    assert mock_message_manager.await_args.args[1] == 400
     assert isinstance(appointment, models.Appointment)
 
 
 @pytest.mark.asyncio
-async def test_create_appointment_slot_not_available(mock_db):
-    mock_slot = MagicMock()
-    mock_slot.is_reserved = True
-    mock_db.query.return_value.filter.return_value.first.return_value = mock_slot
+async def test_create_appointment_slot_not_available(mock_async_db):
+    mock_async_db.execute.return_value = first_result(None)
 
     with pytest.raises(HTTPException) as exc_info:
-        await appointments_crud.create_appointment(mock_db, 1, 1)
+        await appointments_crud.create_appointment(mock_async_db, 1, 1)
 
     assert exc_info.value.status_code == 400
+    mock_async_db.add.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_approve_appointment_success(mock_db):
+async def test_approve_appointment_success(mock_async_db):
     mock_appointment = MagicMock()
     mock_appointment.student_id = 1
     mock_appointment.counselor_id = 2
     mock_appointment.date = date(2025, 1, 1)
     mock_appointment.time = time(10, 0)
+    mock_appointment.status = models.AppointmentStatus.pending
 
-    mock_student = MagicMock()
-    mock_student.user_id = 300
-    mock_student.user.firstname = "StudentF"
-    mock_student.user.lastname = "StudentL"
-
-    mock_counselor = MagicMock()
-    mock_counselor.user.firstname = "CounselorF"
-    mock_counselor.user.lastname = "CounselorL"
+    mock_counselor_user = MagicMock()
+    mock_counselor_user.firstname = "CounselorF"
+    mock_counselor_user.lastname = "CounselorL"
 
-    mock_db.query.return_value.filter.return_value.first.side_effect = [
-        mock_appointment,  # appointment
-        mock_student,      # student
-        mock_counselor     # counselor
+    mock_async_db.get.return_value = mock_appointment
+    mock_async_db.execute.side_effect = [
+        scalar_result(300),                  # student user id
+        scalar_result(mock_counselor_user),  # counselor user
     ]
 
-    with patch("app.crud.appointments_crud.manager.send_personal_message", AsyncMock()):
-        appointment = await appointments_crud.approve_appointment(mock_db, 1)
+    with patch("app.crud.appointments_crud.manager.send_personal_message", AsyncMock()), \
+         patch("app.crud.appointments_crud.record_appointment_async", AsyncMock()) as record:
+        appointment = await appointments_crud.approve_appointment(mock_async_db, 1)
 
     assert appointment.status == models.AppointmentStatus.approved
-    mock_db.add.assert_called()
-    mock_db.commit.assert_called()
+    assert [c.args[3:] for c in record.await_args_list] == [
+        (models.AppointmentStatus.pending, -1), (models.AppointmentStatus.approved,)
+    ]
+    mock_async_db.add.assert_called()
+    mock_async_db.commit.assert_awaited()
 
 
 @pytest.mark.asyncio
-async def test_approve_appointment_not_found(mock_db):
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+async def test_approve_appointment_not_found(mock_async_db):
+    mock_async_db.get.return_value = None
 
     with pytest.raises(HTTPException) as exc_info:
-        await appointments_crud.approve_appointment(mock_db, 1)
+        await appointments_crud.approve_appointment(mock_async_db, 1)
 
     assert exc_info.value.status_code == 404
 
@@ -113,15 +128,19 @@ async def test_approve_appointment_not_found(mock_db):
 def test_cancel_appointment_success(mock_db):
     mock_appointment = MagicMock()
     mock_slot = MagicMock()
+    mock_slot.time_range.template_id = None
     mock_appointment.slot = mock_slot
+    mock_appointment.counselor_id = 7
     mock_db.query.return_value.filter.return_value.first.return_value = mock_appointment
 
-    result = appointments_crud.cancel_appointment(mock_db, 1)
+    with patch("app.crud.appointments_crud.invalidate_counselor_profile") as invalidate:
+        result = appointments_crud.cancel_appointment(mock_db, 1)
 
     assert result is True
     assert mock_slot.is_reserved is False
     mock_db.delete.assert_called_once_with(mock_appointment)
     mock_db.commit.assert_called_once()
+    invalidate.assert_called_once_with(7)
 
 
 def test_cancel_appointment_not_found(mock_db):
@@ -138,23 +157,13 @@ def test_get_appointments_by_status_found(mock_db):
     mock_counselor.counselor_id = 10
     mock_db.query.return_value.filter.return_value.first.return_value = mock_counselor
 
-    mock_appointment = MagicMock()
-    mock_appointment.id = 1
-    mock_appointment.student_id = 2
-    mock_appointment.date = date(2025, 1, 1)
-    mock_appointment.time = time(10, 0)
-    mock_appointment.slot.end_time = time(11, 0)
-
-    mock_student = MagicMock()
-    mock_student.user_id = 5
+    row = MagicMock(
+        id=1, student_id=2, firstname="First", lastname="Last",
+        date=date(2025, 1, 1), time=time(10, 0), end_time=time(11, 0),
+    )
 
-    mock_user = MagicMock()
-    mock_user.firstname = "First"
-    mock_user.lastname = "Last"
-
-    mock_db.query.return_value.join.return_value.join.return_value.filter.return_value.all.return_value = [
-        (mock_appointment, mock_student, mock_user)
-    ]
+    mock_db.query.return_value.join.return_value.join.return_value.join.return_value.filter.return_value \
+        .order_by.return_value.all.return_value = [row]
 
     with patch("app.crud.appointments_crud.to_jalali_str", return_value="1403-01-01"):
         result = appointments_crud.get_appointments_by_status(mock_db, 1, models.AppointmentStatus.approved)
@@ -162,9 +171,281 @@ def test_get_appointments_by_status_found(mock_db):
     assert len(result) == 1
     assert result[0]["firstname"] == "First"
     assert result[0]["date"] == "1403-01-01"
+    assert result[0]["end_time"] == time(11, 0)
 
 
 def test_get_appointments_by_status_no_counselor(mock_db):
     mock_db.query.return_value.filter.return_value.first.return_value = None
     result = appointments_crud.get_appointments_by_status(mock_db, 1, models.AppointmentStatus.approved)
     assert result == []
+
+
+def test_counselor_appointment_pages_filter_and_sort():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.utils.query_stats import assert_max_queries
+
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = models.User(firstname="S", lastname="L", email="s@x.com", password_hash="x")
+        student = models.Student(user=user)
+        db.add(student)
+        for day, hour in [(1, 9), (1, 11), (2, 11), (3, 12), (4, 13)]:
+            time_range = models.CounselorTimeRange(counselor_id=1, date=date(2025, 1, day), from_time=time(hour),
+                                                   to_time=time(hour, 45), duration=45)
+            slot = models.AvailableTimeSlot(time_range=time_range, date=date(2025, 1, day), start_time=time(hour),
+                                            end_time=time(hour, 45), is_reserved=True)
+            db.add(slot)
+            db.flush()
+            db.add(models.Appointment(student_id=student.student_id, counselor_id=1, slot_id=slot.id,
+                                      date=date(2025, 1, day), time=time(hour),
+                                      status=models.AppointmentStatus.approved))
+        db.commit()
+
+        pages, cursor = [], None
+        with assert_max_queries(3):
+            while True:
+                items, cursor = appointments_crud.get_counselor_appointments_page(
+                    db, 1, models.AppointmentStatus.approved, date_to=date(2025, 1, 3),
+                    descending=True, limit=2, cursor=cursor,
+                )
+                pages.append(items)
+                if cursor is None:
+                    break
+
+    # Newest first, the 4th of January filtered out, end_time read from the joined slot.
+    assert [len(page) for page in pages] == [2, 2]
+    assert [(item["start_time"], item["end_time"]) for page in pages for item in page] == [
+        (time(12), time(12, 45)), (time(11), time(11, 45)), (time(11), time(11, 45)), (time(9), time(9, 45)),
+    ]
+
+
+def test_student_appointments_split_upcoming_and_past():
+    from datetime import timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.utils.query_stats import count_queries
+
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    today = date.today()
+    with Session(engine) as db:
+        counselor = models.Counselor(user=models.User(firstname="Cara", lastname="C", email="c@x.com",
+                                                      password_hash="x", role=models.RoleEnum.counselor))
+        student = models.Student(user=models.User(firstname="S", lastname="L", email="s@x.com", password_hash="x"))
+        other = models.Student(user=models.User(firstname="O", lastname="L", email="o@x.com", password_hash="x"))
+        db.add_all([counselor, student, other])
+        db.flush()
+        for offset, owner in [(-3, student), (-1, student), (0, student), (2, student), (5, student), (1, other)]:
+            day = today + timedelta(days=offset)
+            time_range = models.CounselorTimeRange(counselor=counselor, date=day, from_time=time(9),
+                                                   to_time=time(10), duration=60)
+            slot = models.AvailableTimeSlot(time_range=time_range, date=day, start_time=time(9),
+                                            end_time=time(10), is_reserved=True)
+            db.add(slot)
+            db.flush()
+            db.add(models.Appointment(student_id=owner.student_id, counselor_id=counselor.counselor_id,
+                                      slot_id=slot.id, date=day, time=time(9)))
+        db.commit()
+        student_id = student.student_id
+
+        with count_queries() as stats:
+            first, cursor = appointments_crud.get_student_appointments_page(db, student_id, limit=2)
+        second, end = appointments_crud.get_student_appointments_page(db, student_id, limit=2, cursor=cursor)
+        past, _ = appointments_crud.get_student_appointments_page(db, student_id, upcoming=False)
+
+    assert stats.count == 1
+    to_str = appointments_crud.to_jalali_str
+    assert [a["date"] for a in first + second] == [to_str(today + timedelta(days=d)) for d in (0, 2, 5)]
+    assert end is None
+    assert [a["date"] for a in past] == [to_str(today + timedelta(days=d)) for d in (-1, -3)]
+    assert first[0]["counselor_firstname"] == "Cara" and first[0]["end_time"] == time(10)
+    assert first[0]["status"] == models.AppointmentStatus.pending
+
+
+@pytest.fixture
+def booking_db(tmp_path):
+    """A file-backed SQLite database (so aiosqlite connections share it) with one slot and 200 students."""
+    from datetime import timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    url = f"sqlite:///{tmp_path / 'booking.db'}"
+    sync_engine = create_engine(url)
+    models.Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db:
+        counselor_user = models.User(firstname="C", lastname="L", email="c@x.com", password_hash="x",
+                                     role=models.RoleEnum.counselor)
+        db.add(counselor_user)
+        db.flush()
+        counselor = models.Counselor(user_id=counselor_user.userid)
+        # A month out, clear of the days the template tests book.
+        time_range = models.CounselorTimeRange(counselor=counselor, date=date.today() + timedelta(days=30),
+                                               from_time=time(9), to_time=time(10), duration=60)
+        slot = models.AvailableTimeSlot(time_range=time_range, date=time_range.date, start_time=time(9), end_time=time(10))
+        db.add_all([counselor, time_range, slot])
+        student_ids = []
+        for i in range(200):
+            user = models.User(firstname=f"S{i}", lastname="L", email=f"s{i}@x.com", password_hash="x")
+            student = models.Student(user=user)
+            db.add(student)
+            db.flush()
+            student_ids.append(student.student_id)
+        db.commit()
+        data = {"engine": sync_engine, "url": url, "counselor_id": counselor.counselor_id,
+                "slot_id": slot.id, "student_ids": student_ids}
+    yield data
+    sync_engine.dispose()
+
+
+async def _book_concurrently(url, student_ids, book):
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), connect_args={"timeout": 30})
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def attempt(student_id):
+        async with sessions() as db:
+            try:
+                await book(db, student_id)
+                return True
+            except HTTPException as exc:
+                assert exc.status_code == 400
+                return False
+
+    try:
+        with patch("app.crud.appointments_crud.manager.send_personal_message", AsyncMock()):
+            return await asyncio.gather(*(attempt(s) for s in student_ids))
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bookings_reserve_slot_once(booking_db):
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    slot_id = booking_db["slot_id"]
+    results = await _book_concurrently(
+        booking_db["url"], booking_db["student_ids"],
+        lambda db, student_id: appointments_crud.create_appointment(db, student_id, slot_id),
+    )
+
+    assert results.count(True) == 1
+    with Session(booking_db["engine"]) as db:
+        assert db.scalar(select(func.count()).select_from(models.Appointment)) == 1
+        assert db.get(models.AvailableTimeSlot, slot_id).is_reserved is True
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bookings_materialize_template_slot_once(booking_db):
+    from datetime import timedelta
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from app.crud.availability_crud import jalali_weekday, template_free_slots
+
+    day = date.today() + timedelta(days=1)
+    with Session(booking_db["engine"]) as db:
+        template = models.WeeklyAvailabilityTemplate(
+            counselor_id=booking_db["counselor_id"], weekday=jalali_weekday(day),
+            from_time=time(14), to_time=time(16), duration=30, valid_from=date.today(),
+        )
+        db.add(template)
+        db.commit()
+        template_id = template.id
+
+    async def book(db, student_id):
+        slot_id = await appointments_crud.reserve_template_slot(db, template_id, day, time(14, 30))
+        await appointments_crud.create_appointment(db, student_id, slot_id)
+
+    results = await _book_concurrently(booking_db["url"], booking_db["student_ids"][:50], book)
+
+    assert results.count(True) == 1
+    with Session(booking_db["engine"]) as db:
+        materialized = db.query(models.CounselorTimeRange).filter_by(template_id=template_id).all()
+        assert [(r.date, r.from_time, r.to_time) for r in materialized] == [(day, time(14, 30), time(15))]
+        assert db.scalar(select(func.count()).select_from(models.AvailableTimeSlot)) == 2
+        assert db.scalar(select(func.count()).select_from(models.Appointment)) == 1
+        free = template_free_slots(db, booking_db["counselor_id"], day, day)
+        assert [s["start_time"] for s in free] == [time(14), time(15), time(15, 30)]
+
+
+@pytest.mark.asyncio
+async def test_ordinary_range_cannot_double_book_a_template_slot(booking_db):
+    from datetime import timedelta
+    from sqlalchemy.orm import Session
+    from app.crud import timeslots_crud
+    from app.crud.availability_crud import jalali_weekday
+
+    day = date.today() + timedelta(days=1)
+    counselor_id = booking_db["counselor_id"]
+    with Session(booking_db["engine"]) as db:
+        template = models.WeeklyAvailabilityTemplate(
+            counselor_id=counselor_id, weekday=jalali_weekday(day),
+            from_time=time(9), to_time=time(11), duration=60, valid_from=date.today(),
+        )
+        db.add(template)
+        db.commit()
+        template_id = template.id
+
+    async def book(db, student_id):
+        slot_id = await appointments_crud.reserve_template_slot(db, template_id, day, time(9))
+        await appointments_crud.create_appointment(db, student_id, slot_id)
+
+    assert await _book_concurrently(booking_db["url"], booking_db["student_ids"][:1], book) == [True]
+
+    with Session(booking_db["engine"]) as db:
+        with pytest.raises(HTTPException) as exc_info:
+            timeslots_crud.create_time_range_with_slots(db, counselor_id, day, time(9), time(10), 60)
+        assert exc_info.value.status_code == 400
+        results = timeslots_crud.create_time_ranges_batch(
+            db, counselor_id, [day, day + timedelta(days=1)], time(9), time(10), 60
+        )
+        assert [r["created"] for r in results] == [False, True]
+        # The template's 10:00 slot is still free, so a range there is fine.
+        timeslots_crud.create_time_range_with_slots(db, counselor_id, day, time(10), time(11), 60)
+
+        appointment = db.query(models.Appointment).filter_by(date=day).one()
+        appointments_crud.cancel_appointment(db, appointment.id)
+        assert db.query(models.CounselorTimeRange).filter_by(template_id=template_id).count() == 0
+        timeslots_crud.create_time_range_with_slots(db, counselor_id, day, time(9), time(10), 60)
+
+
+@pytest.mark.asyncio
+async def test_reserve_template_slot_rejects_started_slot(mock_async_db):
+    from app.crud.availability_crud import jalali_weekday
+
+    today = date.today()
+    mock_async_db.get.return_value = models.WeeklyAvailabilityTemplate(
+        counselor_id=1, weekday=jalali_weekday(today), from_time=time(0), to_time=time(1), duration=30,
+        valid_from=today,
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await appointments_crud.reserve_template_slot(mock_async_db, 1, today, time(0))
+
+    assert exc_info.value.status_code == 400
+    mock_async_db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_reserve_template_slot_rejects_off_grid_time(booking_db):
+    from datetime import timedelta
+    from sqlalchemy.orm import Session
+    from app.crud.availability_crud import jalali_weekday
+
+    day = date.today() + timedelta(days=1)
+    with Session(booking_db["engine"]) as db:
+        template = models.WeeklyAvailabilityTemplate(
+            counselor_id=booking_db["counselor_id"], weekday=jalali_weekday(day),
+            from_time=time(14), to_time=time(16), duration=30, valid_from=date.today(),
+        )
+        db.add(template)
+        db.commit()
+        template_id = template.id
+
+    async def book(db, student_id):
+        await appointments_crud.reserve_template_slot(db, template_id, day, time(14, 10))
+
+    assert await _book_concurrently(booking_db["url"], booking_db["student_ids"][:1], book) == [False]
@@ -1,9 +1,13 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from fastapi import HTTPException
-from datetime import date
-from app import schemas
+from datetime import date, time as dtime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models, schemas
 from app.crud import counselors_crud
+from app.principal import Principal
+from app.utils.query_stats import assert_max_queries
 
 
 class DummyUser:
@@ -83,29 +87,42 @@ def test_update_counselor_profile_not_found(mock_db):
     assert result is None
 
 
+def test_get_counselor_info_uses_principal():
+    principal = Principal({"sub": "1"}, schemas.RoleEnum.counselor, DummyUser(), counselor=DummyCounselor())
+    result = counselors_crud.get_counselor_info(principal)
+    assert isinstance(result, schemas.CounselorOut)
+    assert result.phone_number == "12345"
+
+
+def test_get_counselor_info_not_found():
+    principal = Principal({"sub": "1"}, schemas.RoleEnum.student, DummyUser())
+    with pytest.raises(HTTPException) as excinfo:
+        counselors_crud.get_counselor_info(principal)
+    assert excinfo.value.status_code == 404
+
+
 def test_update_counselor_profile_service_admin(mock_db):
     mock_user = DummyUser(role=schemas.RoleEnum.admin)
     mock_counselor = DummyCounselor()
+    principal = Principal({"sub": "1"}, schemas.RoleEnum.admin, mock_user, counselor=mock_counselor)
 
-    with patch("app.crud.counselors_crud.get_user_by_id", return_value=mock_user):
-        with patch("app.crud.counselors_crud.get_counselor_by_user_id", return_value=mock_counselor):
-            with patch("app.crud.counselors_crud.update_counselor_profile", return_value=mock_counselor):
-                with patch("app.crud.counselors_crud.update_user_profile", return_value=mock_user):
-                    update_data = schemas.CounselorUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="99999", province="NewProvince", city="NewCity", department="NewDept")
-                    result = counselors_crud.update_counselor_profile_service(mock_db, {"sub": 1}, update_data)
+    update_data = schemas.CounselorUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="99999", province="NewProvince", city="NewCity", department="NewDept")
+    result = counselors_crud.update_counselor_profile_service(mock_db, principal, update_data)
 
     assert isinstance(result, schemas.CounselorUpdate)
-    assert result.phone_number == "12345"  # comes from counselor mock
+    assert result.phone_number == "99999"
+    assert mock_counselor.department == "NewDept"
+    mock_db.commit.assert_called_once()
+    mock_db.query.assert_not_called()
 
 
 def test_update_counselor_profile_service_permission_denied(mock_db):
     mock_user = DummyUser(userid=1, role=schemas.RoleEnum.student)
     mock_counselor = DummyCounselor(user_id=2)
+    principal = Principal({"sub": "1"}, schemas.RoleEnum.student, mock_user, counselor=mock_counselor)
 
-    with patch("app.crud.counselors_crud.get_user_by_id", return_value=mock_user):
-        with patch("app.crud.counselors_crud.get_counselor_by_user_id", return_value=mock_counselor):
-            with pytest.raises(HTTPException) as excinfo:
-                counselors_crud.update_counselor_profile_service(mock_db, {"sub": 1}, schemas.CounselorUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="99999", province="NewProvince", city="NewCity", department="NewDept"))
+    with pytest.raises(HTTPException) as excinfo:
+        counselors_crud.update_counselor_profile_service(mock_db, principal, schemas.CounselorUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="99999", province="NewProvince", city="NewCity", department="NewDept"))
     assert excinfo.value.status_code == 403
 
 
@@ -120,3 +137,54 @@ def test_delete_counselor_not_found(mock_db):
     with patch("app.crud.counselors_crud.get_counselor_by_id", return_value=None):
         result = counselors_crud.delete_counselor(mock_db, 1)
     assert result is False
+
+
+# ---------- counselor dashboard ----------
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    counselors_crud.counselor_dashboard_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        counselors_crud.counselor_dashboard_cache.clear()
+
+
+def test_counselor_dashboard_stats_in_one_query(db_session):
+    today = date.today()
+    approved, pending = models.AppointmentStatus.approved, models.AppointmentStatus.pending
+    for slot_id, (student_id, days, status) in enumerate([
+        (1, -3, approved), (2, -10, approved), (1, -45, approved),  # two recent sessions
+        (3, 5, approved), (3, 6, pending),                          # one upcoming approved
+    ], start=1):
+        db_session.add(models.Appointment(
+            student_id=student_id, counselor_id=1, slot_id=slot_id,
+            date=today + timedelta(days=days), time=dtime(9, 0), status=status,
+        ))
+    db_session.add(models.Appointment(
+        student_id=9, counselor_id=2, slot_id=6, date=today, time=dtime(9, 0), status=approved,
+    ))
+    db_session.commit()
+
+    with assert_max_queries(1):
+        stats = counselors_crud.get_counselor_dashboard_stats(db_session, 1)
+
+    assert stats == {"recent_sessions": 2, "upcoming_approved_requests": 1, "unique_students": 3}
+
+
+def test_counselor_dashboard_is_cached_until_invalidated(db_session):
+    first = counselors_crud.get_counselor_dashboard(db_session, 1)
+    db_session.add(models.Appointment(
+        student_id=1, counselor_id=1, slot_id=1, date=date.today(), time=dtime(9, 0),
+        status=models.AppointmentStatus.approved,
+    ))
+    db_session.commit()
+
+    with assert_max_queries(0):
+        assert counselors_crud.get_counselor_dashboard(db_session, 1) == first
+
+    counselors_crud.invalidate_counselor_dashboard(1)
+    assert counselors_crud.get_counselor_dashboard(db_session, 1)["recent_sessions"] == 1
@@ -2,7 +2,13 @@ import pytest
 from unittest.mock import MagicMock, patch
 from fastapi import HTTPException
 
+from datetime import date, datetime, time as dtime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
 from app.crud import public_crud
+from app.crud.availability_crud import jalali_weekday
+from app.utils.datetime import to_jalali_str
 from app import models
 
 
@@ -88,7 +94,9 @@ def test_get_public_counselor_info_success():
         phone_number="12345",
         province="SomeProvince",
         city="SomeCity",
-        department="Dept"
+        department="Dept",
+        rating_sum=9,
+        rating_count=2
     )
 
     # Fake free slots
@@ -105,24 +113,26 @@ def test_get_public_counselor_info_success():
 
     # First query: counselor
     # Second query: slots
-    # Third query: feedbacks
+    # Third query: newest feedbacks
     db.query.return_value.options.return_value.filter.return_value.first.side_effect = [
         fake_counselor  # counselor found
     ]
-    db.query.return_value.join.return_value.filter.return_value.all.side_effect = [
+    db.query.return_value.join.return_value.filter.return_value.order_by.return_value.all.side_effect = [
         [fake_slot]  # slots
     ]
-    db.query.return_value.filter.return_value.all.side_effect = [
-        fake_feedbacks  # feedbacks
-    ]
 
-    with patch("app.crud.public_crud.to_jalali_str", return_value="1402-01-01"):
+    with patch("app.crud.public_crud.to_jalali_str", return_value="1402-01-01"), \
+         patch("app.crud.public_crud.template_free_slots", return_value=[]), \
+         patch("app.crud.public_crud.get_feedback_page", return_value=(fake_feedbacks, "next")) as page:
         result = public_crud.get_public_counselor_info(db, 123)
 
     assert result["counselor_id"] == 123
     assert result["firstname"] == "Jane"
     assert result["free_slots"][0]["date"] == "1402-01-01"
     assert result["feedbacks"] == fake_feedbacks
+    assert result["feedback_next_cursor"] == "next"
+    assert result["rating_average"] == 4.5
+    page.assert_called_once_with(db, 123, public_crud.PROFILE_FEEDBACK_LIMIT)
 
 
 def test_get_public_counselor_info_not_found():
@@ -134,3 +144,208 @@ def test_get_public_counselor_info_not_found():
 
     assert exc.value.status_code == 404
     assert "Counselor not found" in exc.value.detail
+
+
+# ---------- rating aggregates / feedback pages ----------
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _counselor_with_student(db):
+    counselor_user = models.User(firstname="C", lastname="L", email="c@x.com", password_hash="x", role=models.RoleEnum.counselor)
+    student_user = models.User(firstname="S", lastname="L", email="s@x.com", password_hash="x", role=models.RoleEnum.student)
+    db.add_all([counselor_user, student_user])
+    db.flush()
+    counselor = models.Counselor(user_id=counselor_user.userid)
+    student = models.Student(user_id=student_user.userid)
+    db.add_all([counselor, student])
+    db.flush()
+    db.add(models.Appointment(
+        student_id=student.student_id, counselor_id=counselor.counselor_id, slot_id=1,
+        date=date(2024, 1, 1), time=dtime(9, 0), status=models.AppointmentStatus.approved,
+    ))
+    db.commit()
+    return counselor, student_user
+
+
+def test_leave_feedback_maintains_rating_aggregates(db_session):
+    counselor, student_user = _counselor_with_student(db_session)
+
+    public_crud.leave_feedback(db_session, student_user.userid, counselor.counselor_id, rating=5)
+    public_crud.leave_feedback(db_session, student_user.userid, counselor.counselor_id, rating=2)
+    public_crud.leave_feedback(db_session, student_user.userid, counselor.counselor_id, comment="no rating")
+
+    db_session.refresh(counselor)
+    assert (counselor.rating_sum, counselor.rating_count) == (7, 2)
+    assert public_crud.rating_average(counselor) == 3.5
+
+
+def test_feedback_pages_follow_keyset_cursor(db_session):
+    counselor, student_user = _counselor_with_student(db_session)
+    submitted = datetime(2024, 1, 1)
+    for i in range(5):
+        db_session.add(models.Feedback(
+            student_id=1, counselor_id=counselor.counselor_id, rating=i,
+            # Two rows share a timestamp so the id breaks the tie.
+            date_submitted=submitted + timedelta(days=min(i, 3)),
+        ))
+    db_session.commit()
+
+    first, cursor = public_crud.get_feedback_page(db_session, counselor.counselor_id, limit=2)
+    second, cursor2 = public_crud.get_feedback_page(db_session, counselor.counselor_id, limit=2, cursor=cursor)
+    third, cursor3 = public_crud.get_feedback_page(db_session, counselor.counselor_id, limit=2, cursor=cursor2)
+
+    assert [f.rating for f in first + second + third] == [4, 3, 2, 1, 0]
+    assert cursor3 is None
+
+
+def test_feedback_page_rejects_bad_cursor(db_session):
+    with pytest.raises(HTTPException) as exc:
+        public_crud.get_feedback_page(db_session, 1, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+# ---------- availability search ----------
+class _Noon(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls.combine(date.today(), dtime(12, 0))
+
+
+@pytest.fixture
+def noon():
+    """Make it 12:00 today for the checks that drop slots that have started."""
+    with patch("app.crud.availability_crud.datetime", _Noon):
+        yield
+
+
+def _counselor_with_slots(db, email, province, department, day, starts, reserved=()):
+    user = models.User(firstname=email, lastname="L", email=email, password_hash="x", role=models.RoleEnum.counselor)
+    db.add(user)
+    db.flush()
+    counselor = models.Counselor(user_id=user.userid, province=province, city="C", department=department)
+    db.add(counselor)
+    db.flush()
+    time_range = models.CounselorTimeRange(
+        counselor_id=counselor.counselor_id, date=day, from_time=dtime(8, 0), to_time=dtime(18, 0), duration=30
+    )
+    db.add(time_range)
+    db.flush()
+    for hour in starts:
+        db.add(models.AvailableTimeSlot(
+            range_id=time_range.id, date=day, start_time=dtime(hour, 0), end_time=dtime(hour, 30), is_reserved=hour in reserved
+        ))
+    db.commit()
+    return counselor
+
+
+def test_search_availability_filters_and_pages_across_counselors(db_session):
+    day = date.today() + timedelta(days=2)
+    a = _counselor_with_slots(db_session, "a@x.com", "Tehran", "Math", day, [9, 10, 11], reserved=[10])
+    b = _counselor_with_slots(db_session, "b@x.com", "Tehran", "Math", day, [9, 16])
+    _counselor_with_slots(db_session, "c@x.com", "Fars", "Math", day, [8])
+    _counselor_with_slots(db_session, "d@x.com", "Tehran", "Math", day - timedelta(days=1), [8])
+
+    pages, cursor = [], None
+    while True:
+        items, cursor = public_crud.search_availability(
+            db_session, date_from=day, province="Tehran", department="Math",
+            time_to=dtime(12, 0), limit=2, cursor=cursor,
+        )
+        pages.append(items)
+        if cursor is None:
+            break
+
+    found = [(s["counselor_id"], s["start_time"]) for page in pages for s in page]
+    assert found == [(a.counselor_id, dtime(9, 0)), (b.counselor_id, dtime(9, 0)), (a.counselor_id, dtime(11, 0))]
+    assert len(pages) == 2
+    assert pages[0][0]["date"] == to_jalali_str(day)
+
+
+def test_search_availability_merges_weekly_template_slots(db_session):
+    day = date.today() + timedelta(days=2)
+    a = _counselor_with_slots(db_session, "a@x.com", "Tehran", "Math", day, [9, 11])
+    b = _counselor_with_slots(db_session, "b@x.com", "Tehran", "Math", day, [])
+    c = _counselor_with_slots(db_session, "c@x.com", "Fars", "Math", day, [])
+    for counselor in (b, c):
+        db_session.add(models.WeeklyAvailabilityTemplate(
+            counselor_id=counselor.counselor_id, weekday=jalali_weekday(day), from_time=dtime(9, 0),
+            to_time=dtime(10, 0), duration=30, valid_from=date.today(),
+        ))
+    db_session.commit()
+
+    pages, cursor = [], None
+    while True:
+        items, cursor = public_crud.search_availability(
+            db_session, date_from=day, date_to=day, province="Tehran", limit=2, cursor=cursor,
+        )
+        pages.append(items)
+        if cursor is None:
+            break
+
+    found = [(s["counselor_id"], s["start_time"], s["slot_id"] is None) for page in pages for s in page]
+    assert found == [
+        (a.counselor_id, dtime(9, 0), False),
+        (b.counselor_id, dtime(9, 0), True),
+        (b.counselor_id, dtime(9, 30), True),
+        (a.counselor_id, dtime(11, 0), False),
+    ]
+    assert pages[0][1]["template_id"] is not None and pages[0][1]["firstname"] == "b@x.com"
+
+
+def test_search_availability_skips_slots_that_have_started(db_session, noon):
+    today = date.today()
+    a = _counselor_with_slots(db_session, "a@x.com", "Tehran", "Math", today, [9, 15])
+    b = _counselor_with_slots(db_session, "b@x.com", "Tehran", "Math", today, [])
+    db_session.add(models.WeeklyAvailabilityTemplate(
+        counselor_id=b.counselor_id, weekday=jalali_weekday(today), from_time=dtime(11, 0),
+        to_time=dtime(13, 0), duration=60, valid_from=today,
+    ))
+    db_session.commit()
+
+    items, _ = public_crud.search_availability(db_session, date_to=today)
+
+    assert [(s["counselor_id"], s["start_time"]) for s in items] == [
+        (b.counselor_id, dtime(12, 0)), (a.counselor_id, dtime(15, 0)),
+    ]
+
+
+def test_search_availability_rejects_bad_cursor(db_session):
+    with pytest.raises(HTTPException) as exc:
+        public_crud.search_availability(db_session, cursor="bad")
+    assert exc.value.status_code == 400
+
+
+def test_public_profile_lists_only_the_date_window(db_session, noon):
+    today = date.today()
+    counselor = _counselor_with_slots(db_session, "a@x.com", "Tehran", "Math", today - timedelta(days=1), [9])
+    # Today's 09:00 slot has already started.
+    for day, hour in ((today, 9), (today, 15), (today + timedelta(days=40), 9)):
+        time_range = models.CounselorTimeRange(
+            counselor_id=counselor.counselor_id, date=day, from_time=dtime(hour, 0), to_time=dtime(hour + 1, 0),
+            duration=60,
+        )
+        db_session.add(time_range)
+        db_session.flush()
+        db_session.add(models.AvailableTimeSlot(
+            range_id=time_range.id, date=day, start_time=dtime(hour, 0), end_time=dtime(hour + 1, 0),
+            is_reserved=False,
+        ))
+    db_session.commit()
+
+    default = public_crud.get_public_counselor_info(db_session, counselor.counselor_id)
+    wider = public_crud.get_public_counselor_info(
+        db_session, counselor.counselor_id, today - timedelta(days=7), today + timedelta(days=60)
+    )
+
+    assert [s["date"] for s in default["free_slots"]] == [to_jalali_str(today)]
+    assert [s["date"] for s in wider["free_slots"]] == [to_jalali_str(today), to_jalali_str(today + timedelta(days=40))]
+    with pytest.raises(HTTPException):
+        public_crud.get_public_counselor_view(db_session, counselor.counselor_id, today, today + timedelta(days=400))
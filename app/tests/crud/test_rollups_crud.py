@@ -0,0 +1,124 @@
+import pytest
+from datetime import date, time, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.crud import admin_crud, appointments_crud, rollups_crud, timeslots_crud, users_crud
+from app.models import AppointmentDailyCount, AppointmentStatus, CounselorAppointmentTotal, RoleCount, RoleEnum
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    # The rollup hooks rely on ON DELETE CASCADE, which SQLite only enforces on request.
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _snapshot(db):
+    return (
+        sorted((r.counselor_id, r.date, r.status, r.count) for r in db.query(AppointmentDailyCount) if r.count),
+        sorted((r.counselor_id, r.status, r.count) for r in db.query(CounselorAppointmentTotal) if r.count),
+        sorted((r.role.value, r.count) for r in db.query(RoleCount) if r.count),
+    )
+
+
+def _user(db, email, role):
+    return users_crud.create_user(db, schemas.UserCreate(
+        firstname="F", lastname="L", email=email, password="@Secret123", role=role,
+    ))
+
+
+def _book(db, student_id, counselor_id, slot, day, status=AppointmentStatus.pending):
+    appointment = models.Appointment(
+        student_id=student_id, counselor_id=counselor_id, slot_id=slot.id,
+        date=day, time=slot.start_time, status=status,
+    )
+    slot.is_reserved = True
+    db.add(appointment)
+    rollups_crud.record_appointment(db, counselor_id, day, status)
+    db.commit()
+    return appointment
+
+
+def test_incremental_rollups_match_rebuild(db_session):
+    db = db_session
+    counselor_user = _user(db, "c@x.com", RoleEnum.counselor)
+    student_users = [_user(db, f"s{i}@x.com", RoleEnum.student) for i in range(3)]
+    counselor_id = counselor_user.counselor.counselor_id
+    day = date.today()
+    time_range, slots = timeslots_crud.create_time_range_with_slots(db, counselor_id, day, time(9), time(13), 60)
+    other_range, other_slots = timeslots_crud.create_time_range_with_slots(
+        db, counselor_id, day + timedelta(days=1), time(9), time(10), 60
+    )
+
+    _book(db, student_users[0].student.student_id, counselor_id, slots[0], day, AppointmentStatus.approved)
+    cancelled = _book(db, student_users[1].student.student_id, counselor_id, slots[1], day)
+    deleted = _book(db, student_users[1].student.student_id, counselor_id, slots[2], day)
+    _book(db, student_users[2].student.student_id, counselor_id, other_slots[0], day + timedelta(days=1))
+    _book(db, student_users[2].student.student_id, counselor_id, slots[3], day, AppointmentStatus.approved)
+
+    appointments_crud.cancel_appointment(db, cancelled.id)
+    admin_crud.delete_appointment_by_id(db, deleted.id)
+    timeslots_crud.delete_range_by_id(db, other_range.id)
+    admin_crud.delete_user(db, student_users[2].userid)
+    users_crud.update_user_role(db, student_users[1].userid, "counselor")
+
+    incremental = _snapshot(db)
+    rollups_crud.rebuild_rollups(db)
+    assert incremental == _snapshot(db)
+    assert incremental[1] == [(counselor_id, AppointmentStatus.approved, 1)]
+
+
+def test_admin_dashboard_reads_rollups(db_session):
+    db = db_session
+    counselor_user = _user(db, "c@x.com", RoleEnum.counselor)
+    student_user = _user(db, "s@x.com", RoleEnum.student)
+    counselor_id = counselor_user.counselor.counselor_id
+    _, slots = timeslots_crud.create_time_range_with_slots(db, counselor_id, date.today(), time(9), time(11), 60)
+    _book(db, student_user.student.student_id, counselor_id, slots[0], date.today(), AppointmentStatus.approved)
+    _book(db, student_user.student.student_id, counselor_id, slots[1], date.today() - timedelta(days=30), AppointmentStatus.approved)
+
+    data = admin_crud.get_admin_dashboard_data(db)
+
+    assert data["active_users"] == 2
+    assert data["done_appointments_last_week"] == 1
+    assert data["top_counselors"] == [{"firstname": "F", "lastname": "L", "session_count": 2}]
+
+
+def test_deleting_appointments_invalidates_counselor_dashboard(db_session):
+    from app.crud import counselors_crud
+
+    db = db_session
+    counselors_crud.counselor_dashboard_cache.clear()
+    counselor_user = _user(db, "c@x.com", RoleEnum.counselor)
+    students = [_user(db, f"s{i}@x.com", RoleEnum.student) for i in range(3)]
+    counselor_id = counselor_user.counselor.counselor_id
+    day = date.today() + timedelta(days=1)
+    ranges = []
+    for i, student_user in enumerate(students):
+        time_range, slots = timeslots_crud.create_time_range_with_slots(
+            db, counselor_id, day + timedelta(days=i), time(9), time(10), 60
+        )
+        _book(db, student_user.student.student_id, counselor_id, slots[0], time_range.date, AppointmentStatus.approved)
+        ranges.append(time_range.id)
+
+    def upcoming():
+        return counselors_crud.get_counselor_dashboard(db, counselor_id)["upcoming_approved_requests"]
+
+    try:
+        assert upcoming() == 3
+        timeslots_crud.delete_range_by_id(db, ranges[0])
+        assert upcoming() == 2
+        users_crud.delete_user(db, students[1].userid)
+        assert upcoming() == 1
+        admin_crud.delete_user(db, students[2].userid)
+        assert upcoming() == 0
+    finally:
+        counselors_crud.counselor_dashboard_cache.clear()
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 from fastapi import HTTPException
 from app.crud import students_crud
 from app import schemas
+from app.principal import Principal
 
 
 # ---------- get_student_by_user_id / get_student_by_id ----------
@@ -17,7 +18,6 @@ def test_get_student_by_user_id_and_id():
 
 # ---------- get_student_info ----------
 def test_get_student_info_success():
-    db = MagicMock()
     fake_user = MagicMock(
         firstname="John",
         lastname="Doe",
@@ -34,23 +34,19 @@ def test_get_student_info_success():
         semester_or_year="First",
         gpa=3.5
     )
-    with patch.object(students_crud.crud, "get_user_by_id", return_value=fake_user), \
-         patch.object(students_crud, "get_student_by_user_id", return_value=fake_student):
+    principal = Principal({"sub": "42"}, schemas.RoleEnum.student, fake_user, student=fake_student)
 
-        payload = {"sub": "42"}
-        result = students_crud.get_student_info(db, payload)
+    result = students_crud.get_student_info(principal)
 
     assert isinstance(result, schemas.StudentOut)
     assert result.firstname == "John"
 
 
 def test_get_student_info_student_not_found():
-    db = MagicMock()
-    with patch.object(students_crud.crud, "get_user_by_id", return_value=MagicMock()), \
-         patch.object(students_crud, "get_student_by_user_id", return_value=None):
+    principal = Principal({"sub": "42"}, schemas.RoleEnum.student, MagicMock())
 
-        with pytest.raises(HTTPException) as exc:
-            students_crud.get_student_info(db, {"sub": "42"})
+    with pytest.raises(HTTPException) as exc:
+        students_crud.get_student_info(principal)
 
     assert exc.value.status_code == 404
 
@@ -104,60 +100,56 @@ def test_update_student_profile_service_success_as_admin():
     )
 
     fake_user = SimpleNamespace(
+        userid=7,
         role=schemas.RoleEnum.admin,
+        firstname="Jane",
+        lastname="Roe",
+        email="jane@example.com"
+    )
+    principal = Principal({"sub": "7"}, schemas.RoleEnum.admin, fake_user, student=fake_student)
+
+    student_in = schemas.StudentUpdate(
         firstname="John",
         lastname="Doe",
-        email="john@example.com"
+        email="john@example.com",
+        phone_number="999",
+        province="newProvince",
+        city="newCity",
+        education_year="2025",
+        field_of_study="Computer",
+        semester_or_year="Fall",
+        gpa=3.8
     )
 
-    with patch.object(students_crud.crud, "get_user_by_id", return_value=fake_user), \
-         patch.object(students_crud, "get_student_by_user_id", return_value=fake_student), \
-         patch.object(students_crud, "update_student_profile", return_value=fake_student), \
-         patch.object(students_crud.crud, "update_user_profile", return_value=fake_user):
-
-        student_in = schemas.StudentUpdate(
-            firstname="John",
-            lastname="Doe",
-            email="john@example.com",
-            phone_number="999",
-            province="newProvince",
-            city="newCity",
-            education_year="2025",
-            field_of_study="Computer",
-            semester_or_year="Fall",
-            gpa=3.8
-        )
+    result = students_crud.update_student_profile_service(db, principal, student_in)
 
-        result = students_crud.update_student_profile_service(db, {"sub": "5"}, student_in)
-
-        assert result.firstname == "John"
-        assert result.lastname == "Doe"
-        assert result.phone_number == "12345"
+    assert result.firstname == "John"
+    assert result.lastname == "Doe"
+    assert result.phone_number == "999"
+    assert fake_student.gpa == 3.8
+    db.commit.assert_called_once()
+    db.query.assert_not_called()
 
 
 def test_update_student_profile_service_permission_denied():
     db = MagicMock()
     fake_student = MagicMock(student_id=1, user_id=99)
-    fake_user = MagicMock(role=schemas.RoleEnum.student)
-
-    with patch.object(students_crud.crud, "get_user_by_id", return_value=fake_user), \
-         patch.object(students_crud, "get_student_by_user_id", return_value=fake_student):
+    fake_user = MagicMock(userid=5, role=schemas.RoleEnum.student)
+    principal = Principal({"sub": "5"}, schemas.RoleEnum.student, fake_user, student=fake_student)
 
-        with pytest.raises(HTTPException) as exc:
-            students_crud.update_student_profile_service(db, {"sub": "5"}, schemas.StudentUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="999", province="newProvince", city="newCity", education_year="2025", field_of_study="Computer", semester_or_year="Fall", gpa=192.4848569))
+    with pytest.raises(HTTPException) as exc:
+        students_crud.update_student_profile_service(db, principal, schemas.StudentUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="999", province="newProvince", city="newCity", education_year="2025", field_of_study="Computer", semester_or_year="Fall", gpa=192.4848569))
 
     assert exc.value.status_code == 403
+    db.commit.assert_not_called()
 
 
 def test_update_student_profile_service_student_not_found():
     db = MagicMock()
-    fake_user = MagicMock(role=schemas.RoleEnum.student)
-
-    with patch.object(students_crud.crud, "get_user_by_id", return_value=fake_user), \
-         patch.object(students_crud, "get_student_by_user_id", return_value=None):
+    principal = Principal({"sub": "5"}, schemas.RoleEnum.student, MagicMock(userid=5))
 
-        with pytest.raises(HTTPException) as exc:
-            students_crud.update_student_profile_service(db, {"sub": "5"}, schemas.StudentUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="999", province="newProvince", city="newCity", education_year="2025", field_of_study="Computer", semester_or_year="Fall", gpa=192.4848569))
+    with pytest.raises(HTTPException) as exc:
+        students_crud.update_student_profile_service(db, principal, schemas.StudentUpdate(firstname="John", lastname="Doe", email="john@example.com", phone_number="999", province="newProvince", city="newCity", education_year="2025", field_of_study="Computer", semester_or_year="Fall", gpa=192.4848569))
 
     assert exc.value.status_code == 404
 
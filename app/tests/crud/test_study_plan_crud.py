@@ -11,19 +11,28 @@ from app.models import StudyPlan, StudyActivity, Student, Counselor, User, Notif
 from app.schemas import ActivityStatusUpdate, StudyPlanCreate
 
 
+def make_async_db():
+    db = MagicMock()
+    db.get = AsyncMock()
+    db.execute = AsyncMock()
+    db.flush = AsyncMock()
+    db.commit = AsyncMock()
+    return db
+
+
 @pytest.mark.asyncio
 async def test_create_study_plan_success():
-    db = MagicMock()
+    db = make_async_db()
 
     mock_counselor = Counselor(counselor_id=1, user_id=10)
     mock_student = Student(student_id=2, user_id=20)
     mock_user = User(userid=10, firstname="John", lastname="Doe")
 
-    db.query().filter().first.side_effect = [
-        mock_counselor,  # counselor found
-        mock_student     # student found
+    db.execute.return_value = MagicMock(**{"scalar_one_or_none.return_value": mock_counselor})  # counselor found
+    db.get.side_effect = [
+        mock_student,  # student found
+        mock_user      # counselor user
     ]
-    db.query().get.return_value = mock_user
 
     mock_data = MagicMock()
     mock_data.student_id = 2
@@ -34,13 +43,13 @@ async def test_create_study_plan_success():
 
     assert isinstance(result, StudyPlan)
     db.add.assert_any_call(result)
-    db.commit.assert_called()
+    db.commit.assert_awaited()
 
 
 @pytest.mark.asyncio
 async def test_create_study_plan_no_counselor():
-    db = MagicMock()
-    db.query().filter().first.return_value = None
+    db = make_async_db()
+    db.execute.return_value = MagicMock(**{"scalar_one_or_none.return_value": None})
 
     mock_data = MagicMock()
     mock_data.student_id = 2
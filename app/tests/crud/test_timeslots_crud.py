@@ -1,13 +1,18 @@
 # tests/test_timeslots_crud.py
 
 import pytest
-from datetime import date, time
+from datetime import date, time, timedelta
+from fastapi import HTTPException
 
+from unittest.mock import MagicMock
 from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
-from app.models import Base, CounselorTimeRange, AvailableTimeSlot
+from app.models import Base, Appointment, AppointmentStatus, CounselorTimeRange, AvailableTimeSlot
 from app.crud import timeslots_crud
+from app.crud.availability_crud import template_free_slots
+from app.utils.query_stats import count_queries, assert_max_queries, QueryBudgetExceeded
 
 
 @pytest.fixture(scope="function")
@@ -147,3 +152,190 @@ def test_delete_range_by_id(db_session):
 
     # Deleting again should return False
     assert timeslots_crud.delete_range_by_id(db_session, tr.id) is False
+
+
+def test_create_time_range_rejects_overlap_and_bad_bounds(db_session):
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session, counselor_id=3, date=date(2025, 8, 13),
+        from_time=time(9, 0), to_time=time(10, 0), duration_minutes=30
+    )
+    with pytest.raises(HTTPException) as exc:
+        timeslots_crud.create_time_range_with_slots(
+            db=db_session, counselor_id=3, date=date(2025, 8, 13),
+            from_time=time(9, 30), to_time=time(10, 30), duration_minutes=30
+        )
+    assert exc.value.detail == "Overlapping time range"
+    with pytest.raises(HTTPException):
+        timeslots_crud.create_time_range_with_slots(
+            db=db_session, counselor_id=3, date=date(2025, 8, 14),
+            from_time=time(10, 0), to_time=time(9, 0), duration_minutes=30
+        )
+    # Touching ranges are fine: the periods are half-open.
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session, counselor_id=3, date=date(2025, 8, 13),
+        from_time=time(10, 0), to_time=time(11, 0), duration_minutes=30
+    )
+    assert db_session.query(CounselorTimeRange).count() == 2
+
+
+class _ExclusionViolation(Exception):
+    pgcode = "23P01"
+
+
+def test_create_time_range_maps_exclusion_violation_on_postgres():
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    db.flush.side_effect = IntegrityError("INSERT ...", {}, _ExclusionViolation())
+
+    with pytest.raises(HTTPException) as exc:
+        timeslots_crud.create_time_range_with_slots(
+            db=db, counselor_id=3, date=date(2025, 8, 13),
+            from_time=time(9, 0), to_time=time(10, 0), duration_minutes=30
+        )
+
+    assert exc.value.status_code == 400 and exc.value.detail == "Overlapping time range"
+    db.query.assert_not_called()  # no read-then-insert pre-check on PostgreSQL
+    db.rollback.assert_called_once()
+    db.commit.assert_not_called()
+
+
+def test_create_time_ranges_batch_skips_overlaps(db_session):
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session, counselor_id=4, date=date(2025, 8, 14),
+        from_time=time(9, 30), to_time=time(10, 30), duration_minutes=30
+    )
+    dates = [date(2025, 8, 13) + timedelta(days=i) for i in range(30)]
+
+    with assert_max_queries(3):
+        results = timeslots_crud.create_time_ranges_batch(
+            db_session, 4, dates + dates[:2], time(9, 0), time(11, 0), 30
+        )
+
+    assert [r["date"] for r in results] == dates
+    assert results[1] == {"date": date(2025, 8, 14), "created": False, "detail": "Overlapping time range"}
+    created = [r for r in results if r["created"]]
+    assert len(created) == 29 and all(r["slot_count"] == 4 for r in created)
+    assert db_session.query(CounselorTimeRange).count() == 30
+    assert db_session.query(AvailableTimeSlot).filter(
+        AvailableTimeSlot.range_id == created[0]["range_id"]
+    ).count() == 4
+    assert db_session.query(AvailableTimeSlot).count() == 2 + 29 * 4
+
+
+def test_expand_batch_dates_by_jalali_weekday():
+    # 2025-08-16 is a Saturday (weekday 0) and 2025-08-22 a Friday (weekday 6).
+    dates = timeslots_crud.expand_batch_dates(
+        weekdays=[0, 6], start_date=date(2025, 8, 16), end_date=date(2025, 8, 30)
+    )
+    assert dates == [date(2025, 8, 16), date(2025, 8, 22), date(2025, 8, 23), date(2025, 8, 29), date(2025, 8, 30)]
+
+    with pytest.raises(HTTPException):
+        timeslots_crud.expand_batch_dates(weekdays=[0], start_date=date(2025, 1, 1), end_date=date(2026, 6, 1))
+    with pytest.raises(HTTPException):
+        timeslots_crud.expand_batch_dates(weekdays=[0])
+
+
+def test_weekly_template_slots_are_virtual(db_session):
+    # 2025-08-16 is a Saturday (Jalali weekday 0).
+    template = timeslots_crud.create_weekly_template(
+        db_session, 6, 0, time(9, 0), time(11, 0), 30, valid_from=date(2025, 8, 1), valid_until=date(2025, 8, 31)
+    )
+    with pytest.raises(HTTPException):
+        timeslots_crud.create_weekly_template(db_session, 6, 0, time(10, 0), time(12, 0), 30, date(2025, 8, 20))
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session, counselor_id=6, date=date(2025, 8, 23),
+        from_time=time(9, 45), to_time=time(10, 15), duration_minutes=30
+    )
+
+    free = template_free_slots(db_session, 6, date(2025, 8, 14), date(2025, 9, 7))
+
+    assert db_session.query(AvailableTimeSlot).count() == 1
+    assert {s["template_id"] for s in free} == {template.id}
+    by_date = {}
+    for s in free:
+        by_date.setdefault(s["date"], []).append(s["start_time"])
+    assert by_date == {
+        date(2025, 8, 16): [time(9, 0), time(9, 30), time(10, 0), time(10, 30)],
+        date(2025, 8, 23): [time(9, 0), time(10, 30)],  # 9:30 and 10:00 clash with the stored 9:45 slot
+        date(2025, 8, 30): [time(9, 0), time(9, 30), time(10, 0), time(10, 30)],
+    }
+
+
+def test_count_queries_counts_statements(db_session):
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session,
+        counselor_id=3,
+        date=date(2025, 8, 13),
+        from_time=time(9, 0),
+        to_time=time(10, 0),
+        duration_minutes=30
+    )
+
+    with count_queries() as stats:
+        timeslots_crud.get_ranges_by_counselor(db_session, 3)
+
+    assert stats.count == 1
+
+
+def test_assert_max_queries_flags_overruns(db_session):
+    timeslots_crud.create_time_range_with_slots(
+        db=db_session, counselor_id=9, date=date(2025, 8, 13),
+        from_time=time(9, 0), to_time=time(10, 0), duration_minutes=30
+    )
+
+    with pytest.raises(QueryBudgetExceeded):
+        with assert_max_queries(1):
+            timeslots_crud.get_ranges_by_counselor(db_session, 9)
+            timeslots_crud.get_slots_by_range(db_session, 1)
+
+
+def test_ranges_with_slots_take_two_queries(db_session):
+    for day in (13, 14, 15):
+        timeslots_crud.create_time_range_with_slots(
+            db=db_session,
+            counselor_id=9,
+            date=date(2025, 8, day),
+            from_time=time(9, 0),
+            to_time=time(10, 0),
+            duration_minutes=30
+        )
+    db_session.expire_all()
+
+    # The ranges, then every range's slots in one selectinload.
+    with assert_max_queries(2):
+        result = timeslots_crud.get_time_ranges_with_slots_for_counselor(db_session, 9)
+    assert [len(item["slots"]) for item in result] == [2, 2, 2]
+
+
+def test_calendar_query_count_does_not_grow_with_ranges(db_session):
+    counts = []
+    for ranges in (1, 10):
+        counselor_id = 20 + ranges
+        for day in range(ranges):
+            timeslots_crud.create_time_range_with_slots(
+                db=db_session, counselor_id=counselor_id, date=date(2025, 8, 1) + timedelta(days=day),
+                from_time=time(9, 0), to_time=time(11, 0), duration_minutes=30
+            )
+        first_slot = db_session.query(AvailableTimeSlot).join(CounselorTimeRange).filter(
+            CounselorTimeRange.counselor_id == counselor_id
+        ).order_by(AvailableTimeSlot.id).first()
+        first_slot.is_reserved = True
+        db_session.add(Appointment(
+            student_id=1, counselor_id=counselor_id, slot_id=first_slot.id, date=first_slot.date,
+            time=first_slot.start_time, status=AppointmentStatus.approved,
+        ))
+        db_session.commit()
+        db_session.expire_all()
+
+        with count_queries() as stats:
+            calendar = timeslots_crud.get_counselor_calendar(
+                db_session, counselor_id, date(2025, 8, 1), date(2025, 8, 31)
+            )
+            slots = [slot for time_range in calendar for slot in time_range.slots]
+            statuses = [slot.appointment and slot.appointment.status for slot in slots]
+        counts.append(stats.count)
+
+        assert len(calendar) == ranges and len(slots) == 4 * ranges
+        assert statuses[0] == AppointmentStatus.approved and statuses[1:] == [None] * (4 * ranges - 1)
+
+    assert counts == [3, 3]
@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.database import get_db, get_read_db
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(bind=engine)
+
+    def override():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override
+    app.dependency_overrides[get_read_db] = override
+    db = TestingSessionLocal()
+    for i in range(3):
+        user = models.User(
+            firstname=f"C{i}", lastname="L", email=f"c{i}@example.com",
+            password_hash="x", role=models.RoleEnum.counselor,
+        )
+        db.add(user)
+        db.flush()
+        db.add(models.Counselor(user_id=user.userid))
+    db.commit()
+    db.close()
+    crud.invalidate_counselor()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        crud.invalidate_counselor()
@@ -0,0 +1,17 @@
+from app import auth, models
+
+
+def _admin_headers():
+    token = auth.create_access_token(subject="admin", role=models.RoleEnum.admin)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_admin_pool_stats(client):
+    assert client.get("/admin/db/pool").status_code in (401, 403)
+
+    response = client.get("/admin/db/pool", headers=_admin_headers())
+
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert {"connects", "checkouts", "checkout_timeouts", "wait_ms"} <= primary.keys()
+    assert set(primary["wait_ms"]) == {"count", "avg", "max", "histogram"}
@@ -0,0 +1,86 @@
+import dataclasses
+import json
+from datetime import date, datetime, time
+
+from fastapi.encoders import jsonable_encoder
+
+from app import auth, models
+from app.database import get_db
+from app.main import app
+from app.utils.responses import FastJSONResponse
+
+
+def _admin_headers():
+    token = auth.create_access_token(subject="admin", role=models.RoleEnum.admin)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _session():
+    return next(app.dependency_overrides[get_db]())
+
+
+def test_fast_json_matches_jsonable_encoder():
+    @dataclasses.dataclass
+    class Slot:
+        day: date
+        start: time
+        status: models.AppointmentStatus
+
+    content = [
+        {"at": datetime(2025, 1, 2, 3, 4, 5, 6), "role": models.RoleEnum.counselor, "name": "مشاور"},
+        Slot(date(2025, 1, 2), time(9, 30), models.AppointmentStatus.pending),
+    ]
+    body = FastJSONResponse(content).body
+    assert json.loads(body) == jsonable_encoder(content)
+
+
+def test_admin_users_are_projected(client):
+    response = client.get("/admin/users", params={"role": "counselor"}, headers=_admin_headers())
+    assert response.status_code == 200
+    users = response.json()
+    assert [u["firstname"] for u in users] == ["C0", "C1", "C2"]
+    assert "password_hash" not in users[0]
+    assert users[0]["role"] == "counselor"
+    datetime.fromisoformat(users[0]["registrationDate"])
+
+
+def test_admin_appointments_serialize_dates_and_enums(client):
+    db = _session()
+    db.add(models.Appointment(
+        student_id=1, counselor_id=1, slot_id=1, date=date(2025, 5, 6), time=time(10, 30),
+        status=models.AppointmentStatus.approved,
+    ))
+    db.commit()
+    db.close()
+
+    response = client.get("/admin/appointments", params={"status": "approved"}, headers=_admin_headers())
+
+    assert response.status_code == 200
+    assert response.json() == [{
+        "id": 1, "student_id": 1, "counselor_id": 1, "slot_id": 1, "date": "2025-05-06",
+        "time": "10:30:00", "status": "approved", "notes": None,
+    }]
+
+
+def test_study_plan_history_groups_activities(client):
+    db = _session()
+    plan = models.StudyPlan(counselor_id=1, student_id=7, created_at=datetime(2025, 1, 1), is_finalized=True)
+    db.add(plan)
+    db.flush()
+    db.add_all([
+        models.StudyActivity(plan_id=plan.plan_id, date=date(2025, 1, 2), start_time=time(8), end_time=time(9), title="A"),
+        models.StudyActivity(plan_id=plan.plan_id, date=date(2025, 1, 3), start_time=time(10), end_time=time(11), title="B"),
+    ])
+    db.commit()
+    db.close()
+
+    response = client.get("/study-plan/study-plan/counselor/history/7")
+
+    assert response.status_code == 200
+    assert response.json() == [{
+        "plan_id": 1, "created_at": "2025-01-01T00:00:00", "finalized_at": True,
+        "activities": [
+            {"date": "2025-01-02", "start_time": "08:00", "end_time": "09:00", "title": "A", "description": None},
+            {"date": "2025-01-03", "start_time": "10:00", "end_time": "11:00", "title": "B", "description": None},
+        ],
+    }]
@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import auth, models
+from app.crud.availability_crud import jalali_weekday
+from app.database import get_read_db
+from app.main import app
+from app.utils.datetime import to_jalali_str
+from app.utils.query_stats import query_budget
+
+
+def _without_queries(path):
+    route = next(r for r in app.routes if getattr(r, "path", None) == path)
+    original = getattr(route.endpoint, "__query_budget__")
+    query_budget(0)(route.endpoint)
+    return lambda: query_budget(original)(route.endpoint)
+
+
+def test_directory_sends_strong_etag(client):
+    response = client.get("/public/counselors/")
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert client.get("/counselors/").headers["etag"] == etag
+
+
+def test_if_none_match_returns_304_without_queries(client):
+    etag = client.get("/public/counselors/").headers["etag"]
+    restore = _without_queries("/public/counselors/")
+    try:
+        response = client.get("/public/counselors/", headers={"If-None-Match": etag})
+        cached = client.get("/public/counselors/")
+    finally:
+        restore()
+    assert response.status_code == 304
+    assert response.content == b""
+    assert cached.status_code == 200
+    assert len(cached.json()) == 3
+
+
+def test_profile_update_invalidates_directory(client):
+    etag = client.get("/public/counselors/").headers["etag"]
+    token = auth.create_access_token(subject=1, role=models.RoleEnum.counselor, counselor_id=1)
+    response = client.put(
+        "/counselors/update-profile/",
+        json={
+            "firstname": "Renamed", "lastname": "L", "email": "c0@example.com",
+            "phone_number": None, "province": None, "city": None, "department": None,
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+
+    response = client.get("/public/counselors/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["firstname"] == "Renamed"
+
+
+def _counselor_headers():
+    token = auth.create_access_token(subject=1, role=models.RoleEnum.counselor, counselor_id=1)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_profile_is_served_from_cache(client):
+    first = client.get("/public/counselor/1")
+    assert first.status_code == 200
+    restore = _without_queries("/public/counselor/{counselor_id}")
+    try:
+        second = client.get("/public/counselor/1")
+        not_modified = client.get("/public/counselor/1", headers={"If-None-Match": first.headers["etag"]})
+    finally:
+        restore()
+    assert second.json() == first.json()
+    assert not_modified.status_code == 304
+
+
+def test_slot_changes_invalidate_only_that_counselor(client):
+    assert client.get("/public/counselor/1").json()["free_slots"] == []
+    other_etag = client.get("/public/counselor/2").headers["etag"]
+
+    response = client.post(
+        "/timeslots/",
+        json={"date": to_jalali_str(date.today() + timedelta(days=1)), "from_time": "09:00", "to_time": "11:00",
+              "duration_minutes": 60},
+        headers=_counselor_headers(),
+    )
+    assert response.status_code == 201
+    assert len(client.get("/public/counselor/1").json()["free_slots"]) == 2
+
+    restore = _without_queries("/public/counselor/{counselor_id}")
+    try:
+        assert client.get("/public/counselor/2").headers["etag"] == other_etag
+    finally:
+        restore()
+
+    client.delete(f"/timeslots/range/{response.json()['range_id']}")
+    assert client.get("/public/counselor/1").json()["free_slots"] == []
+
+
+def test_weekly_template_adds_virtual_slots(client):
+    # Tomorrow's weekday, so none of the slots has started yet.
+    weekday = jalali_weekday(date.today() + timedelta(days=1))
+    response = client.post(
+        "/timeslots/templates",
+        json={"weekday": weekday, "from_time": "09:00", "to_time": "10:00", "duration_minutes": 30},
+        headers=_counselor_headers(),
+    )
+    assert response.status_code == 201
+
+    slots = client.get("/public/counselor/1").json()["free_slots"]
+    # Four such days in the default 28-day horizon, two slots each, none stored.
+    assert len(slots) == 8
+    assert all(s["id"] is None and s["template_id"] == response.json()["id"] for s in slots)
+    found = client.get("/public/availability", params={"limit": 100}).json()["items"]
+    assert [(s["date"], s["start_time"][:5]) for s in found] == [(s["date"], s["start_time"][:5]) for s in slots]
+
+    client.delete(f"/timeslots/templates/{response.json()['id']}", headers=_counselor_headers())
+    assert client.get("/public/counselor/1").json()["free_slots"] == []
+
+
+def test_availability_search_parses_jalali_window(client):
+    response = client.get("/public/availability", params={"date_from": "1404-05-25", "time_from": "09:00"})
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
+    assert client.get("/public/availability", params={"date_from": "1404-13-01"}).status_code == 400
+
+
+@pytest.fixture
+def lagging_replica(client):
+    """Point get_read_db at a copy of the seed data that never sees later writes."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    ReplicaSession = sessionmaker(bind=engine)
+    db = ReplicaSession()
+    for i in range(3):
+        user = models.User(
+            firstname=f"C{i}", lastname="L", email=f"c{i}@example.com",
+            password_hash="x", role=models.RoleEnum.counselor,
+        )
+        db.add(user)
+        db.flush()
+        db.add(models.Counselor(user_id=user.userid))
+    db.commit()
+    db.close()
+
+    def read_db():
+        session = ReplicaSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_read_db] = read_db
+    yield client
+    engine.dispose()
+
+
+def test_cached_payloads_are_not_filled_from_a_lagging_replica(lagging_replica):
+    client = lagging_replica
+    assert client.get("/public/counselor/1").json()["free_slots"] == []
+    client.get("/public/counselors/")
+
+    response = client.post(
+        "/timeslots/",
+        json={"date": to_jalali_str(date.today() + timedelta(days=1)), "from_time": "09:00", "to_time": "11:00",
+              "duration_minutes": 60},
+        headers=_counselor_headers(),
+    )
+    assert response.status_code == 201
+    response = client.put(
+        "/counselors/update-profile/",
+        json={
+            "firstname": "Renamed", "lastname": "L", "email": "c0@example.com",
+            "phone_number": None, "province": None, "city": None, "department": None,
+        },
+        headers=_counselor_headers(),
+    )
+    assert response.status_code == 200
+
+    assert len(client.get("/public/counselor/1").json()["free_slots"]) == 2
+    assert client.get("/public/counselors/").json()[0]["firstname"] == "Renamed"
+    assert client.get("/counselors/").json()[0]["firstname"] == "Renamed"
@@ -0,0 +1,103 @@
+import pytest
+from datetime import datetime, timedelta
+from jose import jwt
+
+from app import auth, models
+from app.database import get_db
+from app.main import app
+from app.routers import authentication
+from app.utils.query_stats import QueryBudgetExceeded, query_budget
+
+
+def test_public_directory_within_budget(client):
+    response = client.get("/public/counselors/")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_route_over_budget_fails(client):
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/public/counselors/")
+    original = getattr(route.endpoint, "__query_budget__")
+    query_budget(0)(route.endpoint)
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            client.get("/public/counselors/")
+    finally:
+        query_budget(original)(route.endpoint)
+
+
+def test_principal_is_resolved_in_one_query(client):
+    token = auth.create_access_token(subject=1, role=models.RoleEnum.counselor)
+    response = client.get("/counselors/me/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["firstname"] == "C0"
+
+
+def test_principal_rejects_unknown_user(client):
+    token = auth.create_access_token(subject=999, role=models.RoleEnum.counselor)
+    response = client.get("/counselors/me/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
+def _legacy_token(user_id, role):
+    # Tokens issued before the claims version was added carry only sub and role.
+    return jwt.encode(
+        {"exp": datetime.utcnow() + timedelta(minutes=5), "sub": str(user_id), "role": role.value},
+        auth.JWT_SECRET_KEY, algorithm=auth.ALGORITHM,
+    )
+
+
+@pytest.mark.parametrize("budget, token", [
+    (1, lambda: auth.create_access_token(subject=1, role=models.RoleEnum.counselor, counselor_id=1)),
+    (2, lambda: _legacy_token(1, models.RoleEnum.counselor)),
+])
+def test_counselor_id_claim_skips_lookup(client, budget, token):
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/appointments/pending")
+    original = getattr(route.endpoint, "__query_budget__")
+    query_budget(budget)(route.endpoint)
+    try:
+        response = client.get("/appointments/pending", headers={"Authorization": f"Bearer {token()}"})
+    finally:
+        query_budget(original)(route.endpoint)
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_login_token_carries_role_id(client, monkeypatch):
+    monkeypatch.setattr(authentication, "ADMIN_EMAIL", "admin@example.com")
+    monkeypatch.setattr(authentication, "ADMIN_PASSWORD", "admin")
+    db_user = models.User(
+        firstname="S", lastname="L", email="s@example.com",
+        password_hash=auth.get_hashed_password("secret"), role=models.RoleEnum.student,
+    )
+    override = app.dependency_overrides[get_db]
+    db = next(override())
+    db.add(db_user)
+    db.flush()
+    db.add(models.Student(user_id=db_user.userid))
+    db.commit()
+    db.close()
+
+    response = client.post("/auth/login/", json={"email": "s@example.com", "password": "secret"})
+    payload = auth.decode_token(response.json()["access_token"])
+    assert payload["ver"] == auth.CLAIMS_VERSION
+    assert payload["student_id"] == 1
+    assert "counselor_id" not in payload
+
+
+def test_calendar_stays_within_budget(client):
+    headers = {"Authorization": f"Bearer {auth.create_access_token(subject=1, role=models.RoleEnum.counselor)}"}
+    for day in ("1404-05-01", "1404-05-02", "1404-05-03"):
+        response = client.post(
+            "/timeslots/",
+            json={"date": day, "from_time": "09:00", "to_time": "11:00", "duration_minutes": 30},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    response = client.get("/timeslots/calendar", params={"from": "1404-05-01", "to": "1404-05-31"}, headers=headers)
+
+    assert response.status_code == 200
+    assert [len(r["slots"]) for r in response.json()] == [4, 4, 4]
+    assert all(s["appointment"] is None for r in response.json() for s in r["slots"])
+    assert client.get("/timeslots/calendar", params={"from": "x"}, headers=headers).status_code == 400
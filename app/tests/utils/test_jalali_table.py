@@ -0,0 +1,32 @@
+import pytest
+import jdatetime
+from datetime import date, timedelta
+
+from app.utils.datetime import jalali_to_gregorian, to_jalali_str
+from app.utils.jalali_table import JalaliTable
+
+
+def test_table_matches_jdatetime_across_window():
+    table = JalaliTable(2020, 2027)
+    day = date(2020, 1, 1)
+    while day <= date(2027, 12, 31):
+        jalali = jdatetime.date.fromgregorian(date=day)
+        assert table.to_jalali_str(day) == jalali.strftime('%Y-%m-%d')
+        assert table.to_gregorian(jalali.year, jalali.month, jalali.day) == day
+        day += timedelta(days=1)
+
+
+def test_table_leaves_outside_and_invalid_dates_to_caller():
+    table = JalaliTable(2020, 2027)
+    assert table.to_jalali_str(date(2019, 12, 31)) is None
+    assert table.to_gregorian(1398, 10, 9) is None  # 2019-12-30
+    assert table.to_gregorian(1404, 12, 30) is None  # 1404 is not a leap year
+    assert table.to_gregorian(1403, 13, 1) is None
+
+
+def test_helpers_fall_back_to_jdatetime():
+    assert to_jalali_str(date(1990, 3, 21)) == "1369-01-01"
+    assert jalali_to_gregorian("1369-01-01") == date(1990, 3, 21)
+    assert jalali_to_gregorian("1403-12-30") == date(2025, 3, 20)
+    with pytest.raises(ValueError):
+        jalali_to_gregorian("1404-12-30")
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.utils import pool_metrics
+from app.utils.pool_metrics import InstrumentedQueuePool, WAIT_BUCKETS_MS, instrument_engine
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    metrics = instrument_engine("test", engine)
+    try:
+        yield engine, metrics
+    finally:
+        pool_metrics._registry.pop("test", None)
+        engine.dispose()
+
+
+def test_checkout_waits_fill_the_histogram(instrumented):
+    engine, metrics = instrumented
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    stats = metrics.snapshot()
+    assert stats["checkouts"] == stats["checkins"] == 3
+    assert stats["wait_ms"]["count"] == 3
+    assert sum(stats["wait_ms"]["histogram"].values()) == 3
+    assert len(stats["wait_ms"]["histogram"]) == len(WAIT_BUCKETS_MS) + 1
+    assert stats["size"] == 1 and stats["checked_out"] == 0
+
+
+def test_checkout_timeouts_are_counted(instrumented):
+    engine, metrics = instrumented
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert metrics.snapshot()["checked_out"] == 1
+
+    stats = metrics.snapshot()
+    assert stats["checkout_timeouts"] == 1
+    assert stats["wait_ms"]["count"] == 2
+    # The timed-out wait lasted at least pool_timeout (50 ms).
+    assert stats["wait_ms"]["max"] >= 50
+
+
+def test_metrics_follow_the_pool_across_dispose(instrumented):
+    engine, metrics = instrumented
+    with engine.connect():
+        pass
+    old_pool = engine.pool
+    engine.dispose()
+    with engine.connect():
+        assert metrics.snapshot()["checked_out"] == 1
+
+    assert engine.pool is not old_pool and engine.pool.metrics is metrics
+    stats = metrics.snapshot()
+    assert stats["checkouts"] == 2
+    assert stats["wait_ms"]["count"] == 2
+    assert stats["checked_out"] == 0
+
+
+def test_pool_stats_lists_every_instrumented_engine(instrumented):
+    assert "test" in pool_metrics.pool_stats()
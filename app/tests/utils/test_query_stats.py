@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.utils.query_stats import count_queries
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        with count_queries() as stats:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+        leftovers = {k: v for k, v in conn.info.items() if isinstance(v, list)}
+
+    assert stats.count == 1
+    assert stats.duration_ms > 0
+    assert leftovers == {}
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A stand-in replica engine, a stubbed lag query and a controllable clock."""
+    replica_engine = create_engine("sqlite://")
+    monkeypatch.setattr(database, "replica_engine", replica_engine)
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica_engine))
+    monkeypatch.setattr(database, "_replica_state", {"checked_at": float("-inf"), "lag": None, "usable": False})
+    monkeypatch.setattr(database.settings, "db_replica_max_lag", 5.0)
+    monkeypatch.setattr(database.settings, "db_replica_lag_check_interval", 10.0)
+    state = {"now": 1000.0, "lag": 0.5, "calls": 0}
+
+    def lag():
+        state["calls"] += 1
+        if isinstance(state["lag"], Exception):
+            raise state["lag"]
+        return state["lag"]
+
+    monkeypatch.setattr(database, "replica_lag", lag)
+    monkeypatch.setattr(database, "time", SimpleNamespace(monotonic=lambda: state["now"]))
+    yield replica_engine, state
+    replica_engine.dispose()
+
+
+def _read_bind():
+    gen = database.get_read_db()
+    db = next(gen)
+    try:
+        return db.get_bind()
+    finally:
+        gen.close()
+
+
+def test_without_a_replica_reads_go_to_the_primary(monkeypatch):
+    monkeypatch.setattr(database, "replica_engine", None)
+    assert database.replica_is_usable() is False
+    assert _read_bind() is database.engine
+
+
+def test_fresh_replica_serves_reads(replica):
+    replica_engine, _ = replica
+    assert database.replica_is_usable() is True
+    assert _read_bind() is replica_engine
+
+
+def test_lagging_replica_falls_back_to_the_primary(replica):
+    _, state = replica
+    state["lag"] = 6.0
+    assert database.replica_is_usable() is False
+    assert _read_bind() is database.engine
+
+
+def test_unreachable_replica_falls_back_to_the_primary(replica, caplog):
+    _, state = replica
+    state["lag"] = ConnectionError("replica down")
+    assert database.replica_is_usable() is False
+    assert _read_bind() is database.engine
+    assert "Read replica unreachable" in caplog.text
+
+
+def test_lag_check_is_cached_for_the_interval(replica):
+    _, state = replica
+    assert database.replica_is_usable() is True
+    state["lag"] = 60.0
+    state["now"] += 9.0
+    assert database.replica_is_usable() is True
+    assert state["calls"] == 1
+
+    state["now"] += 1.0
+    assert database.replica_is_usable() is False
+    assert state["calls"] == 2
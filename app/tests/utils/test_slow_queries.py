@@ -0,0 +1,115 @@
+import logging
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.utils import slow_queries
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    """A fresh SQLite engine with the slow query listeners and an empty log."""
+    monkeypatch.setattr(slow_queries.settings, "slow_query_ms", 0.0)
+    monkeypatch.setattr(slow_queries.settings, "slow_query_log_path", "")
+    monkeypatch.setattr(slow_queries, "_file_handler_ready", False)
+    slow_queries._recent.clear()
+    slow_queries._explained_at.clear()
+    engine = create_engine("sqlite://")
+    slow_queries.install(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        slow_queries._recent.clear()
+        slow_queries._explained_at.clear()
+
+
+def _pg_conn(**info):
+    return SimpleNamespace(dialect=SimpleNamespace(name="postgresql", is_async=False), info=info)
+
+
+def test_parameters_are_redacted_except_numbers_and_dates():
+    redacted = slow_queries._redact({
+        "email": "a@x.com", "id": 7, "score": 1.5, "ok": True, "none": None,
+        "day": date(2025, 1, 2), "at": datetime(2025, 1, 2, 3, 4), "ids": ["x", 2],
+    })
+    assert redacted == {
+        "email": "***", "id": 7, "score": 1.5, "ok": True, "none": None,
+        "day": "2025-01-02", "at": "2025-01-02T03:04:00", "ids": ["***", 2],
+    }
+
+
+def test_only_statements_over_the_threshold_are_logged(slow_log, monkeypatch):
+    with slow_log.connect() as conn:
+        conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+        monkeypatch.setattr(slow_queries.settings, "slow_query_ms", 60_000.0)
+        conn.execute(text("SELECT 2"))
+
+    records = slow_queries.recent_slow_queries()
+    assert [r["statement"] for r in records] == ["SELECT ?"]
+    assert records[0]["parameters"] == ["***"]
+
+
+def test_failed_statements_leave_no_timing_state(slow_log):
+    with slow_log.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert not any(isinstance(v, list) for v in conn.info.values())
+
+
+def test_log_file_rotates_with_configured_size_and_backups(tmp_path, monkeypatch):
+    monkeypatch.setattr(slow_queries, "_file_handler_ready", False)
+    monkeypatch.setattr(slow_queries.settings, "slow_query_log_path", str(tmp_path / "logs" / "slow.log"))
+    monkeypatch.setattr(slow_queries.settings, "slow_query_log_max_bytes", 1234)
+    monkeypatch.setattr(slow_queries.settings, "slow_query_log_backups", 3)
+    before = list(slow_queries.logger.handlers)
+    try:
+        slow_queries._setup_file_handler()
+        added = [h for h in slow_queries.logger.handlers if h not in before]
+        assert len(added) == 1 and isinstance(added[0], RotatingFileHandler)
+        assert (added[0].maxBytes, added[0].backupCount) == (1234, 3)
+        assert added[0].baseFilename == str(tmp_path / "logs" / "slow.log")
+        assert slow_queries.logger.level == logging.INFO
+    finally:
+        for handler in slow_queries.logger.handlers[len(before):]:
+            slow_queries.logger.removeHandler(handler)
+            handler.close()
+
+
+def test_explain_is_throttled_per_statement(monkeypatch):
+    slow_queries._explained_at.clear()
+    monkeypatch.setattr(slow_queries.settings, "slow_query_explain", True)
+    monkeypatch.setattr(slow_queries.settings, "slow_query_explain_interval", 600)
+    conn = _pg_conn()
+
+    assert slow_queries._should_explain(conn, "SELECT 1") is True
+    assert slow_queries._should_explain(conn, "SELECT 1") is False
+    assert slow_queries._should_explain(conn, "SELECT 2") is True
+    # ANALYZE would run writes, and other dialects have no such EXPLAIN.
+    assert slow_queries._should_explain(conn, "UPDATE users SET x = 1") is False
+    sqlite_conn = SimpleNamespace(dialect=SimpleNamespace(name="sqlite", is_async=False), info={})
+    assert slow_queries._should_explain(sqlite_conn, "SELECT 3") is False
+
+    monkeypatch.setattr(slow_queries.settings, "slow_query_explain_interval", 0)
+    assert slow_queries._should_explain(conn, "SELECT 1") is True
+    monkeypatch.setattr(slow_queries.settings, "slow_query_explain", False)
+    assert slow_queries._should_explain(conn, "SELECT 4") is False
+    slow_queries._explained_at.clear()
+
+
+def test_explain_connection_is_not_logged_and_failures_are_recorded(slow_log):
+    record = {"statement": "SELECT 1"}
+    # SQLite has no EXPLAIN (ANALYZE, BUFFERS): the record is still emitted, with the error.
+    slow_queries._explain(slow_log, "SELECT 1", (), record)
+
+    records = slow_queries.recent_slow_queries()
+    assert records == [record] and "plan_error" in record
+
+    with slow_log.connect() as conn:
+        conn.info[slow_queries._SKIP] = True
+        conn.execute(text("SELECT 5"))
+    assert len(slow_queries.recent_slow_queries()) == 1
@@ -1,9 +1,27 @@
 import jdatetime
 from datetime import date
+from fastapi import HTTPException
+from app.utils.jalali_table import get_table
 
 def jalali_to_gregorian(jalali_str: str) -> date:
     parts = list(map(int, jalali_str.split("-")))
-    return jdatetime.date(parts[0], parts[1], parts[2]).togregorian()
+    g_date = get_table().to_gregorian(*parts) if len(parts) == 3 else None
+    if g_date is None:
+        # Outside the table, or not a valid Jalali date: let jdatetime decide.
+        return jdatetime.date(parts[0], parts[1], parts[2]).togregorian()
+    return g_date
 
 def to_jalali_str(g_date):
-    return jdatetime.date.fromgregorian(date=g_date).strftime('%Y-%m-%d')
+    jalali = get_table().to_jalali_str(g_date)
+    if jalali is None:
+        return jdatetime.date.fromgregorian(date=g_date).strftime('%Y-%m-%d')
+    return jalali
+
+def jalali_query_param(value: str | None, name: str) -> date | None:
+    """Parse an optional Jalali date from a query string; a bad value is a client error."""
+    if value is None:
+        return None
+    try:
+        return jalali_to_gregorian(value)
+    except (ValueError, IndexError):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
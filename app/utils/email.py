@@ -1,16 +1,14 @@
-import os
 import smtplib
 from email.message import EmailMessage
-from dotenv import load_dotenv
+from app.config import get_settings
 
-env_path = os.path.join(os.path.dirname(__file__), "..", "..", ".env")
-load_dotenv(dotenv_path=os.path.abspath(env_path))
+settings = get_settings()
 
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
-SMTP_USERNAME = os.getenv("SMTP_USERNAME")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-SMTP_FROM = os.getenv("SMTP_FROM")
+SMTP_HOST = settings.smtp_host
+SMTP_PORT = settings.smtp_port
+SMTP_USERNAME = settings.smtp_username
+SMTP_PASSWORD = settings.smtp_password
+SMTP_FROM = settings.smtp_from
 
 def send_email(to_email: str, subject: str, body: str) -> None:
     msg = EmailMessage()
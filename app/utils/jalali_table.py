@@ -0,0 +1,88 @@
+"""Precomputed Gregorian <-> Jalali conversion for a window of years.
+
+Building a `jdatetime.date` per row is the dominant cost when a response
+renders hundreds of slot or activity dates. The table is built once, on
+first use, for the Gregorian years JALALI_TABLE_START_YEAR through
+JALALI_TABLE_END_YEAR:
+
+* Gregorian -> Jalali is a list of formatted strings indexed by
+  `date.toordinal() - first ordinal`.
+* Jalali -> Gregorian is an array of the ordinal of Farvardin 1 for each
+  Jalali year, plus the fixed month offsets of the Jalali calendar.
+
+Dates outside the window, and invalid Jalali dates, go through jdatetime so
+callers see exactly the results and errors they did before.
+"""
+import threading
+from array import array
+from datetime import date
+
+import jdatetime
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Days before the first of each Jalali month: six 31-day months, then 30-day ones.
+_MONTH_OFFSETS = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+
+
+class JalaliTable:
+    def __init__(self, start_year: int, end_year: int):
+        self.first_ordinal = date(start_year, 1, 1).toordinal()
+        self.last_ordinal = date(end_year, 12, 31).toordinal()
+
+        first = jdatetime.date.fromgregorian(date=date(start_year, 1, 1))
+        last = jdatetime.date.fromgregorian(date=date(end_year, 12, 31))
+        self.first_year = first.year
+        # Ordinal of Farvardin 1 for every Jalali year that starts or ends in the window,
+        # plus one more so the length of the last year is known.
+        self.year_starts = array("l")
+        ordinal = self.first_ordinal - (_MONTH_OFFSETS[first.month - 1] + first.day - 1)
+        for year in range(first.year, last.year + 2):
+            self.year_starts.append(ordinal)
+            ordinal += 366 if jdatetime.date(year, 1, 1).isleap() else 365
+
+        self.strings: list[str] = []
+        for year in range(first.year, last.year + 1):
+            leap = self.year_starts[year - self.first_year + 1] - self.year_starts[year - self.first_year] == 366
+            for month in range(1, 13):
+                days = 31 if month <= 6 else 30 if month < 12 or leap else 29
+                for day in range(1, days + 1):
+                    self.strings.append(f"{year:04d}-{month:02d}-{day:02d}")
+        skip = _MONTH_OFFSETS[first.month - 1] + first.day - 1
+        del self.strings[:skip]
+        del self.strings[self.last_ordinal - self.first_ordinal + 1:]
+
+    def to_jalali_str(self, g_date: date) -> str | None:
+        index = g_date.toordinal() - self.first_ordinal
+        if 0 <= index < len(self.strings):
+            return self.strings[index]
+        return None
+
+    def to_gregorian(self, year: int, month: int, day: int) -> date | None:
+        index = year - self.first_year
+        if not (0 <= index < len(self.year_starts) - 1 and 1 <= month <= 12 and day >= 1):
+            return None
+        start = self.year_starts[index]
+        year_length = self.year_starts[index + 1] - start
+        month_length = 31 if month <= 6 else 30 if month < 12 or year_length == 366 else 29
+        if day > month_length:
+            return None
+        ordinal = start + _MONTH_OFFSETS[month - 1] + day - 1
+        if not self.first_ordinal <= ordinal <= self.last_ordinal:
+            return None
+        return date.fromordinal(ordinal)
+
+
+_table: JalaliTable | None = None
+_lock = threading.Lock()
+
+
+def get_table() -> JalaliTable:
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = JalaliTable(settings.jalali_table_start_year, settings.jalali_table_end_year)
+    return _table
@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import date, datetime, time
+from fastapi import HTTPException
+
+
+def _default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last row returned into an opaque, URL-safe cursor."""
+    raw = json.dumps(list(values), default=_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Unpack a cursor made by encode_cursor, converting each value with the matching type.
+
+    `types` are callables such as int or datetime.fromisoformat; a malformed
+    cursor is a client error.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(None if v is None else t(v) for t, v in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """Split a query fetched with limit + 1 rows into the page and the next cursor.
+
+    `key` maps a row to the tuple of values the query is ordered by.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
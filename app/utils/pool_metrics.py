@@ -0,0 +1,129 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open ended.
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class PoolMetrics:
+    def __init__(self, name: str, engine=None):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, elapsed_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            self.wait_buckets[bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+
+    def _bump(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    @property
+    def pool(self):
+        # Looked up on every call: engine.dispose() swaps in a new pool.
+        return self.engine.pool if self.engine is not None else None
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            labels = [f"le_{b}ms" for b in WAIT_BUCKETS_MS] + ["inf"]
+            data = {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checkout_timeouts": self.timeouts,
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "avg": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "histogram": dict(zip(labels, self.wait_buckets)),
+                },
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        return data
+
+
+_registry: dict[str, PoolMetrics] = {}
+
+
+class _TimedCheckoutMixin:
+    """Times how long a checkout waits on the pool queue.
+
+    SQLAlchemy has no "before checkout" pool event, so the wait is measured
+    around `_do_get`; everything else is collected through pool events.
+    """
+
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait((time.perf_counter() - start) * 1000, timed_out)
+
+    def recreate(self):
+        # dispose() replaces the pool; event listeners are carried over by
+        # SQLAlchemy, the metrics are not.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(name: str, engine) -> PoolMetrics:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    metrics = PoolMetrics(name, sync_engine)
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool.metrics = metrics
+
+    event.listen(pool, "connect", lambda *a: metrics._bump("connects"))
+    event.listen(pool, "checkout", lambda *a: metrics._bump("checkouts"))
+    event.listen(pool, "checkin", lambda *a: metrics._bump("checkins"))
+    event.listen(pool, "invalidate", lambda *a: metrics._bump("invalidations"))
+
+    _registry[name] = metrics
+    return metrics
+
+
+def pool_stats() -> dict:
+    return {name: m.snapshot() for name, m in _registry.items()}
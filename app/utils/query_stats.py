@@ -0,0 +1,103 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    def __init__(self, route: str | None = None):
+        self.route = route
+        self.count = 0
+        self.duration_ms = 0.0
+        self.statements: list[str] = []
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.duration_ms += elapsed_ms
+        self.statements.append(statement)
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+# Listening on the Engine class covers every engine, including the sync engine
+# behind the async one. The stats object is shared by reference, so statements
+# run in FastAPI's threadpool (which copies the context) are still counted.
+# The start time lives on the execution context, which is dropped with the
+# statement, so a statement that raises leaves nothing behind on the connection.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_stats_start", None)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - start) * 1000 if start is not None else 0.0)
+
+
+@contextmanager
+def count_queries(route: str | None = None):
+    stats = QueryStats(route)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries executed, budget is {max_queries}:\n" + "\n".join(stats.statements)
+        )
+
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of SQL statements a route may run per request."""
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+def check_budget(endpoint, stats: QueryStats):
+    budget = getattr(endpoint, "__query_budget__", None)
+    if budget is None or stats.count <= budget:
+        return
+    message = f"{stats.route} ran {stats.count} queries, budget is {budget}"
+    # QUERY_BUDGET_STRICT (set by the test suite) turns an overrun into a failure.
+    if settings.query_budget_strict:
+        raise QueryBudgetExceeded(message + ":\n" + "\n".join(stats.statements))
+    logger.warning(message)
+
+
+async def query_stats_middleware(request, call_next):
+    with count_queries(f"{request.method} {request.url.path}") as stats:
+        response = await call_next(request)
+    check_budget(request.scope.get("endpoint"), stats)
+    if settings.debug:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.duration_ms:.2f}"
+    return response
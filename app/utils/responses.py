@@ -0,0 +1,48 @@
+import dataclasses
+import enum
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Row, RowMapping
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(value):
+    # Row projections are the common case; everything else orjson handles itself.
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, RowMapping):
+        return dict(value)
+    if orjson is None:
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        if isinstance(value, enum.Enum):
+            return value.value
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return dataclasses.asdict(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Serializes rows, dicts and dataclasses straight to JSON.
+
+    Routes that return this skip FastAPI's response_model validation and
+    `jsonable_encoder`, so they must hand it exactly the fields the client
+    should see; keep `response_model` on the route for the OpenAPI schema.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
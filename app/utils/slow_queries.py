@@ -0,0 +1,144 @@
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from sqlalchemy import event
+from app.config import get_settings
+from app.utils.query_stats import current_stats
+
+settings = get_settings()
+
+logger = logging.getLogger("app.slow_queries")
+logger.propagate = False
+
+_recent: deque = deque(maxlen=200)
+_recent_lock = threading.Lock()
+_explained_at: dict[str, float] = {}
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_SKIP = "slow_query_skip"
+_file_handler_ready = False
+
+
+def _setup_file_handler():
+    global _file_handler_ready
+    if _file_handler_ready:
+        return
+    _file_handler_ready = True
+    path = settings.slow_query_log_path
+    if not path:
+        return
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=settings.slow_query_log_max_bytes, backupCount=settings.slow_query_log_backups
+        )
+    except OSError:
+        return
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def _redact(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (date, datetime, dtime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(v) for v in value]
+    return "***"
+
+
+def _crud_caller() -> str | None:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.crud."):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _emit(record: dict):
+    with _recent_lock:
+        _recent.append(record)
+        _setup_file_handler()
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def _explain(engine, statement, parameters, record: dict):
+    try:
+        with engine.connect() as conn:
+            conn.info[_SKIP] = True
+            try:
+                rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+                record["plan"] = "\n".join(r[0] for r in rows)
+            finally:
+                conn.rollback()
+                conn.info.pop(_SKIP, None)
+    except Exception as exc:
+        record["plan_error"] = str(exc)
+    _emit(record)
+
+
+def _should_explain(conn, statement: str) -> bool:
+    dialect = conn.dialect
+    if not settings.slow_query_explain or dialect.name != "postgresql" or dialect.is_async:
+        return False
+    # ANALYZE executes the statement, so only plain reads are explained.
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    # The same statement is explained at most once per interval.
+    now = time.monotonic()
+    if now - _explained_at.get(statement, float("-inf")) < settings.slow_query_explain_interval:
+        return False
+    _explained_at[statement] = now
+    return True
+
+
+# Timed on the execution context rather than conn.info, so a statement that
+# raises leaves nothing behind on the pooled connection.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_slow_query_start", None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if elapsed_ms < settings.slow_query_ms or conn.info.get(_SKIP):
+        return
+    stats = current_stats()
+    record = {
+        "at": datetime.utcnow().isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "route": stats.route if stats else None,
+        "crud": _crud_caller(),
+        "statement": statement,
+        "parameters": _redact(parameters),
+    }
+    if _should_explain(conn, statement):
+        _explain_executor.submit(_explain, conn.engine, statement, parameters, record)
+    else:
+        _emit(record)
+
+
+def install(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def recent_slow_queries(limit: int = 50) -> list[dict]:
+    with _recent_lock:
+        return list(_recent)[-limit:][::-1]
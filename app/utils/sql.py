@@ -0,0 +1,8 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(db, model):
+    """An INSERT that supports ON CONFLICT on both databases we run on (PostgreSQL and SQLite)."""
+    dialect = getattr(getattr(db, "bind", None), "dialect", None)
+    insert_ = postgresql.insert if getattr(dialect, "name", None) == "postgresql" else sqlite.insert
+    return insert_(model)
@@ -0,0 +1,149 @@
+"""Booking throughput under concurrency.
+
+Seeds one counselor, N students and N free slots, then fires N concurrent
+`POST /appointments/book/` requests (one slot per student) through the ASGI
+app while a probe keeps hitting `/ping` to show how long the event loop is
+blocked by DB work.
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.booking_concurrency --bookings 500
+
+With --contended every request targets the same slot instead, and the run
+checks that exactly one booking succeeded and no slot holds two appointments.
+
+Run it once on the commit before the async DB layer and once after it to
+get the before/after numbers; point DATABASE_URL at a disposable database.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+
+import httpx
+from sqlalchemy import func
+
+from app import auth, models
+from app.database import Base, SessionLocal, async_engine, engine
+from app.main import app
+
+
+def seed(n: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counselor_user = models.User(
+            firstname="Bench", lastname="Counselor", email="counselor@bench.local",
+            password_hash="x", role=models.RoleEnum.counselor,
+        )
+        db.add(counselor_user)
+        db.flush()
+        counselor = models.Counselor(user_id=counselor_user.userid)
+        db.add(counselor)
+        db.flush()
+
+        tokens = []
+        slot_ids = []
+        day = date.today() + timedelta(days=1)
+        time_range = models.CounselorTimeRange(
+            counselor_id=counselor.counselor_id, date=day,
+            from_time=dtime(0, 0), to_time=dtime(23, 59), duration=1,
+        )
+        db.add(time_range)
+        db.flush()
+        for i in range(n):
+            user = models.User(
+                firstname=f"S{i}", lastname="Bench", email=f"s{i}@bench.local",
+                password_hash="x", role=models.RoleEnum.student,
+            )
+            db.add(user)
+            db.flush()
+            student = models.Student(user_id=user.userid)
+            db.add(student)
+            start = dtime((i // 60) % 24, i % 60)
+            slot = models.AvailableTimeSlot(
+                range_id=time_range.id, date=time_range.date, start_time=start, end_time=start, is_reserved=False,
+            )
+            db.add(slot)
+            db.flush()
+            slot_ids.append(slot.id)
+            tokens.append(auth.create_access_token(
+                user.userid, models.RoleEnum.student, student_id=student.student_id
+            ))
+        db.commit()
+        return tokens, slot_ids
+    finally:
+        db.close()
+
+
+def double_booked_slots() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(models.Appointment.slot_id).group_by(models.Appointment.slot_id).having(
+            func.count() > 1
+        ).count()
+    finally:
+        db.close()
+
+
+async def run(n: int, concurrency: int, contended: bool = False):
+    tokens, slot_ids = seed(n)
+    if contended:
+        slot_ids = [slot_ids[0]] * n
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    ping_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def book(token, slot_id):
+            async with semaphore:
+                r = await client.post(
+                    "/appointments/book/",
+                    json={"slot_id": slot_id},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                return r.status_code
+
+        async def probe():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        statuses = await asyncio.gather(*(book(t, s) for t, s in zip(tokens, slot_ids)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await probe_task
+    await async_engine.dispose()
+
+    ok = sum(1 for s in statuses if s == 200)
+    rejected = sum(1 for s in statuses if s == 400)
+    ping_latencies.sort()
+    p99 = ping_latencies[int(len(ping_latencies) * 0.99) - 1] if ping_latencies else 0.0
+    print(f"bookings:      {n} (concurrency {concurrency}), ok={ok}, rejected={rejected}")
+    print(f"elapsed:       {elapsed:.2f}s")
+    print(f"throughput:    {n / elapsed:.1f} req/s")
+    if ping_latencies:
+        print(f"/ping median:  {statistics.median(ping_latencies):.2f} ms")
+        print(f"/ping p99:     {p99:.2f} ms")
+    double_booked = double_booked_slots()
+    print(f"double-booked: {double_booked} slots")
+    if double_booked or (contended and ok != 1):
+        raise SystemExit("booking invariant violated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--contended", action="store_true", help="send every booking to the same slot")
+    args = parser.parse_args()
+    asyncio.run(run(args.bookings, args.concurrency, args.contended))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Counselor dashboard: three count() queries vs one FILTER aggregate vs the cache.
+
+Seeds --appointments-per-counselor appointments (10k by default) for each
+counselor and reports the median latency of each variant.
+
+    DATABASE_URL=postgresql://.../bench python -m benchmarks.counselor_dashboard
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app import crud, models
+from app.database import SessionLocal
+from benchmarks import seed as seeding
+
+
+def three_counts(db, counselor_id: int):
+    # The dashboard as it was before the aggregate query.
+    now = datetime.utcnow()
+    month_ago = now - timedelta(days=30)
+    past_sessions = db.query(models.Appointment).filter(
+        models.Appointment.counselor_id == counselor_id,
+        models.Appointment.status == "approved",
+        models.Appointment.date >= month_ago.date(),
+        models.Appointment.date <= now.date()
+    ).count()
+    future_approved = db.query(models.Appointment).filter(
+        models.Appointment.counselor_id == counselor_id,
+        models.Appointment.status == "approved",
+        models.Appointment.date > now.date()
+    ).count()
+    student_count = db.query(models.Appointment.student_id).filter(
+        models.Appointment.counselor_id == counselor_id
+    ).distinct().count()
+    return {
+        "recent_sessions": past_sessions,
+        "upcoming_approved_requests": future_approved,
+        "unique_students": student_count
+    }
+
+
+def measure(fn, counselor_ids, iterations: int) -> float:
+    rng = random.Random(3)
+    samples = []
+    db = SessionLocal()
+    try:
+        for _ in range(iterations):
+            counselor_id = rng.choice(counselor_ids)
+            t0 = time.perf_counter()
+            fn(db, counselor_id)
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        db.close()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counselors", type=int, default=5)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--appointments-per-counselor", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    data = seeding.seed(
+        counselors=args.counselors, students=args.students,
+        appointments_per_counselor=args.appointments_per_counselor,
+        notifications_per_user=0, plans_per_student=0,
+    )
+    counselor_ids = data["counselor_ids"]
+
+    db = SessionLocal()
+    try:
+        for counselor_id in counselor_ids:
+            assert three_counts(db, counselor_id) == crud.get_counselor_dashboard_stats(db, counselor_id)
+    finally:
+        db.close()
+
+    results = {
+        "three count() queries": measure(three_counts, counselor_ids, args.iterations),
+        "one FILTER aggregate": measure(crud.get_counselor_dashboard_stats, counselor_ids, args.iterations),
+        "cached": measure(crud.get_counselor_dashboard, counselor_ids, args.iterations),
+    }
+    for name, ms in results.items():
+        print(f"{name:24} {ms:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Before/after latency of the crud functions served by the hot-filter indexes.
+
+Seeds a dataset, times each crud function with the indexes dropped, then
+creates the indexes (the same ones declared in app/models.py and added by
+migration 5c1e9a7d2b40) and times them again.
+
+    DATABASE_URL=postgresql://.../bench python -m benchmarks.crud_indexes --students 5000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import Index
+
+from app import crud, models
+from app.database import SessionLocal, engine
+from benchmarks import seed as seeding
+
+HOT_INDEXES = {
+    "ix_students_user_id", "ix_counselors_user_id", "ix_appointments_counselor_status_date",
+    "ix_counselor_time_ranges_counselor_date", "ix_available_time_slots_range_reserved",
+    "ix_notifications_user_created", "ix_study_plans_student_finalized_created",
+}
+
+
+def hot_indexes() -> list[Index]:
+    return [
+        index
+        for table in models.Base.metadata.sorted_tables
+        for index in table.indexes
+        if index.name in HOT_INDEXES
+    ]
+
+
+def cases(data):
+    rng = random.Random(7)
+    return {
+        "get_student_by_user_id": lambda db: crud.get_student_by_user_id(db, rng.choice(data["student_users"])),
+        "get_counselor_by_user_id": lambda db: crud.get_counselor_by_user_id(db, rng.choice(data["counselor_users"])),
+        "get_appointments_by_status": lambda db: crud.get_appointments_by_status(
+            db, rng.choice(data["counselor_users"]), models.AppointmentStatus.approved),
+        "get_ranges_by_counselor": lambda db: crud.get_ranges_by_counselor(db, rng.choice(data["counselor_ids"])),
+        "get_slots_by_range": lambda db: crud.get_slots_by_range(db, rng.choice(data["range_ids"])),
+        "get_user_notifications": lambda db: crud.get_user_notifications(db, rng.choice(data["student_users"])),
+        "get_student_weekly_plan": lambda db: crud.get_student_weekly_plan(db, rng.choice(data["student_users"])),
+        "get_counselor_dashboard_stats": lambda db: crud.get_counselor_dashboard_stats(
+            db, rng.choice(data["counselor_ids"])),
+    }
+
+
+def time_cases(data, iterations: int) -> dict[str, float]:
+    results = {}
+    for name, fn in cases(data).items():
+        samples = []
+        for _ in range(iterations):
+            db = SessionLocal()
+            try:
+                t0 = time.perf_counter()
+                fn(db)
+                samples.append((time.perf_counter() - t0) * 1000)
+            finally:
+                db.close()
+        results[name] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counselors", type=int, default=50)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--appointments-per-counselor", type=int, default=400)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    data = seeding.seed(
+        counselors=args.counselors, students=args.students,
+        appointments_per_counselor=args.appointments_per_counselor,
+    )
+    for index in hot_indexes():
+        index.drop(bind=engine, checkfirst=True)
+    before = time_cases(data, args.iterations)
+    for index in hot_indexes():
+        index.create(bind=engine, checkfirst=True)
+    after = time_cases(data, args.iterations)
+
+    print(f"{'crud function':32} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:32} {before[name]:10.3f} {after[name]:10.3f} {speedup:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
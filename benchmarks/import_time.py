@@ -0,0 +1,64 @@
+"""Worker boot cost, measured with `python -X importtime`.
+
+Imports `app.main` in a fresh interpreter (so nothing is cached) and prints
+the total import time plus the slowest packages by cumulative time.
+
+    DATABASE_URL=postgresql://... ENV=production python -m benchmarks.import_time --top 15
+
+ENV=production skips create_all, so the number matches what a production
+worker pays at start; leave ENV unset to include the development schema check.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> tuple[float, dict[str, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    cumulative: dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        _, cum_us, indent, name = m.groups()
+        # Top-level imports (single-space indent) add up to the full import cost.
+        if len(indent) == 1:
+            total_us += int(cum_us)
+        cumulative[name] = int(cum_us)
+    return total_us / 1000, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    last = {}
+    for _ in range(args.runs):
+        total_ms, last = measure(args.module)
+        totals.append(total_ms)
+
+    print(f"import {args.module}: median {statistics.median(totals):.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, {args.runs} runs)")
+    packages = {name: us for name, us in last.items() if "." not in name}
+    print("\nslowest top-level packages (last run, cumulative):")
+    for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
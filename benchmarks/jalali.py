@@ -0,0 +1,69 @@
+"""Per-call cost of Jalali conversion: jdatetime vs the precomputed table.
+
+Converts --dates random dates inside the table window in both directions
+and reports the cost per call, plus the one-off cost of building the table.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.jalali
+"""
+import argparse
+import random
+import time
+from datetime import date
+
+import jdatetime
+
+from app.config import get_settings
+from app.utils.datetime import jalali_to_gregorian, to_jalali_str
+from app.utils.jalali_table import JalaliTable, get_table
+
+
+def per_call_ns(fn, args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for arg in args:
+            fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(args) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dates", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    t0 = time.perf_counter()
+    JalaliTable(settings.jalali_table_start_year, settings.jalali_table_end_year)
+    print(f"table build {(time.perf_counter() - t0) * 1000:10.1f} ms")
+    get_table()
+
+    rng = random.Random(7)
+    first = date(settings.jalali_table_start_year, 1, 1).toordinal()
+    last = date(settings.jalali_table_end_year, 12, 31).toordinal()
+    g_dates = [date.fromordinal(rng.randint(first, last)) for _ in range(args.dates)]
+    j_strings = [to_jalali_str(d) for d in g_dates]
+
+    def jdatetime_to_str(d):
+        return jdatetime.date.fromgregorian(date=d).strftime('%Y-%m-%d')
+
+    def jdatetime_to_gregorian(s):
+        y, m, d = map(int, s.split("-"))
+        return jdatetime.date(y, m, d).togregorian()
+
+    assert [jdatetime_to_str(d) for d in g_dates[:1000]] == j_strings[:1000]
+    assert [jalali_to_gregorian(s) for s in j_strings[:1000]] == g_dates[:1000]
+
+    results = {
+        "to_jalali_str jdatetime": per_call_ns(jdatetime_to_str, g_dates, args.repeat),
+        "to_jalali_str table": per_call_ns(to_jalali_str, g_dates, args.repeat),
+        "jalali_to_gregorian jdatetime": per_call_ns(jdatetime_to_gregorian, j_strings, args.repeat),
+        "jalali_to_gregorian table": per_call_ns(jalali_to_gregorian, j_strings, args.repeat),
+    }
+    for name, ns in results.items():
+        print(f"{name:30} {ns:10.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
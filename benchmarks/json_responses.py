@@ -0,0 +1,81 @@
+"""List endpoint serialization: ORM + jsonable_encoder vs row projection + FastJSONResponse.
+
+Seeds --rows appointments and users, then times query plus serialization for
+/admin/appointments and /admin/users both ways, reporting p50/p99 latency and
+throughput in response bytes per second.
+
+    DATABASE_URL=postgresql://.../bench python -m benchmarks.json_responses --rows 10000
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import crud, models
+from app.database import SessionLocal
+from app.utils.responses import FastJSONResponse
+from benchmarks import seed as seeding
+
+
+def orm_appointments(db):
+    return JSONResponse(jsonable_encoder(db.query(models.Appointment).all())).body
+
+
+def fast_appointments(db):
+    return FastJSONResponse(crud.get_appointments(db)).body
+
+
+def orm_users(db):
+    return JSONResponse(jsonable_encoder(db.query(models.User).all())).body
+
+
+def fast_users(db):
+    return FastJSONResponse(crud.list_users(db)).body
+
+
+def measure(fn, iterations: int) -> tuple[float, float, int]:
+    samples = []
+    size = 0
+    db = SessionLocal()
+    try:
+        for _ in range(iterations):
+            db.expunge_all()
+            t0 = time.perf_counter()
+            size = len(fn(db))
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        db.close()
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples), p99, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    counselors = 10
+    seeding.seed(
+        counselors=counselors, students=args.rows - counselors,
+        appointments_per_counselor=args.rows // counselors,
+        ranges_per_counselor=1, slots_per_range=1, notifications_per_user=0, plans_per_student=0,
+    )
+
+    variants = {
+        "appointments ORM + jsonable_encoder": orm_appointments,
+        "appointments projection + FastJSON": fast_appointments,
+        "users ORM + jsonable_encoder": orm_users,
+        "users projection + FastJSON": fast_users,
+    }
+    print(f"{'variant':38} {'p50 ms':>9} {'p99 ms':>9} {'MB/s':>8} {'bytes':>10}")
+    for name, fn in variants.items():
+        p50, p99, size = measure(fn, args.iterations)
+        print(f"{name:38} {p50:9.2f} {p99:9.2f} {size / p50 / 1000:8.1f} {size:10}")
+
+
+if __name__ == "__main__":
+    main()
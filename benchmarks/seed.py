@@ -0,0 +1,142 @@
+"""Synthetic data for the benchmarks.
+
+Everything is inserted with set-based `insert()` calls so seeding tens of
+thousands of rows takes seconds. Point DATABASE_URL at a disposable
+database: `reset()` drops and recreates every table.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert, select, update
+
+from app import models
+from app.database import Base, SessionLocal, engine
+
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _insert(db, model, rows, chunk: int = 5000):
+    for start in range(0, len(rows), chunk):
+        db.execute(insert(model), rows[start:start + chunk])
+
+
+def _users(db, role, count, prefix):
+    rows = [
+        {
+            "firstname": f"{prefix}{i}", "lastname": "Bench", "email": f"{prefix}{i}@bench.local",
+            "password_hash": "x", "role": role, "registrationDate": datetime.utcnow(),
+        }
+        for i in range(count)
+    ]
+    _insert(db, models.User, rows)
+    return db.scalars(
+        select(models.User.userid).where(models.User.role == role).order_by(models.User.userid)
+    ).all()
+
+
+def seed(
+    counselors: int = 50,
+    students: int = 1000,
+    appointments_per_counselor: int = 200,
+    ranges_per_counselor: int = 30,
+    slots_per_range: int = 4,
+    notifications_per_user: int = 20,
+    plans_per_student: int = 3,
+    rng_seed: int = 42,
+):
+    rng = random.Random(rng_seed)
+    reset()
+    db = SessionLocal()
+    try:
+        counselor_users = _users(db, models.RoleEnum.counselor, counselors, "c")
+        student_users = _users(db, models.RoleEnum.student, students, "s")
+        db.execute(insert(models.Counselor), [{"user_id": u} for u in counselor_users])
+        db.execute(insert(models.Student), [{"user_id": u} for u in student_users])
+        counselor_ids = db.scalars(select(models.Counselor.counselor_id)).all()
+        student_ids = db.scalars(select(models.Student.student_id)).all()
+
+        # Every appointment books a slot of its own: every other slot of the
+        # regular ranges, then whole days of history before the first of them.
+        # History days never share a date with a regular range, so no two of a
+        # counselor's ranges overlap (the exclusion constraint on PostgreSQL).
+        first_day = date.today() - timedelta(days=ranges_per_counselor // 2)
+        regular_booked = min(appointments_per_counselor, (ranges_per_counselor * slots_per_range + 1) // 2)
+        history_days = -(-(appointments_per_counselor - regular_booked) // slots_per_range)
+        range_rows = [
+            {
+                "counselor_id": cid, "date": first_day + timedelta(days=d),
+                "from_time": time(9, 0), "to_time": time(9 + slots_per_range, 0), "duration": 60,
+            }
+            for cid in counselor_ids for d in range(-history_days, ranges_per_counselor)
+        ]
+        _insert(db, models.CounselorTimeRange, range_rows)
+        ranges = db.execute(
+            select(models.CounselorTimeRange.id, models.CounselorTimeRange.counselor_id, models.CounselorTimeRange.date)
+        ).all()
+        slot_rows = [
+            {
+                "range_id": r.id, "date": r.date, "start_time": time(9 + i, 0), "end_time": time(10 + i, 0),
+                "is_reserved": False,
+            }
+            for r in ranges for i in range(slots_per_range)
+        ]
+        _insert(db, models.AvailableTimeSlot, slot_rows)
+        slots = db.execute(
+            select(models.AvailableTimeSlot.id, models.AvailableTimeSlot.start_time,
+                   models.CounselorTimeRange.counselor_id, models.AvailableTimeSlot.date)
+            .join(models.CounselorTimeRange)
+            .order_by(models.CounselorTimeRange.counselor_id, models.AvailableTimeSlot.date,
+                      models.AvailableTimeSlot.start_time)
+        ).all()
+
+        by_counselor: dict[int, list] = {}
+        for s in slots:
+            by_counselor.setdefault(s.counselor_id, []).append(s)
+        appointment_rows = []
+        reserved_slot_ids = []
+        statuses = list(models.AppointmentStatus)
+        for cid, cslots in by_counselor.items():
+            regular = [s for s in cslots if s.date >= first_day][::2]
+            history = [s for s in cslots if s.date < first_day]
+            for s in (regular + history)[:appointments_per_counselor]:
+                status = rng.choice(statuses)
+                appointment_rows.append({
+                    "student_id": rng.choice(student_ids), "counselor_id": cid, "slot_id": s.id,
+                    "date": s.date, "time": s.start_time, "status": status, "notes": None,
+                })
+                if status != models.AppointmentStatus.cancelled:
+                    reserved_slot_ids.append(s.id)
+        _insert(db, models.Appointment, appointment_rows)
+        for start in range(0, len(reserved_slot_ids), 5000):
+            db.execute(
+                update(models.AvailableTimeSlot)
+                .where(models.AvailableTimeSlot.id.in_(reserved_slot_ids[start:start + 5000]))
+                .values(is_reserved=True)
+            )
+
+        notification_rows = [
+            {"user_id": u, "message": f"message {i}", "read": False,
+             "created_at": datetime.utcnow() - timedelta(hours=i)}
+            for u in counselor_users + student_users for i in range(notifications_per_user)
+        ]
+        _insert(db, models.Notification, notification_rows)
+
+        plan_rows = [
+            {"student_id": sid, "counselor_id": rng.choice(counselor_ids),
+             "is_finalized": i > 0, "created_at": datetime.utcnow() - timedelta(days=7 * i)}
+            for sid in student_ids for i in range(plans_per_student)
+        ]
+        _insert(db, models.StudyPlan, plan_rows)
+        db.commit()
+        return {
+            "counselor_users": counselor_users,
+            "student_users": student_users,
+            "counselor_ids": counselor_ids,
+            "student_ids": student_ids,
+            "range_ids": [r.id for r in ranges],
+        }
+    finally:
+        db.close()
@@ -0,0 +1,107 @@
+"""template ranges per booked slot
+
+Revision ID: 3c9e5a7b1d46
+Revises: f2a7c4e9b185
+Create Date: 2026-10-18 10:42:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e5a7b1d46'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c4e9b185'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    postgresql = bind.dialect.name == 'postgresql'
+    if postgresql:
+        op.drop_constraint('ex_counselor_time_ranges_no_overlap', 'counselor_time_ranges')
+    op.drop_constraint('uq_counselor_time_ranges_template_date', 'counselor_time_ranges', type_='unique')
+
+    # Unbooked template slots become virtual again; booked ones each get a
+    # range of their own, and the old per-day ranges go.
+    op.execute(
+        "DELETE FROM available_time_slots WHERE is_reserved IS NOT TRUE "
+        "AND range_id IN (SELECT id FROM counselor_time_ranges WHERE template_id IS NOT NULL) "
+        "AND id NOT IN (SELECT slot_id FROM appointments)"
+    )
+    last_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM counselor_time_ranges")).scalar()
+    op.execute(
+        "INSERT INTO counselor_time_ranges (counselor_id, date, from_time, to_time, duration, template_id) "
+        "SELECT r.counselor_id, r.date, s.start_time, s.end_time, r.duration, r.template_id "
+        "FROM available_time_slots s JOIN counselor_time_ranges r ON r.id = s.range_id "
+        "WHERE r.template_id IS NOT NULL"
+    )
+    bind.execute(sa.text(
+        "UPDATE available_time_slots SET range_id = ("
+        "SELECT n.id FROM counselor_time_ranges n JOIN counselor_time_ranges o "
+        "ON n.template_id = o.template_id AND n.date = o.date "
+        "WHERE o.id = available_time_slots.range_id AND n.id > :last_id "
+        "AND n.from_time = available_time_slots.start_time) "
+        "WHERE range_id IN (SELECT id FROM counselor_time_ranges WHERE template_id IS NOT NULL AND id <= :last_id)"
+    ), {"last_id": last_id})
+    bind.execute(sa.text(
+        "DELETE FROM counselor_time_ranges WHERE template_id IS NOT NULL AND id <= :last_id"
+    ), {"last_id": last_id})
+    op.create_unique_constraint(
+        'uq_counselor_time_ranges_template_slot', 'counselor_time_ranges', ['template_id', 'date', 'from_time']
+    )
+
+    if not postgresql:
+        return
+    # Booked template slots that an ordinary range was later laid over.
+    overlaps = bind.execute(sa.text(
+        "SELECT a.id, b.id FROM counselor_time_ranges a "
+        "JOIN counselor_time_ranges b ON a.counselor_id = b.counselor_id AND a.date = b.date AND a.id < b.id "
+        "WHERE a.from_time < b.to_time AND a.to_time > b.from_time"
+    )).all()
+    if overlaps:
+        raise RuntimeError(
+            f"Overlapping time ranges: {[tuple(row) for row in overlaps[:20]]}. "
+            "Move or cancel the double-booked sessions, then rerun the migration."
+        )
+    op.execute(
+        "ALTER TABLE counselor_time_ranges ADD CONSTRAINT ex_counselor_time_ranges_no_overlap "
+        "EXCLUDE USING gist (counselor_id WITH =, period WITH &&)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    if postgresql:
+        op.drop_constraint('ex_counselor_time_ranges_no_overlap', 'counselor_time_ranges')
+    op.drop_constraint('uq_counselor_time_ranges_template_slot', 'counselor_time_ranges', type_='unique')
+
+    # Back to one range per template and day, spanning the whole template.
+    op.execute(
+        "UPDATE available_time_slots SET range_id = ("
+        "SELECT MIN(n.id) FROM counselor_time_ranges n JOIN counselor_time_ranges o "
+        "ON n.template_id = o.template_id AND n.date = o.date "
+        "WHERE o.id = available_time_slots.range_id) "
+        "WHERE range_id IN (SELECT id FROM counselor_time_ranges WHERE template_id IS NOT NULL)"
+    )
+    op.execute(
+        "DELETE FROM counselor_time_ranges WHERE template_id IS NOT NULL "
+        "AND id NOT IN (SELECT range_id FROM available_time_slots)"
+    )
+    op.execute(
+        "UPDATE counselor_time_ranges SET from_time = t.from_time, to_time = t.to_time "
+        "FROM weekly_availability_templates t WHERE t.id = counselor_time_ranges.template_id"
+    )
+    op.create_unique_constraint(
+        'uq_counselor_time_ranges_template_date', 'counselor_time_ranges', ['template_id', 'date']
+    )
+    if postgresql:
+        op.execute(
+            "ALTER TABLE counselor_time_ranges ADD CONSTRAINT ex_counselor_time_ranges_no_overlap "
+            "EXCLUDE USING gist (counselor_id WITH =, period WITH &&) WHERE (template_id IS NULL)"
+        )
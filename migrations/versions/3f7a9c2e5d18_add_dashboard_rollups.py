@@ -0,0 +1,83 @@
+"""add dashboard rollups
+
+Revision ID: 3f7a9c2e5d18
+Revises: 8b6d2f4e1a93
+Create Date: 2026-10-17 15:42:09.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a9c2e5d18'
+down_revision: Union[str, Sequence[str], None] = '8b6d2f4e1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+appointment_status = postgresql.ENUM(
+    'pending', 'approved', 'cancelled', name='appointment_status_enum', create_type=False
+)
+role = postgresql.ENUM('student', 'counselor', 'admin', name='role_enum', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'appointment_daily_counts',
+        sa.Column('counselor_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('status', appointment_status, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['counselor_id'], ['counselors.counselor_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('counselor_id', 'date', 'status'),
+    )
+    op.create_index(
+        'ix_appointment_daily_counts_status_date', 'appointment_daily_counts', ['status', 'date'], unique=False
+    )
+    op.create_table(
+        'counselor_appointment_totals',
+        sa.Column('counselor_id', sa.Integer(), nullable=False),
+        sa.Column('status', appointment_status, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['counselor_id'], ['counselors.counselor_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('counselor_id', 'status'),
+    )
+    op.create_index(
+        'ix_counselor_appointment_totals_status_count', 'counselor_appointment_totals', ['status', 'count'],
+        unique=False,
+    )
+    op.create_table(
+        'role_counts',
+        sa.Column('role', role, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('role'),
+    )
+    # Backfill from the rows already stored; the app keeps them current from here on.
+    op.execute(
+        """
+        INSERT INTO appointment_daily_counts (counselor_id, date, status, count)
+        SELECT counselor_id, date, status, COUNT(*) FROM appointments
+        WHERE status IS NOT NULL GROUP BY counselor_id, date, status
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO counselor_appointment_totals (counselor_id, status, count)
+        SELECT counselor_id, status, COUNT(*) FROM appointments
+        WHERE status IS NOT NULL GROUP BY counselor_id, status
+        """
+    )
+    op.execute("INSERT INTO role_counts (role, count) SELECT role, COUNT(*) FROM users GROUP BY role")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('role_counts')
+    op.drop_index('ix_counselor_appointment_totals_status_count', table_name='counselor_appointment_totals')
+    op.drop_table('counselor_appointment_totals')
+    op.drop_index('ix_appointment_daily_counts_status_date', table_name='appointment_daily_counts')
+    op.drop_table('appointment_daily_counts')
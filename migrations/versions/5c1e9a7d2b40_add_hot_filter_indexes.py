@@ -0,0 +1,44 @@
+"""add hot filter indexes
+
+Revision ID: 5c1e9a7d2b40
+Revises: abc394031ec7
+Create Date: 2026-10-17 10:12:41.281905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d2b40'
+down_revision: Union[str, Sequence[str], None] = 'abc394031ec7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_students_user_id', 'students', ['user_id']),
+    ('ix_counselors_user_id', 'counselors', ['user_id']),
+    ('ix_appointments_counselor_status_date', 'appointments', ['counselor_id', 'status', 'date']),
+    ('ix_counselor_time_ranges_counselor_date', 'counselor_time_ranges', ['counselor_id', 'date']),
+    ('ix_available_time_slots_range_reserved', 'available_time_slots', ['range_id', 'is_reserved']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at']),
+    ('ix_study_plans_student_finalized_created', 'study_plans', ['student_id', 'is_finalized', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""add counselor rating aggregates
+
+Revision ID: 8b6d2f4e1a93
+Revises: 5c1e9a7d2b40
+Create Date: 2026-10-17 13:05:22.174630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b6d2f4e1a93'
+down_revision: Union[str, Sequence[str], None] = '5c1e9a7d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('counselors', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('counselors', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the feedback already stored.
+    op.execute(
+        """
+        UPDATE counselors SET
+            rating_sum = COALESCE((SELECT SUM(f.rating) FROM feedback f
+                                   WHERE f.counselor_id = counselors.counselor_id AND f.rating IS NOT NULL), 0),
+            rating_count = (SELECT COUNT(*) FROM feedback f
+                            WHERE f.counselor_id = counselors.counselor_id AND f.rating IS NOT NULL)
+        """
+    )
+    op.create_index(
+        'ix_feedback_counselor_submitted', 'feedback', ['counselor_id', 'date_submitted', 'feedback_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_feedback_counselor_submitted', table_name='feedback')
+    op.drop_column('counselors', 'rating_count')
+    op.drop_column('counselors', 'rating_sum')
@@ -0,0 +1,45 @@
+"""add availability search indexes
+
+Revision ID: 9d3f6a1c8e27
+Revises: e1b5c8a3d7f2
+Create Date: 2026-10-17 18:42:09.615203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a1c8e27'
+down_revision: Union[str, Sequence[str], None] = 'e1b5c8a3d7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_counselors_province_city', 'counselors', ['province', 'city'], None),
+    ('ix_counselors_department', 'counselors', ['department'], None),
+    ('ix_counselor_time_ranges_date_counselor', 'counselor_time_ranges', ['date', 'counselor_id'], None),
+    ('ix_available_time_slots_free_range_start', 'available_time_slots', ['range_id', 'start_time', 'id'],
+     'is_reserved IS NOT TRUE'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""unique appointment slot
+
+Revision ID: a4d8e1f6c3b2
+Revises: 3f7a9c2e5d18
+Create Date: 2026-10-17 16:20:47.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e1f6c3b2'
+down_revision: Union[str, Sequence[str], None] = '3f7a9c2e5d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Double bookings made before the atomic reservation need a human decision,
+    # so refuse to guess which appointment to keep.
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT slot_id FROM appointments GROUP BY slot_id HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Slots with more than one appointment: {duplicates[:20]}. "
+            "Delete the extra appointments, then rerun the migration."
+        )
+    op.create_unique_constraint('uq_appointments_slot_id', 'appointments', ['slot_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_appointments_slot_id', 'appointments', type_='unique')
@@ -0,0 +1,56 @@
+"""add slot date
+
+Revision ID: b6e4d2a9f053
+Revises: 9d3f6a1c8e27
+Create Date: 2026-10-17 19:27:33.148920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e4d2a9f053'
+down_revision: Union[str, Sequence[str], None] = '9d3f6a1c8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('available_time_slots', sa.Column('date', sa.Date(), nullable=True))
+    op.execute(
+        "UPDATE available_time_slots SET date = ("
+        "SELECT counselor_time_ranges.date FROM counselor_time_ranges "
+        "WHERE counselor_time_ranges.id = available_time_slots.range_id)"
+    )
+    op.alter_column('available_time_slots', 'date', nullable=False)
+    # autocommit_block commits the column first; CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_available_time_slots_free_date_start', 'available_time_slots', ['date', 'start_time', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+            postgresql_where=sa.text('is_reserved IS NOT TRUE'),
+        )
+        # Superseded: the search now filters and orders on the slot's own date.
+        op.drop_index(
+            'ix_available_time_slots_free_range_start', table_name='available_time_slots',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_available_time_slots_free_range_start', 'available_time_slots', ['range_id', 'start_time', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+            postgresql_where=sa.text('is_reserved IS NOT TRUE'),
+        )
+        op.drop_index(
+            'ix_available_time_slots_free_date_start', table_name='available_time_slots',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('available_time_slots', 'date')
@@ -0,0 +1,76 @@
+"""add weekly availability templates
+
+Revision ID: c7e2b9d4f1a6
+Revises: a4d8e1f6c3b2
+Create Date: 2026-10-17 17:48:13.620935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2b9d4f1a6'
+down_revision: Union[str, Sequence[str], None] = 'a4d8e1f6c3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'weekly_availability_templates',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('counselor_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.Integer(), nullable=False),
+        sa.Column('from_time', sa.Time(), nullable=False),
+        sa.Column('to_time', sa.Time(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.Column('valid_from', sa.Date(), nullable=False),
+        sa.Column('valid_until', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['counselor_id'], ['counselors.counselor_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_weekly_availability_templates_id'), 'weekly_availability_templates', ['id'], unique=False
+    )
+    op.create_index(
+        'ix_weekly_availability_templates_counselor_weekday', 'weekly_availability_templates',
+        ['counselor_id', 'weekday'], unique=False,
+    )
+
+    op.add_column('counselor_time_ranges', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'counselor_time_ranges_template_id_fkey', 'counselor_time_ranges', 'weekly_availability_templates',
+        ['template_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_unique_constraint(
+        'uq_counselor_time_ranges_template_date', 'counselor_time_ranges', ['template_id', 'date']
+    )
+
+    # Materializing a template slot upserts on (range_id, start_time).
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT range_id, start_time FROM available_time_slots "
+        "GROUP BY range_id, start_time HAVING COUNT(*) > 1"
+    )).all()
+    if duplicates:
+        raise RuntimeError(
+            f"Ranges with two slots at the same start time: {[tuple(d) for d in duplicates[:20]]}. "
+            "Remove the extra slots, then rerun the migration."
+        )
+    op.create_unique_constraint(
+        'uq_available_time_slots_range_start', 'available_time_slots', ['range_id', 'start_time']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_available_time_slots_range_start', 'available_time_slots', type_='unique')
+    op.drop_constraint('uq_counselor_time_ranges_template_date', 'counselor_time_ranges', type_='unique')
+    op.drop_constraint('counselor_time_ranges_template_id_fkey', 'counselor_time_ranges', type_='foreignkey')
+    op.drop_column('counselor_time_ranges', 'template_id')
+    op.drop_index('ix_weekly_availability_templates_counselor_weekday', table_name='weekly_availability_templates')
+    op.drop_index(op.f('ix_weekly_availability_templates_id'), table_name='weekly_availability_templates')
+    op.drop_table('weekly_availability_templates')
@@ -0,0 +1,55 @@
+"""exclude overlapping time ranges
+
+Revision ID: e1b5c8a3d7f2
+Revises: c7e2b9d4f1a6
+Create Date: 2026-10-17 18:05:12.330417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b5c8a3d7f2'
+down_revision: Union[str, Sequence[str], None] = 'c7e2b9d4f1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    # Ranges saved while the overlap check was a racy read-then-insert may
+    # already collide; which one to keep is a human decision.
+    overlaps = bind.execute(sa.text(
+        "SELECT a.id, b.id FROM counselor_time_ranges a "
+        "JOIN counselor_time_ranges b ON a.counselor_id = b.counselor_id AND a.date = b.date AND a.id < b.id "
+        "WHERE a.template_id IS NULL AND b.template_id IS NULL "
+        "AND a.from_time < b.to_time AND a.to_time > b.from_time"
+    )).all()
+    if overlaps:
+        raise RuntimeError(
+            f"Overlapping time ranges: {[tuple(row) for row in overlaps[:20]]}. "
+            "Delete or shorten one range of each pair, then rerun the migration."
+        )
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        "ALTER TABLE counselor_time_ranges ADD COLUMN period tsrange "
+        "GENERATED ALWAYS AS (tsrange(\"date\" + from_time, \"date\" + to_time, '[)')) STORED"
+    )
+    op.execute(
+        "ALTER TABLE counselor_time_ranges ADD CONSTRAINT ex_counselor_time_ranges_no_overlap "
+        "EXCLUDE USING gist (counselor_id WITH =, period WITH &&) WHERE (template_id IS NULL)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_constraint('ex_counselor_time_ranges_no_overlap', 'counselor_time_ranges')
+    op.drop_column('counselor_time_ranges', 'period')
@@ -0,0 +1,36 @@
+"""add appointments student date index
+
+Revision ID: f2a7c4e9b185
+Revises: b6e4d2a9f053
+Create Date: 2026-10-17 20:11:54.902361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c4e9b185'
+down_revision: Union[str, Sequence[str], None] = 'b6e4d2a9f053'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_student_date', 'appointments', ['student_id', 'date'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_appointments_student_date', table_name='appointments', postgresql_concurrently=True, if_exists=True,
+        )